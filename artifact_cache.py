@@ -0,0 +1,71 @@
+# artifact_cache.py
+import hashlib
+import json
+import os
+import pickle
+
+import config
+
+CACHE_FORMAT = 5  # Bump when the pickled artifacts stop being compatible with the code
+
+
+def config_hash(settings):
+    """
+    Hash of the settings of a generator together with every constant of config.py, so cached artifacts are never
+    reused once the configuration they were generated with changes.
+    """
+    constants = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    payload = json.dumps(
+        {"format": CACHE_FORMAT, "settings": settings, "config": constants},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def content_hash(value):
+    """Hash of a picklable value (e.g. the inputs of an LP), used to address artifacts by what they were built from"""
+    return hashlib.sha256(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()[:16]
+
+
+class ArtifactCache:
+    """
+    On-disk cache of expensive artifacts (generated graphs, simulation results, LP solutions), stored as pickle files
+    under `directory/<seed>/<config hash>/<name>.pkl`. Artifacts only depend on the seed and the configuration, so they
+    can be shared across Streamlit sessions.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, seed, config_key, name):
+        return os.path.join(self.directory, str(seed), config_key, f"{name}.pkl")
+
+    def load(self, seed, config_key, name):
+        """Return (True, artifact) when it is cached, (False, None) otherwise"""
+        path = self.path(seed, config_key, name)
+        try:
+            with open(path, "rb") as f:
+                return True, pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Unreadable artifact (interrupted write or older code), it gets rebuilt
+            return False, None
+
+    def store(self, seed, config_key, name, artifact):
+        path = self.path(seed, config_key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so a concurrent session never reads a partial artifact
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def get_or_create(self, seed, config_key, name, build):
+        """Return the cached artifact, or build it with `build()` and cache it"""
+        found, artifact = self.load(seed, config_key, name)
+        if not found:
+            artifact = build()
+            self.store(seed, config_key, name, artifact)
+        return artifact
@@ -1,24 +1,162 @@
 # data_generator.py
 import json
+import heapq
 import math
 import os
 import random
 import networkx as nx
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from config import *
 from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 import pulp
+from artifact_cache import ArtifactCache, config_hash, content_hash
+from entity_records import (
+    EntityGraph, FacilityRecord, IdTable, PartRecord, SupplierRecord, WarehouseRecord, snapshot_properties
+)
+from operation_log import ACTION_CODES, DEFAULT_SEGMENT_SIZE, NO_TARGET, OperationLog, graph_attribute
+from temporal_store import DEFAULT_CACHE_SIZE, DeltaSnapshotStore, SnapshotStore, TemporalGraphStore
+
+
+def temporal_variation(base_values, feature_type, time_period, rng):
+    """
+    Apply the temporal variation of a feature to an array of base values in one call.
+
+    Incorporates the trend and seasonality of the feature and a uniform random variation bounded by the feature's
+    `max_change` in TEMPORAL_VARIATION, drawn independently for every value.
+
+    Args:
+        base_values: Initial values (array like)
+        feature_type: Type of feature (cost, demand, etc.)
+        time_period: Current time period (0-11 for months)
+        rng: numpy Generator the random variation is drawn from
+    """
+    config = TEMPORAL_VARIATION.get(feature_type, {"max_change": 0.1, "trend": 0})
+    base_values = np.asarray(base_values, dtype=float)
+
+    # Add trend component
+    trend_factor = 1 + (config["trend"] * time_period)
+
+    # Add seasonal component for relevant features
+    seasonal_factor = 1.0
+    if feature_type in ["demand", "cost"]:
+        # Create a seasonal pattern with peak in summer (period 6-7) and trough in winter (period 0-1)
+        seasonal_amplitude = 0.15  # 15% seasonal variation
+        seasonal_factor = 1 + seasonal_amplitude * math.sin(
+            2 * math.pi * (time_period - 3) / 12
+        )
+
+    # Add random variation
+    random_factor = 1 + rng.uniform(
+        -config["max_change"], config["max_change"], size=base_values.shape
+    )
+
+    return base_values * trend_factor * seasonal_factor * random_factor
+
+
+def period_columns(time_period, seed, node_inputs, node_sources, edge_sources):
+    """
+    Compute the columns that vary in one period. The result only depends on the arguments, so a period comes out
+    bit for bit the same whichever process computes it.
+
+    Args:
+        time_period: Index of the period
+        seed: Seed of the period's own RNG stream
+        node_inputs: [(column, feature type, slots, base values)] of the node attributes, see
+            SupplyChainGenerator._temporal_node_inputs
+        node_sources: {column: values} the node columns start from, values outside the slots are kept
+        edge_sources: {column: (feature type, values)} the edge columns vary from
+
+    Returns:
+        (node_values, edge_values): dicts mapping a column name to its values for the period
+    """
+    rng = np.random.default_rng(seed)
+
+    node_values = {}
+    for attribute, feature_type, slots, base_values in node_inputs:
+        if attribute not in node_values:
+            node_values[attribute] = np.array(node_sources[attribute], dtype=float)
+        node_values[attribute][slots] = temporal_variation(
+            base_values, feature_type, time_period, rng
+        )
+
+    edge_values = {
+        attribute: temporal_variation(values, feature_type, time_period, rng)
+        for attribute, (feature_type, values) in edge_sources.items()
+    }
+    return node_values, edge_values
+
+
+_period_worker_inputs = None  # (node_inputs, node_sources, edge_sources) shared by the tasks of a worker process
+
+
+def _init_period_worker(node_inputs, node_sources, edge_sources):
+    global _period_worker_inputs
+    _period_worker_inputs = (node_inputs, node_sources, edge_sources)
+
+
+def _period_worker(task):
+    time_period, seed = task
+    return period_columns(time_period, seed, *_period_worker_inputs)
+
+
+class PartPool:
+    """
+    Pool of part records with O(1) insertion, removal and membership tests, sampled uniformly without building a
+    filtered list of the parts. Used to hand out the parts that still need a warehouse.
+    """
+
+    def __init__(self, rng, parts=()):
+        self._rng = rng
+        self._parts = []
+        self._positions = {}  # part id : index in self._parts
+        for part in parts:
+            self.add(part)
+
+    def add(self, part):
+        if part["id"] not in self._positions:
+            self._positions[part["id"]] = len(self._parts)
+            self._parts.append(part)
+
+    def remove(self, part):
+        position = self._positions.pop(part["id"], None)
+        if position is None:
+            return
+        last = self._parts.pop()
+        if position < len(self._parts):
+            self._parts[position] = last
+            self._positions[last["id"]] = position
+
+    def sample(self, k):
+        """Up to `k` distinct parts drawn uniformly from the pool"""
+        return self._rng.sample(self._parts, min(k, len(self._parts)))
+
+    def __contains__(self, part_id):
+        return part_id in self._positions
+
+    def __len__(self):
+        return len(self._parts)
 
 
 class SupplyChainGenerator:
-    def __init__(self, total_variable_nodes=1000, base_periods=12, version="NSS_V1"):
+    def __init__(self, total_variable_nodes=1000, base_periods=12, version="NSS_V1",
+                 snapshot_cache_size=DEFAULT_CACHE_SIZE, lazy_periods=False, workers=1, seed=None,
+                 cache_dir=None, op_log_dir=None, op_log_segment_size=DEFAULT_SEGMENT_SIZE, coalesce_updates=False,
+                 op_log=None, simulation_op_log=None, checkpoint_every=None):
         self.sel_parts = set()
-        self.G = nx.DiGraph()
+        self.G = EntityGraph()  # entity nodes are views over the records of the lists below
         self.temporal_graphs = {}
         self.simulation_graphs = {}
         self.temporal_simulation_graphs = {}
         self.temporal_data = {}
+        self.snapshot_cache_size = snapshot_cache_size  # Materialized snapshots kept per graph store
+        self.lazy_periods = lazy_periods  # Produce the periods when they are first read instead of up front
+        self._unlogged_periods = {}  # lazy period : timestamp its update operations are logged under
+        self.checkpoint_every = checkpoint_every  # Keep the columns of every K-th period only (see _store_period)
+        self._replay_slots = None
+        self.workers = workers  # Processes used to generate the periods (1 generates them in this process)
 
         self.FIXED_BUSINESS_GROUPS = 1
         self.FIXED_PRODUCT_FAMILIES = 4
@@ -33,254 +171,391 @@ class SupplyChainGenerator:
         self.product_offering_subassemblies = {}
         self.subassembly_raw_materials = {}
 
-        self.operations_log = []  # List to store all create/update operations
-        self.simulation_log = []  # List to store all simulation operations
-
         self.version = version
 
-        self.create_ops = defaultdict(
-            list
-        )  # timestamp : [create operations in that timestamp]
-        self.update_ops = defaultdict(
-            list
-        )  # timestamp : [update operations in that timestamp]
-
-
-        self.create_simulation_ops = defaultdict(
-            list
-        )  # timestamp : [create operations in that timestamp]
-        self.update_simulation_ops = defaultdict(
-            list
-        )  # timestamp : [update operations in that timestamp]
+        # Sinks of all create/update operations (see operation_log.py). By default columnar logs indexed by
+        # timestamp; with an op_log_dir, full segments of op_log_segment_size operations are written to disk
+        self.coalesce_updates = coalesce_updates  # Return one update per entity and timestamp (final values)
+        if op_log is None:
+            op_log = OperationLog(op_log_dir, op_log_segment_size)
+        if simulation_op_log is None:
+            simulation_op_log = OperationLog(op_log_dir, op_log_segment_size)
+        self.operations_log = op_log
+        self.simulation_log = simulation_op_log
+        for sink in (self.operations_log, self.simulation_log):
+            sink.bind(self.ids, version)
 
 
         self.timestamp = 0
 
         self.simulation_timestamp = 0
 
+        # Master seed (drawn from the module level random state when not given) and the independent random streams
+        # derived from it, one per subsystem so that none of them shifts the draws of another
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self._seed_streams(self.seed)
+
+        # On-disk cache of the generated data, simulations and LP solutions, keyed by (seed, config hash)
+        self.artifact_cache = ArtifactCache(cache_dir) if cache_dir else None
+        self.config_key = config_hash(
+            {
+                "total_variable_nodes": total_variable_nodes,
+                "base_periods": base_periods,
+                "version": version,
+            }
+        )
+        self._cache_lineage = ()  # cached steps that led to the current state, None once it changed otherwise
+
+    def _seed_streams(self, seed):
+        """Derive the topology, temporal, simulation and disaster random streams from the master seed"""
+        topology, temporal, simulation, disaster = np.random.SeedSequence(seed).spawn(4)
+        self.topology_random = random.Random(int(topology.generate_state(1, np.uint64)[0]))
+        self.temporal_rng = np.random.default_rng(temporal)
+        self.simulation_rng = np.random.default_rng(simulation)
+        self.disaster_random = random.Random(int(disaster.generate_state(1, np.uint64)[0]))
+
+    # Settings of this session that are not part of a cached artifact
+    _SESSION_ATTRIBUTES = (
+        "artifact_cache", "workers", "snapshot_cache_size", "lazy_periods", "coalesce_updates", "checkpoint_every"
+    )
+
+    def _cached_step(self, name, step):
+        """
+        Run `step()` or restore the generator state it produced from the artifact cache. Only steps taken from a
+        state reached through cached steps (starting with a new generator) can be cached, as the key doesn't cover
+        changes made in any other way.
+        """
+        if (
+                self.artifact_cache is None
+                or self._cache_lineage is None
+                or self.lazy_periods
+                or self.checkpoint_every
+                or not self._op_logs_cacheable()
+        ):
+            step()
+            self._cache_lineage = None
+            return
+
+        lineage = self._cache_lineage + (name,)
+        found, state = self.artifact_cache.load(self.seed, self.config_key, "-".join(lineage))
+        if found:
+            self.__dict__.update(state)
+            for store in (self.temporal_graphs, self.temporal_simulation_graphs):
+                if isinstance(store, SnapshotStore):
+                    store.cache_size = self.snapshot_cache_size
+        else:
+            step()
+            state = {
+                key: value for key, value in self.__dict__.items() if key not in self._SESSION_ATTRIBUTES
+            }
+            state["_cache_lineage"] = lineage
+            self.artifact_cache.store(self.seed, self.config_key, "-".join(lineage), state)
+        self._cache_lineage = lineage
+
+    def _op_logs_cacheable(self):
+        """Only in memory logs are part of the cached state (spilled segments and streamed operations are not)"""
+        return all(
+            type(sink) is OperationLog and sink.directory is None
+            for sink in (self.operations_log, self.simulation_log)
+        )
+
+    def flush_operations(self):
+        """Hand the pending operations to the sinks (streaming sinks forward their partial batch)"""
+        self.operations_log.flush()
+        self.simulation_log.flush()
+
+    def _cached_solution(self, name, inputs, solve):
+        """Solution of an LP, cached under a hash of its inputs"""
+        if self.artifact_cache is None:
+            return solve()
+        return self.artifact_cache.get_or_create(
+            self.seed, self.config_key, f"{name}-{content_hash(inputs)}", solve
+        )
+
     def _log_simulation_node_operation(self, action, node_id, node_type, properties):
         """Log node creation/update operations"""
-        operation = {
-            "action": action,
-            "type": "schema",
-            "payload": {
-                "node_id": node_id,
-                "node_type": node_type,
-                "properties": properties,
-            },
-            "timestamp": self.simulation_timestamp,
-            "version": self.version,
-        }
-        self.simulation_log.append(operation)
-
         if action == "create":
-            self.create_simulation_ops[self.simulation_timestamp].append(operation)
-        elif action == "update":
-            self.update_simulation_ops[self.simulation_timestamp].append(operation)
+            properties = snapshot_properties(properties)
+        self.simulation_log.log_node(action, self.simulation_timestamp, node_id, node_type, properties)
 
     def _log_simulation_edge_operation(
         self, action, source_id, target_id, properties, edge_type
     ):
         """Log edge creation/update operations"""
-        operation = {
-            "action": action,
-            "type": "schema",
-            "payload": {
-                "source_id": source_id,
-                "target_id": target_id,
-                "edge_type": edge_type,
-                "properties": properties,
-            },
-            "timestamp": self.simulation_timestamp,
-            "version": self.version,
-        }
-        self.simulation_log.append(operation)
-
         if action == "create":
-            self.create_simulation_ops[self.simulation_timestamp].append(operation)
-        elif action == "update":
-            self.update_simulation_ops[self.simulation_timestamp].append(operation)
-        # print("The edge operation is : ",operation)
+            properties = snapshot_properties(properties)
+        self.simulation_log.log_edge(action, self.simulation_timestamp, source_id, target_id, edge_type, properties)
 
-    def _log_node_operation(self, action, node_id, node_type, properties):
+    def _log_node_operation(self, action, node_id, node_type, properties, timestamp=None):
         """Log node creation/update operations"""
-        operation = {
-            "action": action,
-            "type": "schema",
-            "payload": {
-                "node_id": node_id,
-                "node_type": node_type,
-                "properties": properties,
-            },
-            "timestamp": self.timestamp,
-            "version": self.version,
-        }
-        self.operations_log.append(operation)
-
+        if timestamp is None:
+            timestamp = self.timestamp
         if action == "create":
-            self.create_ops[self.timestamp].append(operation)
-        elif action == "update":
-            self.update_ops[self.timestamp].append(operation)
+            properties = snapshot_properties(properties)
+        self.operations_log.log_node(action, timestamp, node_id, node_type, properties)
 
-    def _log_edge_operation(self, action, source_id, target_id, properties, edge_type):
+    def _log_edge_operation(self, action, source_id, target_id, properties, edge_type, timestamp=None):
         """Log edge creation/update operations"""
-        operation = {
-            "action": action,
-            "type": "schema",
-            "payload": {
-                "source_id": source_id,
-                "target_id": target_id,
-                "edge_type": edge_type,
-                "properties": properties,
-            },
-            "timestamp": self.timestamp,
-            "version": self.version,
-        }
-        self.operations_log.append(operation)
+        if timestamp is None:
+            timestamp = self.timestamp
         if action == "create":
-            self.create_ops[self.timestamp].append(operation)
-        elif action == "update":
-            self.update_ops[self.timestamp].append(operation)
-        # print("The edge operation is : ",operation)
+            properties = snapshot_properties(properties)
+        self.operations_log.log_edge(action, timestamp, source_id, target_id, edge_type, properties)
 
     def return_operation(self):
-        return self.operations_log
+        self._log_pending_periods()
+        return self.operations_log.view()
 
     def return_create_operations(self):
-        return self.create_ops
+        """{timestamp: view of the create operations of that timestamp}"""
+        return self.operations_log.operations("create")
 
     def return_update_operations(self):
-        return self.update_ops
+        """{timestamp: view of the update operations of that timestamp}"""
+        self._log_pending_periods()
+        return self.operations_log.operations("update", coalesce=self.coalesce_updates)
+
+    def _log_pending_periods(self):
+        """Produce the lazy periods that haven't logged their update operations yet"""
+        if not self.lazy_periods:
+            return
+        for period in sorted(self._unlogged_periods):
+            self.temporal_graphs.columns(period)
+        self.flush_operations()
+
+    def _stream_pending_periods(self):
+        """
+        Log the lazy periods right away when the operations are streamed: a streaming sink doesn't keep them, so
+        nothing reads them back later to log the periods that were never read (see return_update_operations)
+        """
+        if self.operations_log.enabled and not isinstance(self.operations_log, OperationLog):
+            self._log_pending_periods()
+
+    def return_operations_log(self, simulation=False):
+        """The operations log (the simulation log with `simulation`) holding every operation, to save it"""
+        if not simulation:
+            self._log_pending_periods()
+        return self.simulation_log if simulation else self.operations_log
 
     def return_simulate_create_operations(self):
-        return self.create_simulation_ops
+        return self.simulation_log.operations("create")
 
     def return_simulate_update_operations(self):
-        return self.update_simulation_ops
+        return self.simulation_log.operations("update", coalesce=self.coalesce_updates)
 
-    def simulate_next_period(self):
+    def simulate_next_period(self, node_inputs=None):
         """Generate data for the next time period based on the last period's data"""
+        self._cache_lineage = None
         last_period = max(self.temporal_graphs.keys())
         next_period = last_period + 1
 
-        # Get the last period's graph as base
-        base_graph = self.temporal_graphs[last_period].copy()
         current_date = BASE_DATE + timedelta(days=30 * next_period)
-        period_data = {"date": current_date}
 
-        # Update node attributes for the new period
-        self._update_period_attributes(base_graph, next_period, period_data)
+        # Update node attributes for the new period, edges vary from the last period's values
+        produce = self._period_producer(
+            next_period, last_period, node_inputs or self._temporal_node_inputs(), self._period_seed()
+        )
 
         # Store the new period's data
-        self.temporal_graphs[next_period] = base_graph
-        self.temporal_data[next_period] = period_data
+        if self.lazy_periods and not self._is_checkpoint(next_period):
+            self.temporal_graphs.add_lazy_period(
+                next_period, produce, source=last_period, parent=last_period
+            )
+        else:
+            self._store_period(next_period, produce, last_period, parent=last_period)
+        self.temporal_data[next_period] = {"date": current_date}
         self.current_period = next_period
+        self._stream_pending_periods()
+        self.flush_operations()
 
         return next_period
 
     def simulate_multiple_periods(self, num_periods):
         """Generate data for multiple future periods"""
         new_periods = []
+        node_inputs = self._temporal_node_inputs()
         for _ in range(num_periods):
-            new_period = self.simulate_next_period()
+            new_period = self.simulate_next_period(node_inputs)
             new_periods.append(new_period)
         return new_periods
 
     def regenerate_all_periods(self):
         """Regenerate all periods from scratch"""
+        self._cache_lineage = None
+        self._log_pending_periods()
         self.temporal_graphs = {}
         self.temporal_data = {}
         self.current_period = 0
         self.generate_temporal_data()
+        self._stream_pending_periods()
 
-    def _update_period_attributes(self, graph, time_period, period_data):
-        """Update attributes for a new time period"""
-        # Update Business Group attributes
-        bg_revenue = self._generate_temporal_value(
-            self.business_group["revenue"], "revenue", time_period
-        )
-        graph.nodes[self.business_group["id"]]["revenue"] = bg_revenue
-        period_data["business_group_revenue"] = bg_revenue
+    def _temporal_node_groups(self):
+        """
+        Node attributes that vary between periods, grouped by the entities they are generated from.
 
-        # Update Product Family attributes
-        for family in self.product_families:
-            family_revenue = self._generate_temporal_value(
-                family["revenue"], "revenue", time_period
-            )
-            graph.nodes[family["id"]]["revenue"] = family_revenue
-            period_data[f"family_{family['id']}_revenue"] = family_revenue
-
-        # Update other node and edge attributes (similar to generate_temporal_data)
-        self._update_product_attributes(graph, time_period, period_data)
-        self._update_warehouse_attributes(graph, time_period, period_data)
-        self._update_supplier_attributes(graph, time_period, period_data)
-        self._update_part_attributes(graph, time_period, period_data)
-        self._update_edge_attributes(graph, time_period, period_data)
-
-    def _update_product_attributes(self, graph, time_period, period_data):
-        """Update product offering attributes"""
-        for offering in self.product_offerings:
-            offering_id = offering["id"]
-            new_cost = self._generate_temporal_value(
-                offering["cost"], "cost", time_period
-            )
-            new_demand = self._generate_temporal_value(
-                offering["demand"], "demand", time_period
+        Each entry is (log node type, records, [(graph attribute, feature type, log key), ...]). The base value of a
+        graph attribute is read from the record under the same key. Log keys other than the attribute must be listed
+        in `operation_log.GRAPH_ATTRIBUTES`, which maps them back when the updates are replayed.
+        """
+        return [
+            ("BUSINESS_GROUP", [self.business_group], [("revenue", "revenue", "revenue")]),
+            ("PRODUCT_FAMILY", self.product_families, [("revenue", "revenue", "revenue")]),
+            (
+                "PRODUCT_OFFERING",
+                self.product_offerings,
+                [("demand", "demand", "demand"), ("cost", "cost", "cost")],
+            ),
+            (
+                "WAREHOUSE",
+                sum(self.warehouses.values(), []),
+                [("current_capacity", "capacity", "capacity")],
+            ),
+            ("SUPPLIERS", self.suppliers, [("reliability", "reliability", "reliability")]),
+            ("PARTS", list(sum(self.parts.values(), deque())), [("cost", "cost", "cost")]),
+        ]
+
+    # Edge attributes that vary between periods: (graph attribute, feature type, log edge type)
+    TEMPORAL_EDGE_FEATURES = [
+        ("transportation_cost", "transportation_cost", "SUPPLIERSToWAREHOUSE"),
+        ("inventory_level", "inventory", "WAREHOUSEToPARTS"),
+    ]
+
+    def _temporal_node_inputs(self):
+        """
+        Base values the node attributes of a period vary from, read from the records once so that a lazy period is
+        produced from the same values whenever it is regenerated.
+
+        Returns:
+            list of (graph attribute, feature type, column slots, base values)
+        """
+        store = self.temporal_graphs
+        inputs = []
+        for _, records, features in self._temporal_node_groups():
+            ids = [record["id"] for record in records]
+            for attribute, feature_type, _ in features:
+                inputs.append((
+                    attribute,
+                    feature_type,
+                    store.node_slots(attribute, ids),
+                    np.asarray([record[attribute] for record in records], dtype=float),
+                ))
+        return inputs
+
+    def _period_seed(self):
+        """Draw the RNG seed of a new period from the temporal stream"""
+        return int(self.temporal_rng.integers(2 ** 63))
+
+    def _period_producer(self, time_period, source_period, node_inputs, seed, units_in_chain=None,
+                         log_timestamp=None):
+        """
+        Build the function producing the columns of a period. Every period draws from its own RNG `seed`, so the
+        period comes out the same each time it is produced. With a `log_timestamp` the update operations of the period
+        are logged under it the first time it is produced.
+
+        The function takes the varying columns as an optional argument when they were already computed by
+        `period_columns` in a worker process.
+        """
+        if log_timestamp is not None:
+            self._unlogged_periods[time_period] = log_timestamp
+
+        def produce(columns=None):
+            node_values, edge_values = self._update_period_attributes(
+                time_period, seed, source_period, node_inputs, columns
             )
-            graph.nodes[offering_id]["cost"] = new_cost
-            graph.nodes[offering_id]["demand"] = new_demand
-            period_data[f"offering_{offering_id}_cost"] = new_cost
-            period_data[f"offering_{offering_id}_demand"] = new_demand
-
-    def _update_warehouse_attributes(self, graph, time_period, period_data):
-        """Update warehouse attributes"""
-        for warehouse_type, warehouses in self.warehouses.items():
-            for warehouse in warehouses:
-                warehouse_id = warehouse["id"]
-                new_capacity = self._generate_temporal_value(
-                    warehouse["current_capacity"], "capacity", time_period
+            if units_in_chain is not None:
+                node_values["units_in_chain"] = self.temporal_graphs.fit_node_column("units_in_chain", units_in_chain)
+            if time_period in self._unlogged_periods:
+                self._log_period_updates(
+                    node_values, edge_values, self._unlogged_periods.pop(time_period)
                 )
-                graph.nodes[warehouse_id]["current_capacity"] = new_capacity
-                period_data[f"warehouse_{warehouse_id}_capacity"] = new_capacity
+            return node_values, edge_values
 
-    def _update_supplier_attributes(self, graph, time_period, period_data):
-        """Update supplier attributes"""
-        for supplier in self.suppliers:
-            supplier_id = supplier["id"]
-            new_reliability = self._generate_temporal_value(
-                supplier["reliability"], "reliability", time_period
+        return produce
+
+    def _period_sources(self, source_period, node_inputs):
+        """Columns of `source_period` a new period varies from, in the form `period_columns` takes them"""
+        store = self.temporal_graphs
+        node_sources = {
+            attribute: store.node_values(source_period, attribute)
+            for attribute, _, _, _ in node_inputs
+        }
+        edge_sources = {
+            attribute: (feature_type, store.edge_values(source_period, attribute))
+            for attribute, feature_type, _ in self.TEMPORAL_EDGE_FEATURES
+        }
+        return node_sources, edge_sources
+
+    def _update_period_attributes(self, time_period, seed, source_period=0, node_inputs=None, columns=None):
+        """
+        Generate the attributes that change in a new time period as columns of the temporal graph store.
+
+        Node attributes vary from the base values held by the generator (or `node_inputs`, see
+        `_temporal_node_inputs`), edge attributes vary from their values in `source_period`. Columns of
+        `source_period` that don't vary are shared with the new period.
+
+        Returns:
+            (node_values, edge_values): dicts mapping a column name to its values for the period
+        """
+        store = self.temporal_graphs
+        if node_inputs is None:
+            node_inputs = self._temporal_node_inputs()
+        if columns is None:
+            columns = period_columns(
+                time_period, seed, node_inputs, *self._period_sources(source_period, node_inputs)
             )
-            graph.nodes[supplier_id]["reliability"] = new_reliability
-            period_data[f"supplier_{supplier_id}_reliability"] = new_reliability
-
-    def _update_part_attributes(self, graph, time_period, period_data):
-        """Update part attributes"""
-        # current_date = BASE_DATE + timedelta(days=30 * time_period)
-        for part_type, parts in self.parts.items():
-            for part in parts:
-                part_id = part["id"]
-                new_cost = self._generate_temporal_value(
-                    part["cost"], "cost", time_period
-                )
-                graph.nodes[part_id]["cost"] = new_cost
-                period_data[f"part_{part_id}_cost"] = new_cost
-
-    def _update_edge_attributes(self, graph, time_period, period_data):
-        """Update edge attributes"""
-        for u, v, attrs in graph.edges(data=True):
-            if "transportation_cost" in attrs:
-                new_transport_cost = self._generate_temporal_value(
-                    attrs["transportation_cost"], "transportation_cost", time_period
-                )
-                graph.edges[u, v]["transportation_cost"] = new_transport_cost
-                period_data[f"edge_{u}_{v}_transport_cost"] = new_transport_cost
+        node_values, edge_values = columns
 
-            if "inventory_level" in attrs:
-                new_inventory = self._generate_temporal_value(
-                    attrs["inventory_level"], "inventory", time_period
-                )
-                graph.edges[u, v]["inventory_level"] = new_inventory
-                period_data[f"edge_{u}_{v}_inventory"] = new_inventory
+        for attribute in store.node_columns:
+            if attribute not in node_values:
+                node_values[attribute] = store.node_values(source_period, attribute)
+
+        return node_values, edge_values
+
+    def _pooled_period_columns(self, tasks, node_inputs):
+        """
+        Compute the varying columns of `(time period, seed)` tasks deriving from period 0 in a process pool. The
+        shared inputs are sent once per worker and only the columns come back, in task order.
+        """
+        node_sources, edge_sources = self._period_sources(0, node_inputs)
+        with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_period_worker,
+                initargs=(node_inputs, node_sources, edge_sources),
+        ) as pool:
+            return list(pool.map(_period_worker, tasks))
+
+    def _period_data(self, period):
+        """Flat view of the values that changed in a period, keyed like the temporal data dictionaries"""
+        store = self.temporal_graphs
+        period_data = dict(self.temporal_data[period])
+        period_data["business_group_revenue"] = store.node_values(
+            period, "revenue"
+        )[store.node_slots("revenue", [self.business_group["id"]])][0].item()
+
+        keys = [
+            ("revenue", self.product_families, "family_{}_revenue"),
+            ("cost", self.product_offerings, "offering_{}_cost"),
+            ("demand", self.product_offerings, "offering_{}_demand"),
+            ("current_capacity", sum(self.warehouses.values(), []), "warehouse_{}_capacity"),
+            ("reliability", self.suppliers, "supplier_{}_reliability"),
+            ("cost", list(sum(self.parts.values(), deque())), "part_{}_cost"),
+        ]
+        for attribute, records, key in keys:
+            ids = [record["id"] for record in records]
+            values = store.node_values(period, attribute)[store.node_slots(attribute, ids)]
+            for record_id, value in zip(ids, values.tolist()):
+                period_data[key.format(record_id)] = value
+
+        edge_keys = [
+            ("transportation_cost", "edge_{}_{}_transport_cost"),
+            ("inventory_level", "edge_{}_{}_inventory"),
+        ]
+        for attribute, key in edge_keys:
+            values = store.edge_values(period, attribute).tolist()
+            for (u, v), value in zip(store.edge_holder_pairs(attribute), values):
+                period_data[key.format(u, v)] = value
+
+        return period_data
 
     def basic_storage_structures(self):
         # Here the basic values of all the nodes are stored
@@ -292,6 +567,22 @@ class SupplyChainGenerator:
         self.product_families = []
         self.business_group = None
         self.data = {}  # Store all data for easy export
+        self.entity_index = {}  # key : node id, value : the record of the entity (same object as in the lists above)
+        self.ids = IdTable()  # node id <-> int32 code, used by the internal maps (LP variables)
+
+    def index_entity(self, record):
+        """Register an entity record under its id, call it whenever a record is added to the storage lists"""
+        self.entity_index[record["id"]] = record
+        self.ids.intern(record["id"])
+        if isinstance(self.temporal_graphs, TemporalGraphStore):
+            # Added after the periods were generated: give it column slots so the next periods vary it
+            self.temporal_graphs.add_node(record["id"], record)
+        # A record added after generation (Supply Chain Manager page) isn't covered by the cache keys
+        self._cache_lineage = None
+
+    def get_entity(self, entity_id):
+        """Return the record of an entity by id (None if unknown)"""
+        return self.entity_index.get(entity_id)
 
     def cost_propagation_rm_to_sa(self):
         self.cost_rm = {}  # To store the cost of all the raw materials
@@ -484,8 +775,12 @@ class SupplyChainGenerator:
 
 
     def generate_data(self):
-        """Generate all supply chain data"""
+        """Generate all supply chain data (restored from the artifact cache when it was generated before)"""
+        self._cached_step("generate_data", self._generate_data)
+        self._stream_pending_periods()
+        self.flush_operations()
 
+    def _generate_data(self):
         # Static Schema creation
         self._generate_business_hierarchy()
         self._generate_suppliers()
@@ -513,176 +808,186 @@ class SupplyChainGenerator:
             "parts": sum(self.parts.values(), deque()),
         }
 
-    def _generate_temporal_value(self, base_value, feature_type, time_period):
+    def _generate_temporal_values(self, base_values, feature_type, time_period):
         """
-        Generate temporal value incorporating both trend and seasonality
+        Generate the temporal values of a whole array of base values for one time period of the simulation
 
         Args:
-            base_value: Initial value
+            base_values: Initial values
             feature_type: Type of feature (cost, demand, etc.)
             time_period: Current time period (0-11 for months)
         """
-        config = TEMPORAL_VARIATION.get(feature_type, {"max_change": 0.1, "trend": 0})
-
-        # Add trend component
-        trend_factor = 1 + (config["trend"] * time_period)
-
-        # Add seasonal component for relevant features
-        seasonal_factor = 1.0
-        if feature_type in ["demand", "cost"]:
-            # Create a seasonal pattern with peak in summer (period 6-7) and trough in winter (period 0-1)
-            seasonal_amplitude = 0.15  # 15% seasonal variation
-            seasonal_factor = 1 + seasonal_amplitude * math.sin(
-                2 * math.pi * (time_period - 3) / 12
-            )
-
-        # Add random variation
-        random_factor = 1 + random.uniform(-config["max_change"], config["max_change"])
-
-        return base_value * trend_factor * seasonal_factor * random_factor
+        return temporal_variation(base_values, feature_type, time_period, self.simulation_rng)
 
     def generate_temporal_data(self):
-        """Generate temporal data and graph snapshots for all time periods with dynamic attributes"""
-        base_graph = self.G.copy()
-        self.temporal_graphs[0] = base_graph
+        """
+        Generate temporal data and graph snapshots for all time periods with dynamic attributes.
 
+        With `lazy_periods` only the seed of each period is kept here, its columns are produced (and its update
+        operations logged) the first time the period is read. Otherwise the periods are computed up front, in a pool
+        of `workers` processes when there is more than one.
+        """
+        self._log_pending_periods()
+        self.temporal_graphs = TemporalGraphStore(self.G, cache_size=self.snapshot_cache_size)
+        self.temporal_graphs.add_period(0)
+        self._replay_slots = None
+
+        node_inputs = self._temporal_node_inputs()
+        parts = list(sum(self.parts.values(), deque()))
+        units_in_chain = self.temporal_graphs.node_base_values("units_in_chain").copy()
+        units_in_chain[
+            self.temporal_graphs.node_slots("units_in_chain", [part["id"] for part in parts])
+        ] = [part["units_in_chain"] + 1 for part in parts]
+
+        pending = []
         for time_period in range(1, self.base_periods):
             current_date = BASE_DATE + timedelta(days=30 * time_period)
             self.timestamp += 1
-            period_data = {"date": current_date}
 
-            # Create a new graph snapshot for this period
-            period_graph = base_graph.copy()
-
-            # Update Business Group attributes
-            bg_revenue = self._generate_temporal_value(
-                self.business_group["revenue"], "revenue", time_period
-            )
-            period_graph.nodes[self.business_group["id"]]["revenue"] = bg_revenue
-            changes = {"revenue": bg_revenue}
-            self._log_node_operation(
-                "update", self.business_group["id"], "BUSINESS_GROUP", changes
+            seed = self._period_seed()
+            produce = self._period_producer(
+                time_period, 0, node_inputs, seed, units_in_chain, log_timestamp=self.timestamp
             )
-            period_data["business_group_revenue"] = bg_revenue
-
-            # Update Product Family attributes
-            for family in self.product_families:
-                family_revenue = self._generate_temporal_value(
-                    family["revenue"], "revenue", time_period
-                )
-                period_graph.nodes[family["id"]]["revenue"] = family_revenue
-                changes = {"revenue": family_revenue}
-                self._log_node_operation(
-                    "update", family["id"], "PRODUCT_FAMILY", changes
-                )
-                period_data[f"family_{family['id']}_revenue"] = family_revenue
-
-            # Update Product Offering attributes
-            for offering in self.product_offerings:
-                offering_id = offering["id"]
-                # Update cost with seasonality
-                new_cost = self._generate_temporal_value(
-                    offering["cost"], "cost", time_period
-                )
-                period_graph.nodes[offering_id]["cost"] = new_cost
-
-                # Update demand with seasonality
-                new_demand = self._generate_temporal_value(
-                    offering["demand"], "demand", time_period
-                )
-                period_graph.nodes[offering_id]["demand"] = new_demand
-
-                changes = {"demand": new_demand, "cost": new_cost}
-                self._log_node_operation(
-                    "update", offering_id, "PRODUCT_OFFERING", changes
-                )
-
-                period_data[f"offering_{offering_id}_cost"] = new_cost
-                period_data[f"offering_{offering_id}_demand"] = new_demand
-
-            # Update Warehouse attributes
-            for warehouse_type, warehouses in self.warehouses.items():
-                for warehouse in warehouses:
-                    warehouse_id = warehouse["id"]
-                    # Update current capacity
-                    new_capacity = self._generate_temporal_value(
-                        warehouse["current_capacity"], "capacity", time_period
-                    )
-
-                    changes = {"capacity": new_capacity}
-                    self._log_node_operation(
-                        "update", warehouse_id, "WAREHOUSE", changes
-                    )
-
-                    period_graph.nodes[warehouse_id]["current_capacity"] = new_capacity
-                    period_data[f"warehouse_{warehouse_id}_capacity"] = new_capacity
-
-            # Update Supplier attributes
-            for supplier in self.suppliers:
-                supplier_id = supplier["id"]
-                new_reliability = self._generate_temporal_value(
-                    supplier["reliability"], "reliability", time_period
-                )
-
-                changes = {"reliability": new_reliability}
 
-                self._log_node_operation("update", supplier_id, "SUPPLIERS", changes)
-                period_graph.nodes[supplier_id]["reliability"] = new_reliability
-                period_data[f"supplier_{supplier_id}_reliability"] = new_reliability
-
-            # Update Part attributes
-            for part_type, parts in self.parts.items():
-                for part in parts:
-                    part_id = part["id"]
-                    new_cost = self._generate_temporal_value(
-                        part["cost"], "cost", time_period
-                    )
-
-
-                    new_units_in_chain = part['units_in_chain'] + 1
-                    changes = {'cost': new_cost, 'units_in_chain': new_units_in_chain}
-                    self._log_node_operation("update", part_id, "PARTS", changes)
-
-                    period_graph.nodes[part_id]['cost'] = new_cost
-                    period_graph.nodes[part_id]['units_in_chain'] = new_units_in_chain
-
-                    period_data[f"part_{part_id}_cost"] = new_cost
-
-            # Update edge attributes
-            for u, v, attrs in period_graph.edges(data=True):
-                if "transportation_cost" in attrs:
-                    new_transport_cost = self._generate_temporal_value(
-                        attrs["transportation_cost"], "transportation_cost", time_period
-                    )
-                    changes = {"transportation_cost": new_transport_cost}
-                    self._log_edge_operation(
-                        "update", u, v, changes, "SUPPLIERSToWAREHOUSE"
-                    )
-
-                    period_graph.edges[u, v]["transportation_cost"] = new_transport_cost
-                    period_data[f"edge_{u}_{v}_transport_cost"] = new_transport_cost
+            # Store both the period's columns and the period data
+            if self.lazy_periods and not self._is_checkpoint(time_period):
+                self.temporal_graphs.add_lazy_period(time_period, produce, source=0)
+            else:
+                pending.append((time_period, seed, produce, self.timestamp))
+            self.temporal_data[time_period] = {"date": current_date}
+
+        # Every period only depends on period 0 and its own seed, so they can be computed in any process and order
+        if self.workers > 1 and len(pending) > 1:
+            columns = self._pooled_period_columns(
+                [(time_period, seed) for time_period, seed, _, _ in pending], node_inputs
+            )
+        else:
+            columns = [None] * len(pending)
+        for (time_period, _, produce, timestamp), period_values in zip(pending, columns):
+            self._store_period(time_period, produce, 0, log_timestamp=timestamp, columns=period_values)
 
-                if "inventory_level" in attrs:
-                    new_inventory = self._generate_temporal_value(
-                        attrs["inventory_level"], "inventory", time_period
-                    )
+    def _is_checkpoint(self, time_period):
+        return bool(self.checkpoint_every) and time_period % self.checkpoint_every == 0
 
-                    changes = {"inventory_level": new_inventory}
-                    self._log_edge_operation(
-                        "update", u, v, changes, "WAREHOUSEToPARTS"
-                    )
+    def _store_period(self, time_period, produce, source_period, parent=None, log_timestamp=None, columns=None):
+        """
+        Produce a period and add it to the temporal graph store.
 
-                    period_graph.edges[u, v]["inventory_level"] = new_inventory
-                    period_data[f"edge_{u}_{v}_inventory"] = new_inventory
+        With `checkpoint_every` only the checkpoints (every K-th period) keep their columns. The periods in between
+        are rebuilt when they are read: from the update operations logged for them under `log_timestamp` when the
+        operations log keeps them, by producing them again otherwise (from the last checkpoint for periods chained to
+        the previous one). The last rebuilt periods are kept like lazy periods, up to `snapshot_cache_size`.
+        """
+        values = produce(columns)
+        if not self.checkpoint_every or self._is_checkpoint(time_period):
+            self.temporal_graphs.add_period(time_period, *values, parent=parent)
+            return
+
+        rebuild = produce
+        if log_timestamp is not None and isinstance(self.operations_log, OperationLog):
+            def rebuild():
+                return self._replay_period(log_timestamp)
+        self.temporal_graphs.add_lazy_period(
+            time_period, rebuild, source=source_period, parent=parent, values=values
+        )
 
-            # Store both the complete graph snapshot and the period data
-            self.temporal_graphs[time_period] = period_graph
-            self.temporal_data[time_period] = period_data
+    def _replay_period(self, timestamp):
+        """
+        Columns of a period rebuilt from the update operations `_log_period_updates` logged for it under `timestamp`.
+        Only the periods varying from period 0 are logged, so the columns start from the base values of the store.
+        """
+        store = self.temporal_graphs
+        node_slots, edge_slots = self._period_replay_slots()
+        kinds = self.operations_log.kinds
+
+        node_updates = defaultdict(lambda: ([], []))
+        edge_updates = defaultdict(lambda: ([], []))
+        key = (ACTION_CODES["update"], timestamp)
+        for segment in self.operations_log.segments(key):
+            source, target, offset, properties = segment.source, segment.target, segment.offset, segment.properties
+            for row in segment.rows[key]:
+                changes = properties[offset[row]]
+                if target[row] == NO_TARGET:
+                    node_type = kinds[segment.kind[row]]
+                    for log_key, value in changes.items():
+                        attribute = graph_attribute(node_type, log_key)
+                        slots, values = node_updates[attribute]
+                        slots.append(node_slots[attribute][source[row]])
+                        values.append(value)
+                else:
+                    pair = (source[row], target[row])
+                    for attribute, value in changes.items():
+                        slots, values = edge_updates[attribute]
+                        slots.append(edge_slots[attribute][pair])
+                        values.append(value)
+
+        node_values = {}
+        for attribute, (slots, values) in node_updates.items():
+            node_values[attribute] = store.node_base_values(attribute).copy()
+            node_values[attribute][slots] = values
+        edge_values = {}
+        for attribute, (slots, values) in edge_updates.items():
+            edge_values[attribute] = store.edge_base_values(attribute).copy()
+            edge_values[attribute][slots] = values
+        return node_values, edge_values
+
+    def _period_replay_slots(self):
+        """
+        Column slots of the entities by their id codes (see IdTable): ({node column: {code: slot}},
+        {edge column: {(source code, target code): slot}}), computed again when nodes / edges were added to the store
+        """
+        store = self.temporal_graphs
+        if self._replay_slots is None or self._replay_slots[0] != store.topology_changes:
+            code = self.ids.code
+            node_slots = {
+                column: {
+                    code(node_id): slot
+                    for slot, node_id in enumerate(store.node_holder_ids(column))
+                    if node_id in self.ids
+                }
+                for column in store.node_columns
+            }
+            edge_slots = {
+                column: {
+                    (code(u), code(v)): slot
+                    for slot, (u, v) in enumerate(store.edge_holder_pairs(column))
+                    if u in self.ids and v in self.ids
+                }
+                for column in store.edge_columns
+            }
+            self._replay_slots = (store.topology_changes, node_slots, edge_slots)
+        return self._replay_slots[1:]
+
+    def _log_period_updates(self, node_values, edge_values, timestamp=None):
+        """Log the update operations of a generated period, one per node / edge"""
+        if not self.operations_log.enabled:
+            return
+        store = self.temporal_graphs
+        for node_type, records, features in self._temporal_node_groups():
+            ids = [record["id"] for record in records]
+            keys = [(attribute, log_key) for attribute, _, log_key in features]
+            if node_type == "PARTS":
+                keys.append(("units_in_chain", "units_in_chain"))
+            columns = []
+            for attribute, log_key in keys:
+                # Nodes added after the period was generated have no slot (or one past its values): not logged
+                values = node_values[attribute].tolist()
+                slots = store.node_slots(attribute, ids, default=len(values)).tolist()
+                columns.append((log_key, [values[slot] if slot < len(values) else None for slot in slots]))
+            for i, record_id in enumerate(ids):
+                changes = {log_key: values[i] for log_key, values in columns if values[i] is not None}
+                if changes:
+                    self._log_node_operation("update", record_id, node_type, changes, timestamp)
+
+        for attribute, _, edge_type in self.TEMPORAL_EDGE_FEATURES:
+            values = edge_values[attribute].tolist()
+            for (u, v), value in zip(store.edge_holder_pairs(attribute), values):
+                self._log_edge_operation("update", u, v, {attribute: value}, edge_type, timestamp)
 
     def _generate_part_validity(self):
         """Generate valid_from and valid_till dates for parts"""
         valid_from = BASE_DATE
-        validity_months = random.randint(*PART_VALIDITY_RANGE)
+        validity_months = self.topology_random.randint(*PART_VALIDITY_RANGE)
         valid_till = valid_from + timedelta(days=30 * validity_months)
         return valid_from, valid_till
 
@@ -691,33 +996,34 @@ class SupplyChainGenerator:
         for size_category, count in self.supplier_distribution.items():
             size_range = SUPPLIER_SIZES[size_category]["range"]
             for _ in range(count):
-                size_value = random.randint(*size_range)
+                size_value = self.topology_random.randint(*size_range)
                 # Randomly assign part types this supplier can supply
                 supplied_types = []
-                if random.random() < 0.7:  # 70% chance to supply raw materials
+                if self.topology_random.random() < 0.7:  # 70% chance to supply raw materials
                     supplied_types.extend(
-                        random.sample(
-                            PART_TYPES["raw"], random.randint(1, len(PART_TYPES["raw"]))
+                        self.topology_random.sample(
+                            PART_TYPES["raw"], self.topology_random.randint(1, len(PART_TYPES["raw"]))
                         )
                     )
-                if random.random() < 0.3:  # 30% chance to supply subassemblies
+                if self.topology_random.random() < 0.3:  # 30% chance to supply subassemblies
                     supplied_types.extend(
-                        random.sample(
+                        self.topology_random.sample(
                             PART_TYPES["subassembly"],
-                            random.randint(1, len(PART_TYPES["subassembly"])),
+                            self.topology_random.randint(1, len(PART_TYPES["subassembly"])),
                         )
                     )
 
-                supplier_data = {
-                    "id": f"S_{counter:03d}",
-                    "name": f"Supplier_{counter}",
-                    "location": random.choice(LOCATIONS),
-                    "reliability": random.uniform(*RELIABILITY_RANGE),
-                    "size": size_value,
-                    "size_category": size_category,
-                    "supplied_part_types": supplied_types,
-                }
+                supplier_data = SupplierRecord(
+                    id=f"S_{counter:03d}",
+                    name=f"Supplier_{counter}",
+                    location=self.topology_random.choice(LOCATIONS),
+                    reliability=self.topology_random.uniform(*RELIABILITY_RANGE),
+                    size=size_value,
+                    size_category=size_category,
+                    supplied_part_types=supplied_types,
+                )
                 self.suppliers.append(supplier_data)
+                self.index_entity(supplier_data)
 
                 self._log_node_operation(
                     "create", supplier_data["id"], "SUPPLIERS", supplier_data
@@ -725,9 +1031,7 @@ class SupplyChainGenerator:
                 self._log_simulation_node_operation(
                     "create", supplier_data["id"], "SUPPLIERS", supplier_data
                 )
-                self.G.add_node(
-                    supplier_data["id"], **supplier_data, node_type="supplier"
-                )
+                self.G.add_entity(supplier_data, "supplier")
 
                 counter += 1
 
@@ -737,8 +1041,9 @@ class SupplyChainGenerator:
             "id": "BG_001",
             "name": BUSINESS_GROUP,
             "description": f"{BUSINESS_GROUP} Business Unit",
-            "revenue": random.uniform(*COST_RANGE),
+            "revenue": self.topology_random.uniform(*COST_RANGE),
         }
+        self.index_entity(self.business_group)
 
         # self.operations_log
         self._log_node_operation(
@@ -754,9 +1059,10 @@ class SupplyChainGenerator:
             pf_data = {
                 "id": f"PF_{i:03d}",
                 "name": pf,
-                "revenue": random.uniform(*COST_RANGE),
+                "revenue": self.topology_random.uniform(*COST_RANGE),
             }
             self.product_families.append(pf_data)
+            self.index_entity(pf_data)
             self._log_node_operation("create", pf_data["id"], "PRODUCT_FAMILY", pf_data)
             self._log_simulation_node_operation(
                 "create", pf_data["id"], "PRODUCT_FAMILY", pf_data
@@ -771,10 +1077,11 @@ class SupplyChainGenerator:
                     po_data = {
                         "id": f"PO_{po_counter:03d}",
                         "name": po,
-                        "cost": random.uniform(*COST_RANGE),
-                        "demand": random.randint(*DEMAND_RANGE),
+                        "cost": self.topology_random.uniform(*COST_RANGE),
+                        "demand": self.topology_random.randint(*DEMAND_RANGE),
                     }
                     self.product_offerings.append(po_data)
+                    self.index_entity(po_data)
                     self._log_node_operation(
                         "create", po_data["id"], "PRODUCT_OFFERING", po_data
                     )
@@ -792,21 +1099,22 @@ class SupplyChainGenerator:
         for w_type, count in self.warehouse_distribution.items():
             for _ in range(count):
                 # Distribute warehouse sizes evenly within each type
-                size_category = random.choice(["small", "medium", "large"])
+                size_category = self.topology_random.choice(["small", "medium", "large"])
                 capacity_range = WAREHOUSE_SIZES[size_category]["capacity"]
 
-                warehouse_data = {
-                    "id": f"W_{counter:03d}",
-                    "name": f"Warehouse_{counter}",
-                    "type": w_type,
-                    "location": random.choice(LOCATIONS),
-                    "size_category": size_category,
-                    "max_capacity": random.randint(*capacity_range),
-                    "current_capacity": 0,
-                    "safety_stock": random.randint(*SAFETY_STOCK_RANGE),
-                    "max_parts": WAREHOUSE_SIZES[size_category]["max_parts"],
-                }
+                warehouse_data = WarehouseRecord(
+                    id=f"W_{counter:03d}",
+                    name=f"Warehouse_{counter}",
+                    type=w_type,
+                    location=self.topology_random.choice(LOCATIONS),
+                    size_category=size_category,
+                    max_capacity=self.topology_random.randint(*capacity_range),
+                    current_capacity=0,
+                    safety_stock=self.topology_random.randint(*SAFETY_STOCK_RANGE),
+                    max_parts=WAREHOUSE_SIZES[size_category]["max_parts"],
+                )
                 self.warehouses[w_type].append(warehouse_data)
+                self.index_entity(warehouse_data)
                 # if warehouse_data["type"] == "supplier":
                 #     self.suw_safety_stock[warehouse_data["id"]] = warehouse_data[
                 #         "safety_stock"
@@ -815,9 +1123,7 @@ class SupplyChainGenerator:
                 #     self.saw_safety_stock[warehouse_data["id"]] = warehouse_data[
                 #         "safety_stock"
                 #     ]
-                self.G.add_node(
-                    warehouse_data["id"], **warehouse_data, node_type="warehouse"
-                )
+                self.G.add_entity(warehouse_data, "warehouse")
                 self._log_node_operation(
                     "create", warehouse_data["id"], "WAREHOUSE", warehouse_data
                 )
@@ -830,22 +1136,21 @@ class SupplyChainGenerator:
         counter = 1
         for f_type, count in self.facility_distribution.items():
             for _ in range(count):
-                facility_data = {
-                    "id": f"F_{counter:03d}",
-                    "name": f"Facility_{counter}",
-                    "type": f_type,
-                    "location": random.choice(LOCATIONS),
-                    "max_capacity": random.randint(*CAPACITY_RANGE),
-                    "operating_cost": random.uniform(*COST_RANGE),
-                }
+                facility_data = FacilityRecord(
+                    id=f"F_{counter:03d}",
+                    name=f"Facility_{counter}",
+                    type=f_type,
+                    location=self.topology_random.choice(LOCATIONS),
+                    max_capacity=self.topology_random.randint(*CAPACITY_RANGE),
+                    operating_cost=self.topology_random.uniform(*COST_RANGE),
+                )
 
                 self.opcost_facility[facility_data["id"]] = facility_data[
                     "operating_cost"
                 ]
                 self.facilities[f_type].append(facility_data)
-                self.G.add_node(
-                    facility_data["id"], **facility_data, node_type="facility"
-                )
+                self.index_entity(facility_data)
+                self.G.add_entity(facility_data, "facility")
                 self._log_node_operation(
                     "create", facility_data["id"], "FACILITY", facility_data
                 )
@@ -859,29 +1164,19 @@ class SupplyChainGenerator:
         for p_type, count in self.parts_distribution.items():
             for _ in range(count):
                 valid_from, valid_till = self._generate_part_validity()
-                subtype = random.choice(PART_TYPES[p_type])
-
-                part_data = {
-
-                    'id': f'P_{counter:03d}',
-                    'name': f'Part_{counter}',
-                    'type': p_type,
-                    'subtype': subtype,
-                    'cost': random.uniform(*COST_RANGE),
-                    'importance_factor': random.uniform(*IMPORTANCE_FACTOR_RANGE),
-                    'valid_from': valid_from,
-                    'valid_till': valid_till,
-                    'expiry': random.randint(*EXPIRY),
-                    'units_in_chain': random.randint(*UNITS_IN_CHAIN)
-
-                }
-
-                copy_part_data = part_data.copy()
-                copy_part_data["valid_from"] = copy_part_data["valid_from"].strftime(
-                    "%Y-%m-%d"
-                )
-                copy_part_data["valid_till"] = copy_part_data["valid_till"].strftime(
-                    "%Y-%m-%d"
+                subtype = self.topology_random.choice(PART_TYPES[p_type])
+
+                part_data = PartRecord(
+                    id=f'P_{counter:03d}',
+                    name=f'Part_{counter}',
+                    type=p_type,
+                    subtype=subtype,
+                    cost=self.topology_random.uniform(*COST_RANGE),
+                    importance_factor=self.topology_random.uniform(*IMPORTANCE_FACTOR_RANGE),
+                    valid_from=valid_from,
+                    valid_till=valid_till,
+                    expiry=self.topology_random.randint(*EXPIRY),
+                    units_in_chain=self.topology_random.randint(*UNITS_IN_CHAIN),
                 )
                 if p_type == "raw":
                     self.cost_rm[part_data["id"]] = part_data["cost"]
@@ -889,17 +1184,19 @@ class SupplyChainGenerator:
                         "importance_factor"
                     ]
                 self.parts[p_type].append(part_data)
+                self.index_entity(part_data)
                 if p_type == "subassembly":
                     self.cost_sa_external_facility[part_data["id"]] = part_data["cost"]
                     self.importance_factor_sa[part_data["id"]] = part_data[
                         "importance_factor"
                     ]
-                self.G.add_node(part_data["id"], **part_data, node_type="part")
+                self.G.add_entity(part_data, "part")
+                # The logs reference the record, its dates are formatted when the payloads are serialized (json_default)
                 self._log_node_operation(
-                    "create", part_data["id"], "PARTS", copy_part_data
+                    "create", part_data["id"], "PARTS", part_data
                 )
                 self._log_simulation_node_operation(
-                    "create", part_data["id"], "PARTS", copy_part_data
+                    "create", part_data["id"], "PARTS", part_data
                 )
                 counter += 1
 
@@ -921,7 +1218,7 @@ class SupplyChainGenerator:
 
     def _sa_for_po(self):
         copy_parts = self.parts["subassembly"].copy()
-        random.shuffle(copy_parts)
+        self.topology_random.shuffle(copy_parts)
         for product in self.product_offerings:
             product_id = product["id"]
 
@@ -944,7 +1241,7 @@ class SupplyChainGenerator:
 
     def _rm_for_sa(self):
         copy_parts = self.parts["raw"].copy()
-        random.shuffle(copy_parts)
+        self.topology_random.shuffle(copy_parts)
 
         sub_assembly = self.parts["subassembly"]
         # print(sub_assembly)
@@ -979,16 +1276,16 @@ class SupplyChainGenerator:
             if any(t in PART_TYPES["raw"] for t in supplier["supplied_part_types"]):
                 possible_warehouses = self.warehouses["supplier"]
                 num_connections = min(max_connections, len(possible_warehouses))
-                selected_warehouses = random.sample(
+                selected_warehouses = self.topology_random.sample(
                     possible_warehouses, num_connections
                 )
 
                 for warehouse in selected_warehouses:
                     edge_data = {
-                        "transportation_cost": random.uniform(
+                        "transportation_cost": self.topology_random.uniform(
                             *TRANSPORTATION_COST_RANGE
                         ),
-                        "lead_time": random.uniform(*TRANSPORTATION_TIME_RANGE),
+                        "lead_time": self.topology_random.uniform(*TRANSPORTATION_TIME_RANGE),
                     }
 
                     # print("Supplier - warehouse connection needs to be here ",supplier['id']," ",warehouse['id'])
@@ -1007,16 +1304,16 @@ class SupplyChainGenerator:
             ):
                 possible_warehouses = self.warehouses["subassembly"]
                 num_connections = min(max_connections, len(possible_warehouses))
-                selected_warehouses = random.sample(
+                selected_warehouses = self.topology_random.sample(
                     possible_warehouses, num_connections
                 )
 
                 for warehouse in selected_warehouses:
                     edge_data = {
-                        "transportation_cost": random.uniform(
+                        "transportation_cost": self.topology_random.uniform(
                             *TRANSPORTATION_COST_RANGE
                         ),
-                        "lead_time": random.uniform(*TRANSPORTATION_TIME_RANGE),
+                        "lead_time": self.topology_random.uniform(*TRANSPORTATION_TIME_RANGE),
                     }
 
                     self.G.add_edge(supplier["id"], warehouse["id"], **edge_data)
@@ -1094,9 +1391,16 @@ class SupplyChainGenerator:
 
 
     def _connect_warehouses_to_parts(self):
-        # Track which parts have been connected
-        connected_raw_parts = set()
-        connected_sa_parts = set()
+        # Track which parts have been connected. Unconnected parts sit in a pool so every warehouse samples from it
+        # without rebuilding the list of unconnected parts
+        unconnected_pools = {
+            "raw": PartPool(self.topology_random, self.parts["raw"]),
+            "subassembly": PartPool(self.topology_random, self.parts["subassembly"]),
+        }
+        connected_pools = {
+            "raw": PartPool(self.topology_random),
+            "subassembly": PartPool(self.topology_random),
+        }
 
         # First pass: distribute parts across warehouses while respecting constraints
         for warehouse in sum(
@@ -1109,46 +1413,21 @@ class SupplyChainGenerator:
             current_inventory = 0
 
             # Get unconnected parts first, then connected ones if space remains
-            possible_parts = (
-                self.parts["raw"]
-                if warehouse["type"] == "supplier"
-                else self.parts["subassembly"]
-            )
-            connected_parts = (
-                connected_raw_parts
-                if warehouse["type"] == "supplier"
-                else connected_sa_parts
-            )
-            unconnected_parts = [
-                p for p in possible_parts if p["id"] not in connected_parts
-            ]
+            part_type = "raw" if warehouse["type"] == "supplier" else "subassembly"
+            unconnected_parts = unconnected_pools[part_type]
+            connected_parts = connected_pools[part_type]
 
             # Prioritize unconnected parts, then add connected ones if space remains
-            parts_to_connect = []
-            if unconnected_parts:
-                parts_to_connect.extend(
-                    random.sample(
-                        unconnected_parts, min(max_parts, len(unconnected_parts))
-                    )
-                )
+            parts_to_connect = unconnected_parts.sample(max_parts)
 
             remaining_slots = max_parts - len(parts_to_connect)
-            if remaining_slots > 0 and possible_parts:
-                connected_part_list = [
-                    p for p in possible_parts if p["id"] in connected_parts
-                ]
-                if connected_part_list:
-                    parts_to_connect.extend(
-                        random.sample(
-                            connected_part_list,
-                            min(remaining_slots, len(connected_part_list)),
-                        )
-                    )
+            if remaining_slots > 0:
+                parts_to_connect.extend(connected_parts.sample(remaining_slots))
 
             for part in parts_to_connect:
                 # Calculate inventory level ensuring we don't exceed capacity
                 max_possible_inventory = min(
-                    random.randint(*INVENTORY_RANGE),
+                    self.topology_random.randint(*INVENTORY_RANGE),
                     available_capacity - current_inventory,
                 )
 
@@ -1161,18 +1440,18 @@ class SupplyChainGenerator:
 
                 edge_data = {
                     "inventory_level": inventory_level,
-                    "storage_cost": random.uniform(*COST_RANGE),
+                    "storage_cost": self.topology_random.uniform(*COST_RANGE),
                 }
 
                 self.warehouses_parts[warehouse['id']].add(part["id"])
                 if part["type"] == "raw":
                     self.rm_warehouse[part["id"]].append(warehouse["id"])
                     self.warehouse_rm[warehouse["id"]].append(part["id"])
-                    connected_raw_parts.add(part["id"])
                 else:
                     self.warehouse_sa[warehouse["id"]].append(part["id"])
                     self.sa_warehouse[part["id"]].append(warehouse["id"])
-                    connected_sa_parts.add(part["id"])
+                unconnected_pools[part["type"]].remove(part)
+                connected_pools[part["type"]].add(part)
 
                 self.parts_inventory_level[part["id"]][
                     warehouse["id"]
@@ -1193,9 +1472,6 @@ class SupplyChainGenerator:
 
                 # Update warehouse current capacity
                 self.G.nodes[warehouse["id"]]["current_capacity"] = current_inventory
-                for w in self.warehouses["supplier"]:
-                    if w["id"] == warehouse["id"]:
-                        w["current_capacity"] = current_inventory
 
                 changes = {"current_capacity": current_inventory}
                 self._log_node_operation(
@@ -1207,20 +1483,23 @@ class SupplyChainGenerator:
 
         # Second pass: connect any remaining unconnected parts
         for part_type in ["raw", "subassembly"]:
-            connected_parts = (
-                connected_raw_parts if part_type == "raw" else connected_sa_parts
-            )
-            unconnected = [
-                p for p in self.parts[part_type] if p["id"] not in connected_parts
-            ]
+            unconnected_pool = unconnected_pools[part_type]
+            unconnected = [p for p in self.parts[part_type] if p["id"] in unconnected_pool]
 
             if unconnected:
                 warehouse_type = "supplier" if part_type == "raw" else "subassembly"
+
+                # Max-heap of the available warehouses by remaining capacity, ties go to the earlier warehouse
                 available_warehouses = [
-                    w
-                    for w in self.warehouses[warehouse_type]
+                    (
+                        -(w["max_capacity"] - self.G.nodes[w["id"]]["current_capacity"]),
+                        order,
+                        w,
+                    )
+                    for order, w in enumerate(self.warehouses[warehouse_type])
                     if len(self.warehouse_rm.get(w["id"], [])) < w["max_parts"]
                 ]
+                heapq.heapify(available_warehouses)
 
                 for part in unconnected:
                     if not available_warehouses:
@@ -1228,22 +1507,17 @@ class SupplyChainGenerator:
                         break
 
                     # Find warehouse with most remaining capacity
-                    warehouse = max(
-                        available_warehouses,
-                        key=lambda w: w["max_capacity"]
-                        - self.G.nodes[w["id"]]["current_capacity"],
-                    )
+                    _, order, warehouse = heapq.heappop(available_warehouses)
 
                     current_inventory = self.G.nodes[warehouse["id"]][
                         "current_capacity"
                     ]
                     max_possible_inventory = min(
-                        random.randint(*INVENTORY_RANGE),
+                        self.topology_random.randint(*INVENTORY_RANGE),
                         warehouse["max_capacity"] - current_inventory,
                     )
 
                     if max_possible_inventory <= 0:
-                        available_warehouses.remove(warehouse)
                         continue
 
                     inventory_level = max_possible_inventory
@@ -1251,7 +1525,7 @@ class SupplyChainGenerator:
 
                     edge_data = {
                         "inventory_level": inventory_level,
-                        "storage_cost": random.uniform(*COST_RANGE),
+                        "storage_cost": self.topology_random.uniform(*COST_RANGE),
                     }
 
                     if part["type"] == "raw":
@@ -1288,8 +1562,11 @@ class SupplyChainGenerator:
                         "update", warehouse["id"], "WAREHOUSE", changes
                     )
 
-                    if current_inventory >= warehouse["max_capacity"] * 0.9:  # 90% full
-                        available_warehouses.remove(warehouse)
+                    if current_inventory < warehouse["max_capacity"] * 0.9:  # Not yet 90% full
+                        heapq.heappush(
+                            available_warehouses,
+                            (-(warehouse["max_capacity"] - current_inventory), order, warehouse),
+                        )
 
     def _connect_parts_to_facilities(self):
         # Connect raw parts to external facilities to create subassemblies using the dictionary of values which stores
@@ -1297,15 +1574,15 @@ class SupplyChainGenerator:
 
         for facility in self.facilities["external"]:
 
-            subassembly_parts = random.sample(self.parts["subassembly"], 1)
+            subassembly_parts = self.topology_random.sample(self.parts["subassembly"], 1)
             for part in subassembly_parts:
                 raw_materials = self.subassembly_raw_materials[part["id"]]
                 for rm in raw_materials:
                     edge_data = {
-                        "quantity": random.randint(*QUANTITY_RANGE),
-                        "distance": random.randint(*DISTANCE_RANGE),
-                        "transport_cost": random.uniform(*TRANSPORTATION_COST_RANGE),
-                        "lead_time": random.uniform(*TRANSPORTATION_TIME_RANGE),
+                        "quantity": self.topology_random.randint(*QUANTITY_RANGE),
+                        "distance": self.topology_random.randint(*DISTANCE_RANGE),
+                        "transport_cost": self.topology_random.uniform(*TRANSPORTATION_COST_RANGE),
+                        "lead_time": self.topology_random.uniform(*TRANSPORTATION_TIME_RANGE),
                     }
 
                     self.G.add_edge(rm["id"], facility["id"], **edge_data)
@@ -1328,9 +1605,9 @@ class SupplyChainGenerator:
                         )
 
                 edge_data = {
-                    "production_cost": random.uniform(*COST_RANGE),
-                    "lead_time": random.uniform(*TRANSPORTATION_TIME_RANGE),
-                    "quantity": random.randint(*QUANTITY_RANGE),
+                    "production_cost": self.topology_random.uniform(*COST_RANGE),
+                    "lead_time": self.topology_random.uniform(*TRANSPORTATION_TIME_RANGE),
+                    "quantity": self.topology_random.randint(*QUANTITY_RANGE),
                 }
                 self.G.add_edge(facility["id"], part["id"], **edge_data)
                 self._log_simulation_edge_operation(
@@ -1341,17 +1618,15 @@ class SupplyChainGenerator:
                 )
 
                 # Ram: storing the ex_facility-sa edges in a dictionary
-                for fac in self.facilities["external"]:
-                    if fac["id"] == facility["id"]:
-                        max_capacity = fac["max_capacity"]
-                        if part["id"] in self.sum_max_capacity_ext_facility_for_sa:
-                            self.sum_max_capacity_ext_facility_for_sa[
-                                part["id"]
-                            ] += max_capacity
-                        else:
-                            self.sum_max_capacity_ext_facility_for_sa[part["id"]] = (
-                                max_capacity
-                            )
+                max_capacity = self.entity_index[facility["id"]]["max_capacity"]
+                if part["id"] in self.sum_max_capacity_ext_facility_for_sa:
+                    self.sum_max_capacity_ext_facility_for_sa[
+                        part["id"]
+                    ] += max_capacity
+                else:
+                    self.sum_max_capacity_ext_facility_for_sa[part["id"]] = (
+                        max_capacity
+                    )
 
                 if part["id"] in self.subassembly_ext_facility:
                     self.subassembly_ext_facility[part["id"]].append(
@@ -1406,16 +1681,16 @@ class SupplyChainGenerator:
             # )
 
             # Now each lam facility will produce only one type of product offering from the list
-            products = random.sample(self.product_offerings, 1)
+            products = self.topology_random.sample(self.product_offerings, 1)
             for product in products:
                 subassembly_parts = self.product_offering_subassemblies[product["id"]]
                 for part in subassembly_parts:
                     # Connecting the Lam facilities with the predefined subassemblies
                     edge_data = {
-                        "quantity": random.randint(*QUANTITY_RANGE),
-                        "distance": random.randint(*DISTANCE_RANGE),
-                        "transport_cost": random.uniform(*TRANSPORTATION_COST_RANGE),
-                        "lead_time": random.uniform(*TRANSPORTATION_TIME_RANGE),
+                        "quantity": self.topology_random.randint(*QUANTITY_RANGE),
+                        "distance": self.topology_random.randint(*DISTANCE_RANGE),
+                        "transport_cost": self.topology_random.uniform(*TRANSPORTATION_COST_RANGE),
+                        "lead_time": self.topology_random.uniform(*TRANSPORTATION_TIME_RANGE),
                     }
 
 
@@ -1428,9 +1703,9 @@ class SupplyChainGenerator:
 
                 # Connect the LAM facility to the product offering
                 edge_data = {
-                    "product_cost": random.uniform(*COST_RANGE),
-                    "lead_time": random.uniform(*TRANSPORTATION_TIME_RANGE),
-                    "quantity": random.randint(*QUANTITY_RANGE),
+                    "product_cost": self.topology_random.uniform(*COST_RANGE),
+                    "lead_time": self.topology_random.uniform(*TRANSPORTATION_TIME_RANGE),
+                    "quantity": self.topology_random.randint(*QUANTITY_RANGE),
                 }
                 product_id = product["id"]
 
@@ -1464,14 +1739,14 @@ class SupplyChainGenerator:
             current_inventory = 0
 
             possible_products = self.product_offerings
-            selected_products = random.sample(
+            selected_products = self.topology_random.sample(
                 possible_products, min(max_parts, len(possible_products))
             )
 
             for product in selected_products:
 
                 max_possible_inventory = min(
-                    random.randint(*INVENTORY_RANGE),
+                    self.topology_random.randint(*INVENTORY_RANGE),
                     available_capacity - current_inventory,
                 )
 
@@ -1483,7 +1758,7 @@ class SupplyChainGenerator:
 
                 edge_data = {
                     "inventory_level": inventory_level,
-                    "storage_cost": random.uniform(*COST_RANGE),
+                    "storage_cost": self.topology_random.uniform(*COST_RANGE),
                 }
 
                 self.G.add_edge(warehouse["id"], product["id"], **edge_data)
@@ -1497,10 +1772,6 @@ class SupplyChainGenerator:
                     "storage_cost"
                 ]
 
-                for w in self.warehouses["lam"]:
-                    if w["id"] == warehouse["id"]:
-                        w["current_capacity"] = current_inventory
-
                 self.G.nodes[warehouse["id"]]["current_capacity"] = current_inventory
 
                 self._log_edge_operation(
@@ -1551,9 +1822,9 @@ class SupplyChainGenerator:
         for warehouse in sum(self.warehouses.values(), []):
             for facility in sum(self.facilities.values(), []):
                 if warehouse["location"] == facility["location"]:
-                    distance = random.randint(10, 50)
+                    distance = self.topology_random.randint(10, 50)
                 else:
-                    distance = random.randint(*DISTANCE_RANGE)
+                    distance = self.topology_random.randint(*DISTANCE_RANGE)
                 self.G.nodes[warehouse["id"]]["distances"] = self.G.nodes[
                     warehouse["id"]
                 ].get("distances", {})
@@ -1561,8 +1832,18 @@ class SupplyChainGenerator:
 
     # def pass_demand(self):
 
-    def create_simulation(self):
-        self.simul_graph_copy = self.G.copy()
+    def create_simulation(self, snapshots=None):
+        """
+        Simulate the demand and cost propagation at the current simulation timestamp.
+
+        The simulated graph is a copy-on-write snapshot in `snapshots` (a new DeltaSnapshotStore over the current
+        graph by default), only the attributes the simulation writes are stored for it.
+        """
+        if snapshots is None:
+            snapshots = DeltaSnapshotStore(self.G, cache_size=self.snapshot_cache_size)
+            self._cache_lineage = None
+        self.simulation_graphs = snapshots
+        self.simul_graph_copy = snapshots.derive(self.simulation_timestamp)
         self.po_revenue = {}
 
         # This is the demand propagation from the product offering to the raw material
@@ -1584,18 +1865,13 @@ class SupplyChainGenerator:
         # Propagate the demand and cost to the business hierarchy too
         self.simulate_business_hierarchy()
 
-        # Save the graph in the dictionary
-        self.simulation_graphs[self.simulation_timestamp] = self.simul_graph_copy
-
     def warehouse_health_check(self, warehouse_id, factor=1):
-        for warehouse in sum(self.warehouses.values(), []):
-            if (
-                    warehouse["id"] == warehouse_id
-                    and warehouse["current_capacity"] >= factor * warehouse["safety_stock"]
-            ):
-                return True
-
-        return False
+        warehouse = self.entity_index.get(warehouse_id)
+        return (
+                warehouse is not None
+                and "safety_stock" in warehouse
+                and warehouse["current_capacity"] >= factor * warehouse["safety_stock"]
+        )
 
     def simulate_business_hierarchy(self):
         # copy_graph = self.G.copy()
@@ -1648,6 +1924,7 @@ class SupplyChainGenerator:
             "update", business_group_id, "BUSINESS_GROUP", changes
         )
         # print(f"Business Group {business_group_id}: Total Revenue = {business_group_revenue}")
+        self.flush_operations()
 
     def simulate_ext_fac_sa_demand(self):
         """
@@ -1858,8 +2135,13 @@ class SupplyChainGenerator:
 
     def create_temporal_simulation(self):
         """
-        Creates temporal simulations for all time periods, similar to generate_temporal_data
+        Creates temporal simulations for all time periods, similar to generate_temporal_data (restored from the
+        artifact cache when it was simulated before)
         """
+        self._cached_step("create_temporal_simulation", self._create_temporal_simulation)
+        self.flush_operations()
+
+    def _create_temporal_simulation(self):
 
         if self.G:
             print("Generating temporal simulation")
@@ -1874,9 +2156,10 @@ class SupplyChainGenerator:
             self._generate_edges()
             self._build_dicts()
 
-        self.temporal_simulation_graphs = {}
-        base_simulation = self.create_base_simulation()
-        self.temporal_simulation_graphs[0] = base_simulation
+        # Every period is stored as a delta over one frozen copy of the graph
+        self.temporal_simulation_graphs = DeltaSnapshotStore(self.G, cache_size=self.snapshot_cache_size)
+        self.simulation_timestamp = 0
+        self.create_simulation(self.temporal_simulation_graphs)
         self.store_dictionary()
 
         # print(self.demand_po)
@@ -1899,7 +2182,7 @@ class SupplyChainGenerator:
             self.apply_temporal_variations(time_period)
 
             # Run simulation with temporally adjusted values
-            self.simul_graph_copy = self.G.copy()
+            self.simul_graph_copy = self.temporal_simulation_graphs.derive(time_period)
 
             # Propagate demand and cost through the supply chain
             self.simulate_lam_fac_po_demand()
@@ -1925,9 +2208,6 @@ class SupplyChainGenerator:
 
             self.store_dictionary()
 
-            # Store the simulation result for this time period
-            self.temporal_simulation_graphs[time_period] = self.simul_graph_copy
-
     def create_base_simulation(self):
         """Creates the base simulation for time period 0"""
         self.simulation_timestamp = 0
@@ -1939,10 +2219,10 @@ class SupplyChainGenerator:
         Applies temporal variations to all relevant simulation parameters
         """
         # Adjust Product Offering demand based on temporal factors
-        for offering in self.product_offerings:
-
-            base_demand = offering['demand']
-            temporal_demand = self._generate_temporal_value(base_demand, 'demand', time_period)
+        temporal_demands = self._generate_temporal_values(
+            [offering['demand'] for offering in self.product_offerings], 'demand', time_period
+        ).tolist()
+        for offering, temporal_demand in zip(self.product_offerings, temporal_demands):
             self.demand_po[offering['id']] = math.ceil(temporal_demand)
             self.simul_graph_copy.nodes[offering['id']]['demand'] = math.ceil(temporal_demand)
             changes = {'demand': temporal_demand}
@@ -1972,45 +2252,47 @@ class SupplyChainGenerator:
         #             self._log_simulation_edge_operation("update", u, v, changes)
 
         # Adjust facility operating costs with temporal variations
-        for facility_type in ["lam", "external"]:
-            facilities = self.facilities.get(facility_type, [])
-            for facility in facilities:
-
-                base_cost = self.opcost_facility[facility['id']]
-                temporal_cost = self._generate_temporal_value(base_cost, 'operating_cost', time_period)
-                self.opcost_facility[facility['id']] = temporal_cost
-                self.simul_graph_copy.nodes[facility['id']]['operating_cost'] = temporal_cost
-                changes = {'operating_cost': temporal_cost}
-                self._log_simulation_node_operation("update", facility['id'], "FACILITY", changes)
+        facilities = self.facilities.get("lam", []) + self.facilities.get("external", [])
+        temporal_costs = self._generate_temporal_values(
+            [self.opcost_facility[facility['id']] for facility in facilities], 'operating_cost', time_period
+        ).tolist()
+        for facility, temporal_cost in zip(facilities, temporal_costs):
+            self.opcost_facility[facility['id']] = temporal_cost
+            self.simul_graph_copy.nodes[facility['id']]['operating_cost'] = temporal_cost
+            changes = {'operating_cost': temporal_cost}
+            self._log_simulation_node_operation("update", facility['id'], "FACILITY", changes)
 
 
         # Adjust raw material costs
-        for part_type, parts in self.parts.items():
-            if part_type == "raw":
-                for part in parts:
-
-                    base_cost = part['cost']
-                    temporal_cost = self._generate_temporal_value(base_cost, 'cost', time_period)
-                    self.cost_rm[part['id']] = temporal_cost
-                    # new_units_in_chain = self.simul_graph_copy[part['id']]['units_in_chain'] + self.demand_rm[
-                    # part['id']]
-                    self.simul_graph_copy.nodes[part['id']]['cost'] = temporal_cost
-                    # self.simul_graph_copy.nodes[part['id']]['units_in_chain'] = new_units_in_chain
-                    changes = {'cost': temporal_cost}
-                    self._log_simulation_node_operation("update", part['id'], "PARTS", changes)
+        raw_parts = self.parts["raw"]
+        temporal_costs = self._generate_temporal_values(
+            [part['cost'] for part in raw_parts], 'cost', time_period
+        ).tolist()
+        for part, temporal_cost in zip(raw_parts, temporal_costs):
+            self.cost_rm[part['id']] = temporal_cost
+            # new_units_in_chain = self.simul_graph_copy[part['id']]['units_in_chain'] + self.demand_rm[
+            # part['id']]
+            self.simul_graph_copy.nodes[part['id']]['cost'] = temporal_cost
+            # self.simul_graph_copy.nodes[part['id']]['units_in_chain'] = new_units_in_chain
+            changes = {'cost': temporal_cost}
+            self._log_simulation_node_operation("update", part['id'], "PARTS", changes)
 
 
         # Adjust facility capacities
+        temporal_capacities = iter(
+            np.ceil(
+                self._generate_temporal_values(
+                    [fac[1] for fac_list in self.po_Lam_facility.values() for fac in fac_list],
+                    "capacity",
+                    time_period,
+                )
+            ).astype(int).tolist()
+        )
         for po, fac_list in self.po_Lam_facility.items():
             new_list = []
             for fac in fac_list:
                 facility_id = fac[0]
-                base_capacity = fac[1]
-                temporal_capacity = math.ceil(
-                    self._generate_temporal_value(
-                        base_capacity, "capacity", time_period
-                    )
-                )
+                temporal_capacity = next(temporal_capacities)
                 self.simul_graph_copy.nodes[facility_id][
                     "max_capacity"
                 ] = temporal_capacity
@@ -2031,15 +2313,18 @@ class SupplyChainGenerator:
             )
 
         # Similar adjustment for external facilities
+        temporal_capacities = iter(
+            self._generate_temporal_values(
+                [fac[1] for fac_list in self.subassembly_ext_facility.values() for fac in fac_list],
+                "capacity",
+                time_period,
+            ).tolist()
+        )
         for sa, fac_list in self.subassembly_ext_facility.items():
             new_list = []
             for fac in fac_list:
                 facility_id = fac[0]
-                base_capacity = fac[1]
-
-                temporal_capacity = self._generate_temporal_value(
-                    base_capacity, "capacity", time_period
-                )
+                temporal_capacity = next(temporal_capacities)
                 new_list.append((facility_id, temporal_capacity))
                 self.simul_graph_copy.nodes[facility_id][
                     "max_capacity"
@@ -2069,24 +2354,27 @@ class SupplyChainGenerator:
         """
         if disaster_type not in ['cost', 'demand', 'capacity']:
             raise ValueError("disaster_type must be one of: 'cost', 'demand', 'capacity'")
+        self._cache_lineage = None
 
         # Store pre-disaster state
         pre_disaster_cost_po = self.cost_po.copy()
         pre_disaster_demand_po = self.demand_po.copy()
 
         self.simulation_timestamp += 1
-        self.temporal_simulation_graphs[self.simulation_timestamp] = self.temporal_simulation_graphs[
-            self.simulation_timestamp - 1].copy()
+        # The disaster timestamp only stores the attributes it changes on top of the previous one
+        disaster_graph = self.temporal_simulation_graphs.derive(
+            self.simulation_timestamp, parent=self.simulation_timestamp - 1
+        )
 
         if disaster_type == 'cost':
             # Increase costs of randomly selected raw materials
             raw_materials = list(self.parts['raw'])
             num_affected = int(len(raw_materials) * affected_nodes_percentage)
-            affected_materials = random.sample(raw_materials, num_affected)
+            affected_materials = self.disaster_random.sample(raw_materials, num_affected)
 
             for material in affected_materials:
                 material_id = material['id']
-                old_cost = self.temporal_simulation_graphs[self.simulation_timestamp - 1].nodes[material_id]['cost']
+                old_cost = disaster_graph.nodes[material_id]['cost']
                 new_cost = old_cost * impact_factor
 
                 # Log the cost increase
@@ -2096,17 +2384,17 @@ class SupplyChainGenerator:
                     "raw_material",
                     {"cost": new_cost}
                 )
-                self.temporal_simulation_graphs[self.simulation_timestamp].nodes[material_id]['cost'] = new_cost
+                disaster_graph.nodes[material_id]['cost'] = new_cost
                 self.cost_rm[material_id] = new_cost
 
         elif disaster_type == 'demand':
             # Increase demand for randomly selected product offerings
             num_affected = int(len(self.product_offerings) * affected_nodes_percentage)
-            affected_offerings = random.sample(self.product_offerings, num_affected)
+            affected_offerings = self.disaster_random.sample(self.product_offerings, num_affected)
 
             for offering in affected_offerings:
                 offering_id = offering['id']
-                old_demand = self.temporal_simulation_graphs[self.simulation_timestamp - 1].nodes[offering_id]['demand']
+                old_demand = disaster_graph.nodes[offering_id]['demand']
                 new_demand = old_demand * impact_factor
 
                 # Log the demand increase
@@ -2116,14 +2404,14 @@ class SupplyChainGenerator:
                     "product_offering",
                     {"demand": new_demand}
                 )
-                self.temporal_simulation_graphs[self.simulation_timestamp].nodes[offering_id]['demand'] = new_demand
+                disaster_graph.nodes[offering_id]['demand'] = new_demand
                 self.demand_po[offering_id] = new_demand
 
         elif disaster_type == 'capacity':
             # Reduce capacity of randomly selected facilities
             all_facilities = self.facilities['external'] + self.facilities['lam']
             num_affected = int(len(all_facilities) * affected_nodes_percentage)
-            affected_facilities = random.sample(all_facilities, num_affected)
+            affected_facilities = self.disaster_random.sample(all_facilities, num_affected)
 
             # Track which facilities were affected to update the dictionaries
             affected_lam_facilities = set()
@@ -2131,7 +2419,7 @@ class SupplyChainGenerator:
 
             for facility in affected_facilities:
                 facility_id = facility['id']
-                old_capacity = self.temporal_simulation_graphs[self.simulation_timestamp - 1].nodes[facility_id][
+                old_capacity = disaster_graph.nodes[facility_id][
                     'max_capacity']
                 new_capacity = old_capacity / impact_factor  # Reduce capacity by dividing
 
@@ -2142,7 +2430,7 @@ class SupplyChainGenerator:
                     "facility",
                     {"max_capacity": new_capacity}
                 )
-                self.temporal_simulation_graphs[self.simulation_timestamp].nodes[facility_id][
+                disaster_graph.nodes[facility_id][
                     'max_capacity'] = new_capacity
 
                 # Track which type of facility was affected
@@ -2158,7 +2446,7 @@ class SupplyChainGenerator:
                     facility_id = fac[0]
                     if facility_id in affected_lam_facilities:
                         # This facility was affected by the disaster
-                        new_capacity = self.temporal_simulation_graphs[self.simulation_timestamp].nodes[facility_id]['max_capacity']
+                        new_capacity = disaster_graph.nodes[facility_id]['max_capacity']
                         new_list.append((facility_id, new_capacity))
                     else:
                         # This facility was not affected
@@ -2179,7 +2467,7 @@ class SupplyChainGenerator:
                     facility_id = fac[0]
                     if facility_id in affected_ext_facilities:
                         # This facility was affected by the disaster
-                        new_capacity = self.temporal_simulation_graphs[self.simulation_timestamp].nodes[facility_id]['max_capacity']
+                        new_capacity = disaster_graph.nodes[facility_id]['max_capacity']
                         new_list.append((facility_id, new_capacity))
                     else:
                         # This facility was not affected
@@ -2215,6 +2503,7 @@ class SupplyChainGenerator:
         self.temporal_cost_sa_external_facility[self.simulation_timestamp] = self.cost_sa_external_facility.copy()
         self.temporal_demand_po[self.simulation_timestamp] = self.demand_po.copy()
         self.temporal_cost_po[self.simulation_timestamp] = self.cost_po.copy()
+        self.flush_operations()
 
         return {
             'disaster_type': disaster_type,
@@ -2255,15 +2544,33 @@ class SupplyChainGenerator:
         costs = self.lw_storage_cost.copy()
         demand = self.demand_po.copy()
 
-        # ------------------------------------------------------------------------------
+        # The storage changes the warehouse capacities, the lineage of cached states ends here
+        self._cache_lineage = None
+        results = self._cached_solution(
+            "po_warehouse_storage",
+            (warehouses, storing, connection, costs, demand),
+            lambda: self._solve_po_warehouse_storage(warehouses, storing, connection, costs, demand),
+        )
 
+        if isinstance(results, dict):
+            for warehouse, po_allocation in results["allocation"].items():
+                sum_ = 0
+                for po, demand in po_allocation.items():
+                    sum_ += demand
+                self.G.nodes[warehouse]["current_capacity"] += sum_
+
+        return results
+
+    def _solve_po_warehouse_storage(self, warehouses, storing, connection, costs, demand):
+        """Solve the LP of simulate_po_warehouse_storage, returns the results or the LP status when not optimal"""
         # LP Problem
         prob = pulp.LpProblem("Warehouse_Storage_Optimization", pulp.LpMinimize)
 
-        # creation of all variables for optimization
+        # creation of all variables for optimization, keyed by the (warehouse, product offering) codes
+        code = self.ids.code
         x = pulp.LpVariable.dicts(
-            "",
-            ((w, p) for p, warehouses_list in storing.items() for w in warehouses_list),
+            "x",
+            ((code(w), code(p)) for p, warehouses_list in storing.items() for w in warehouses_list),
             lowBound=0,
             cat=pulp.LpInteger,
         )
@@ -2272,7 +2579,7 @@ class SupplyChainGenerator:
         prob += (
             pulp.lpSum(
                 [
-                    x[(w, p)] * costs[p][w]
+                    x[(code(w), code(p))] * costs[p][w]
                     for p, warehouses_list in storing.items()
                     for w in warehouses_list
                 ]
@@ -2282,13 +2589,13 @@ class SupplyChainGenerator:
 
         # constraints
         for p in storing.keys():
-            prob += pulp.lpSum([x[(w, p)] for w in storing[p]]) == demand[p]
+            prob += pulp.lpSum([x[(code(w), code(p))] for w in storing[p]]) == demand[p]
 
         for w in warehouses.keys():
             current_capacity = warehouses[w]["current_capacity"]
             max_capacity = warehouses[w]["max_capacity"]
             prob += (
-                pulp.lpSum([x[(w, p)] for p in connection[w]]) + current_capacity
+                pulp.lpSum([x[(code(w), code(p))] for p in connection[w]]) + current_capacity
                 <= max_capacity
             )
 
@@ -2296,30 +2603,24 @@ class SupplyChainGenerator:
         prob.solve(pulp.PULP_CBC_CMD(msg=False))
 
         if pulp.LpStatus[prob.status] == "Optimal":
-            allocation = defaultdict(dict)
-            for v in prob.variables():
-                if v.varValue != 0.0:
-                    allocation[v.name[3:8]][v.name[12:18]] = v.varValue
-
             results = {
                 "status": pulp.LpStatus[prob.status],
                 "objective_value": pulp.value(prob.objective),
-                "allocation": dict(allocation),
+                "allocation": self._lp_allocation(x),
             }
 
-            for warehouse, po_allocation in results["allocation"].items():
-                sum_ = 0
-                for po, demand in po_allocation.items():
-                    sum_ += demand
-                self.G.nodes[warehouse]["current_capacity"] += sum_
-                for w in self.warehouses["lam"]:
-                    if w["id"] == warehouse:
-                        w["current_capacity"] += sum_
-
             return results
 
         return pulp.LpStatus[prob.status]
 
+    def _lp_allocation(self, x):
+        """Non zero values of LP variables keyed by (warehouse code, item code), as {warehouse id: {item id: value}}"""
+        allocation = defaultdict(dict)
+        for (w, item), v in sorted(x.items()):
+            if v.varValue != 0.0:
+                allocation[self.ids.id(w)][self.ids.id(item)] = v.varValue
+        return dict(allocation)
+
     def simulate_raw_warehouse_storage(self):
         warehouses_supplier = {}
         for wh in self.warehouses["supplier"]:
@@ -2358,13 +2659,40 @@ class SupplyChainGenerator:
                     part_safety_stocks[rm] = {}
                 part_safety_stocks[rm][warehouse] = allocation
 
+        # The storage changes the warehouse capacities, the lineage of cached states ends here
+        self._cache_lineage = None
+        results = self._cached_solution(
+            "raw_warehouse_storage",
+            (
+                self.warehouse_rm,
+                self.rm_warehouse,
+                self.parts_storage_cost,
+                self.demand_rm,
+                self.parts_inventory_level,
+                part_safety_stocks,
+            ),
+            lambda: self._solve_raw_warehouse_storage(part_safety_stocks),
+        )
+
+        if isinstance(results, dict):
+            for warehouse, raw_allocation in results["allocation"].items():
+                sum_ = 0
+                for po, demand in raw_allocation.items():
+                    sum_ += demand
+                self.G.nodes[warehouse]["current_capacity"] -= sum_
+
+        return results
+
+    def _solve_raw_warehouse_storage(self, part_safety_stocks):
+        """Solve the LP of simulate_raw_warehouse_storage, returns the results or the LP status when not optimal"""
         # LP Problem
         prob = pulp.LpProblem('Warehouse-Parts-Distribution', pulp.LpMaximize)
 
-        # creating the variations for the storages
+        # creating the variations for the storages, keyed by the (warehouse, raw material) codes
+        code = self.ids.code
         x = pulp.LpVariable.dicts(
-            '',
-            ((w, r) for w, raw_list in self.warehouse_rm.items()
+            'x',
+            ((code(w), code(r)) for w, raw_list in self.warehouse_rm.items()
              for r in raw_list),
             lowBound=0,
             cat=pulp.LpInteger
@@ -2372,7 +2700,7 @@ class SupplyChainGenerator:
 
         # objective function
         prob += pulp.lpSum(
-            x[(w, r)] * self.parts_storage_cost[r][w]
+            x[(code(w), code(r))] * self.parts_storage_cost[r][w]
             for w, raw_list in self.warehouse_rm.items()
             for r in raw_list
         )
@@ -2381,38 +2709,25 @@ class SupplyChainGenerator:
         for p in self.rm_warehouse.keys():
             prob += pulp.lpSum(
                 [
-                    x[(w, p)] for w in self.rm_warehouse[p]
+                    x[(code(w), code(p))] for w in self.rm_warehouse[p]
 
                 ]
             ) == self.demand_rm[p]
 
         for p in self.rm_warehouse.keys():
             for w in self.rm_warehouse[p]:
-                prob += self.parts_inventory_level[p][w] - x[(w, p)] >= part_safety_stocks[p][w]
+                prob += self.parts_inventory_level[p][w] - x[(code(w), code(p))] >= part_safety_stocks[p][w]
 
         # solving
         prob.solve(pulp.PULP_CBC_CMD(msg=False))
 
         if pulp.LpStatus[prob.status] == "Optimal":
-            allocation = defaultdict(dict)
-            for v in prob.variables():
-                if v.varValue != 0.0:
-                    allocation[v.name[3:8]][v.name[12:17]] = v.varValue
             results = {
                 "status": pulp.LpStatus[prob.status],
                 "objective_value": pulp.value(prob.objective),
-                "allocation": dict(allocation),
+                "allocation": self._lp_allocation(x),
             }
 
-            for warehouse, raw_allocation in results["allocation"].items():
-                sum_ = 0
-                for po, demand in raw_allocation.items():
-                    sum_ += demand
-                self.G.nodes[warehouse]["current_capacity"] -= sum_
-                for w in self.warehouses["supplier"]:
-                    if w["id"] == warehouse:
-                        w["current_capacity"] -= sum_
-
             return results
 
         return pulp.LpStatus[prob.status]
@@ -2439,7 +2754,7 @@ class SupplyChainGenerator:
 
     def get_temporal_data(self):
         """Return temporal data"""
-        return self.temporal_data
+        return {period: self._period_data(period) for period in self.temporal_data}
 
     def get_graph_snapshot(self, time_period):
         """Return the complete graph snapshot for a specific time period"""
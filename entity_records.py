@@ -0,0 +1,238 @@
+# entity_records.py
+from collections.abc import MutableMapping
+from datetime import datetime
+
+import networkx as nx
+import numpy as np
+
+
+class EntityRecord(MutableMapping):
+    """
+    Compact record of a supply chain entity. The fields of an entity type are `__slots__`, so a record doesn't carry
+    a per-instance dict; keys that aren't fields of the type (columns added from the Supply Chain Manager page) go to an
+    `_extra` dict created on first use.
+
+    Records behave like the dicts they replace (`record["id"]`, `record.get(...)`, `**record`, DataFrame rows), and
+    `copy()` returns a plain dict so exports can add keys to it freely.
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS = ()
+    _FIELD_SET = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, values=None, **kwargs):
+        if values:
+            kwargs = {**values, **kwargs}
+        self._extra = None
+        for field in self.FIELDS:
+            setattr(self, field, kwargs.pop(field, None))
+        if kwargs:
+            self._extra = kwargs
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET or self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __contains__(self, key):
+        return key in self._FIELD_SET or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        yield from self.FIELDS
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self.FIELDS) + (len(self._extra) if self._extra is not None else 0)
+
+    def __getstate__(self):
+        return [getattr(self, field) for field in self.FIELDS], self._extra
+
+    def __setstate__(self, state):
+        values, self._extra = state
+        for field, value in zip(self.FIELDS, values):
+            setattr(self, field, value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.copy()!r})"
+
+    def copy(self):
+        return dict(self.items())
+
+    to_dict = copy
+
+    def snapshot(self):
+        """Record of the same type holding the current values, unaffected by later changes to this one"""
+        snapshot = type(self).__new__(type(self))
+        snapshot.__setstate__(self.__getstate__())
+        if snapshot._extra is not None:
+            snapshot._extra = dict(snapshot._extra)
+        return snapshot
+
+
+class SupplierRecord(EntityRecord):
+    FIELDS = ("id", "name", "location", "reliability", "size", "size_category", "supplied_part_types")
+    __slots__ = FIELDS
+
+
+class WarehouseRecord(EntityRecord):
+    FIELDS = ("id", "name", "type", "location", "size_category", "max_capacity", "current_capacity", "safety_stock",
+              "max_parts")
+    __slots__ = FIELDS
+
+
+class FacilityRecord(EntityRecord):
+    FIELDS = ("id", "name", "type", "location", "max_capacity", "operating_cost")
+    __slots__ = FIELDS
+
+
+class PartRecord(EntityRecord):
+    FIELDS = ("id", "name", "type", "subtype", "cost", "importance_factor", "valid_from", "valid_till", "expiry",
+              "units_in_chain")
+    __slots__ = FIELDS
+
+
+class EntityNode(MutableMapping):
+    """
+    Node attributes of an entity in the generator graph, a view over its record: reads and writes of the record
+    fields go to the record itself, `node_type` and the graph only attributes (e.g. `distances`) are kept here.
+    """
+
+    __slots__ = ("record", "node_type", "_extra")
+
+    def __init__(self, record, node_type):
+        self.record = record
+        self.node_type = node_type
+        self._extra = None
+
+    def __getitem__(self, key):
+        if key == "node_type":
+            return self.node_type
+        if key in self.record:
+            return self.record[key]
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "node_type":
+            self.node_type = value
+        elif key in self.record:
+            self.record[key] = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __contains__(self, key):
+        return key == "node_type" or key in self.record or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        yield from self.record
+        yield "node_type"
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self.record) + 1 + (len(self._extra) if self._extra is not None else 0)
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def copy(self):
+        return dict(self.items())
+
+
+class EntityGraph(nx.DiGraph):
+    """
+    DiGraph whose entity nodes reference the generator records instead of holding a copy of their attributes.
+    Copies (`G.copy()`, snapshots) get plain dict attributes as usual.
+    """
+
+    def add_entity(self, record, node_type):
+        """Add (or replace) the node of an entity, its attributes being a view over `record`"""
+        node_id = record["id"]
+        self.add_node(node_id)
+        self._node[node_id] = EntityNode(record, node_type)
+
+
+class IdTable:
+    """
+    Interning table between the string node ids (`P_001`, `W_012`, ...) and dense int32 codes, assigned in
+    registration order. The LP variable maps and the operation logs are keyed by codes, the string ids are only
+    looked up again where results leave them. The simulation dictionaries and the entity maps (`entity_index`,
+    `cost_rm`, `demand_rm`, ...) are still keyed by the string ids.
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._ids = []
+
+    def intern(self, node_id):
+        """Return the code of an id, registering it first if needed"""
+        code = self._codes.get(node_id)
+        if code is None:
+            code = self._codes[node_id] = len(self._ids)
+            self._ids.append(node_id)
+        return code
+
+    def code(self, node_id):
+        return self._codes[node_id]
+
+    def codes(self, node_ids):
+        """int32 array of the codes of registered ids"""
+        return np.fromiter((self._codes[node_id] for node_id in node_ids), dtype=np.int32)
+
+    def id(self, code):
+        return self._ids[code]
+
+    def ids(self, codes):
+        return [self._ids[code] for code in codes]
+
+    def __contains__(self, node_id):
+        return node_id in self._codes
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def snapshot_properties(properties):
+    """Properties of a create operation as they are when it is logged (the records change after that)"""
+    if isinstance(properties, EntityRecord):
+        return properties.snapshot()
+    return dict(properties)
+
+
+def json_default(value):
+    """`default` of json.dumps for the op log payloads, which hold entity records"""
+    if isinstance(value, MutableMapping):
+        return dict(value)
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,226 @@
+# local_graph_server.py
+"""
+Stand-in for the graph server, to measure and check the server exports offline.
+
+    python local_graph_server.py --port 8000 --latency-ms 20 --rate-limit 50000
+
+then point SERVER_URL at http://localhost:8000/api. GET /stats returns what it received.
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LocalGraphServer:
+    """
+    Threaded HTTP server accepting the pushes of the Generation page: `.../schema/live/update` (bulk creates and
+    updates), `.../dicts` and `.../dicts/bulk`, under any path prefix. Bodies may be gzip / deflate encoded.
+
+    Each request takes `latency` seconds (plus up to `jitter` seconds at random) plus `latency_per_op` per
+    operation, fails with a 500 with probability `error_rate`, and is answered 429 (with a Retry-After) when it would
+    take the ingest rate over `rate_limit` operations per second. Payloads whose Idempotency-Key was already applied
+    are acknowledged without being applied again.
+
+    `stats()` counts what was received, including `orphan_updates`: updates of an entity no create was received
+    for, which the push ordering should never produce. `properties(timestamp)` returns the properties of the
+    entities as the received operations of that timestamp left them.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, latency_per_op=0.0, error_rate=0.0, rate_limit=None,
+                 seed=None, jitter=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_op = latency_per_op
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._allowance = float(rate_limit or 0)  # token bucket of operations
+        self._last_refill = time.monotonic()
+        self._applied_keys = set()
+        self._nodes = set()
+        self._edges = set()
+        self._properties = {}  # timestamp : {node id or (source id, target id) : properties}
+        self._stats = {
+            "requests": 0,
+            "operations": 0,
+            "dictionaries": 0,
+            "bytes": 0,
+            "errors": 0,
+            "throttled": 0,
+            "duplicates": 0,
+            "orphan_updates": 0,
+        }
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL to use as SERVER_URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def properties(self, timestamp):
+        with self._lock:
+            return {entity: dict(properties) for entity, properties in self._properties.get(timestamp, {}).items()}
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def _throttle(self, operations):
+        """Seconds to wait before `operations` more fit in the rate limit, 0 when they are taken now"""
+        if not self.rate_limit:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(
+                self._allowance + (now - self._last_refill) * self.rate_limit, max(self.rate_limit, operations)
+            )
+            self._last_refill = now
+            if self._allowance >= operations:
+                self._allowance -= operations
+                return 0.0
+            return (operations - self._allowance) / self.rate_limit
+
+    def _apply(self, path, body, key):
+        """Apply a decoded request, returns its number of operations (dictionaries for /dicts)"""
+        with self._lock:
+            if key is not None and key in self._applied_keys:
+                self._stats["duplicates"] += 1
+                return 0
+            if key is not None:
+                self._applied_keys.add(key)
+            if path.endswith("/schema/live/update"):
+                creating = body["action"] == "bulk_create"
+                properties = self._properties.setdefault(body["timestamp"], {})
+                for payload in body["payload"]:
+                    entity = payload.get("node_id") or (payload.get("source_id"), payload.get("target_id"))
+                    entities = self._nodes if "node_id" in payload else self._edges
+                    if creating:
+                        entities.add(entity)
+                    elif entity not in entities:
+                        self._stats["orphan_updates"] += 1
+                    properties.setdefault(entity, {}).update(payload.get("properties") or {})
+                self._stats["operations"] += len(body["payload"])
+                return len(body["payload"])
+            count = len(body["dicts"]) if path.endswith("/dicts/bulk") else 1
+            self._stats["dictionaries"] += count
+            return count
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _answer(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.endswith("/stats"):
+                    self._answer(200, json.dumps(server.stats()).encode())
+                else:
+                    self._answer(404)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path = self.path.rstrip("/")
+                if not path.endswith(("/schema/live/update", "/dicts", "/dicts/bulk")):
+                    self._answer(404)
+                    return
+                encoding = self.headers.get("Content-Encoding")
+                try:
+                    if encoding == "gzip":
+                        data = gzip.decompress(raw)
+                    elif encoding == "deflate":
+                        data = zlib.decompress(raw)
+                    else:
+                        data = raw
+                    body = json.loads(data)
+                except (OSError, zlib.error, ValueError):
+                    self._answer(400)
+                    return
+
+                operations = len(body.get("payload", ())) or len(body.get("dicts", ())) or 1
+                with server._lock:
+                    server._stats["requests"] += 1
+                    server._stats["bytes"] += len(raw)
+                wait = server._throttle(operations)
+                if wait:
+                    with server._lock:
+                        server._stats["throttled"] += 1
+                    self._answer(429, headers=[("Retry-After", f"{wait:.3f}")])
+                    return
+                jitter = server._random.uniform(0, server.jitter) if server.jitter else 0.0
+                time.sleep(server.latency + jitter + server.latency_per_op * operations)
+                if server.error_rate and server._random.random() < server.error_rate:
+                    with server._lock:
+                        server._stats["errors"] += 1
+                    self._answer(500)
+                    return
+                server._apply(path, body, self.headers.get("Idempotency-Key"))
+                self._answer(200, b"{}")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Time taken by every request")
+    parser.add_argument("--latency-per-op-us", type=float, default=0.0, help="Time taken per operation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of answering 500")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Operations per second before 429s")
+    args = parser.parse_args()
+
+    server = LocalGraphServer(
+        args.host, args.port, args.latency_ms / 1e3, args.latency_per_op_us / 1e6, args.error_rate, args.rate_limit
+    )
+    print(f"Graph server stand-in on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats(), indent=2))
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# operation_file.py
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+import networkx as nx
+import numpy as np
+
+from entity_records import IdTable, json_default
+from operation_log import (
+    ACTION_CODES, COLUMN_TYPECODES, DEFAULT_SEGMENT_SIZE, NO_TARGET, OperationLog, graph_attribute
+)
+
+try:
+    import pyarrow as pa
+except ImportError:  # Optional, logs are saved in the framed format without it
+    pa = None
+
+FORMAT_VERSION = 1
+FRAMED_MAGIC = b"SCMOPLOG"
+ARROW_MAGIC = b"ARROW1"
+_FRAME_HEADER = struct.Struct("<4sQ")  # tag, length of the body
+_INT_COLUMNS = tuple(COLUMN_TYPECODES)
+
+# Node types of the operations -> node_type attribute of the generator graph
+GRAPH_NODE_TYPES = {
+    "BUSINESS_GROUP": "business_group",
+    "PRODUCT_FAMILY": "product_family",
+    "PRODUCT_OFFERING": "product_offering",
+    "SUPPLIERS": "supplier",
+    "WAREHOUSE": "warehouse",
+    "FACILITY": "facility",
+    "PARTS": "part",
+}
+
+
+def save_operations(log, path, fmt=None):
+    """
+    Save an OperationLog to `path`: Arrow IPC file when pyarrow is installed (or fmt="arrow"), framed binary file
+    otherwise (fmt="framed"). Properties are stored as JSON (dates as "%Y-%m-%d" strings, as they are pushed).
+    """
+    fmt = fmt or ("arrow" if pa is not None else "framed")
+    if fmt == "arrow":
+        if pa is None:
+            raise ImportError("pyarrow is required to save operations in the Arrow format")
+        _save_arrow(log, path)
+    elif fmt == "framed":
+        _save_framed(log, path)
+    else:
+        raise ValueError(f"Unknown operation file format: {fmt}")
+
+
+def load_operations(path, spill_dir=None, segment_size=DEFAULT_SEGMENT_SIZE):
+    """Load a saved log (any format) in a new OperationLog, bound to a new IdTable"""
+    with open(path, "rb") as f:
+        magic = f.read(len(FRAMED_MAGIC))
+    if magic.startswith(ARROW_MAGIC):
+        if pa is None:
+            raise ImportError("pyarrow is required to load operations saved in the Arrow format")
+        return _load_arrow(path, spill_dir, segment_size)
+    if magic == FRAMED_MAGIC:
+        return _load_framed(path, spill_dir, segment_size)
+    raise ValueError(f"{path} is not a saved operation log")
+
+
+def _metadata(log):
+    return {
+        "format": FORMAT_VERSION,
+        "version": log.version,
+        "ids": log.ids.ids(range(len(log.ids))),
+        "kinds": log.kinds,
+    }
+
+
+def _new_log(metadata, spill_dir, segment_size):
+    if metadata["format"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported operation file format version: {metadata['format']}")
+    ids = IdTable()
+    for node_id in metadata["ids"]:
+        ids.intern(node_id)
+    log = OperationLog(spill_dir, segment_size)
+    log.bind(ids, metadata["version"])
+    for kind in metadata["kinds"]:
+        log._kind_code(kind)
+    return log
+
+
+def _append_segment(log, columns, properties):
+    action, kind, source, target, timestamp, offset = (column.tolist() for column in columns)
+    for row in range(len(action)):
+        log.append_row(action[row], kind[row], source[row], target[row], timestamp[row], properties[offset[row]])
+
+
+# ----------------------------------------------------------------------
+# Framed format: magic, then frames (tag, length, body). A META frame (JSON) followed by one SEGM frame per segment:
+# its row count, the raw int columns and the zlib compressed JSON list of its properties.
+# ----------------------------------------------------------------------
+
+
+def _write_frame(f, tag, body):
+    f.write(_FRAME_HEADER.pack(tag, len(body)))
+    f.write(body)
+
+
+def _save_framed(log, path):
+    with open(path, "wb") as f:
+        f.write(FRAMED_MAGIC)
+        metadata = dict(_metadata(log), byteorder=sys.byteorder)
+        _write_frame(f, b"META", json.dumps(metadata).encode())
+        for segment in log.segments():
+            parts = [struct.pack("<Q", len(segment))]
+            for column in _INT_COLUMNS:
+                data = getattr(segment, column).tobytes()
+                parts.append(struct.pack("<Q", len(data)))
+                parts.append(data)
+            properties = zlib.compress(json.dumps(segment.properties, default=json_default).encode(), 1)
+            parts.append(properties)
+            _write_frame(f, b"SEGM", b"".join(parts))
+
+
+def _read_frames(f):
+    while True:
+        header = f.read(_FRAME_HEADER.size)
+        if not header:
+            return
+        tag, length = _FRAME_HEADER.unpack(header)
+        body = f.read(length)
+        if len(body) != length:
+            raise ValueError("Truncated operation file")
+        yield tag, body
+
+
+def _load_framed(path, spill_dir, segment_size):
+    log = None
+    swap = False
+    with open(path, "rb") as f:
+        f.read(len(FRAMED_MAGIC))
+        for tag, body in _read_frames(f):
+            if tag == b"META":
+                metadata = json.loads(body)
+                log = _new_log(metadata, spill_dir, segment_size)
+                swap = metadata["byteorder"] != sys.byteorder
+            elif tag == b"SEGM":
+                if log is None:
+                    raise ValueError("Operation file without metadata")
+                position = 8
+                columns = []
+                for column in _INT_COLUMNS:
+                    (length,) = struct.unpack_from("<Q", body, position)
+                    position += 8
+                    values = array(COLUMN_TYPECODES[column])
+                    values.frombytes(body[position:position + length])
+                    if swap:
+                        values.byteswap()
+                    columns.append(values)
+                    position += length
+                properties = json.loads(zlib.decompress(body[position:]))
+                _append_segment(log, columns, properties)
+    if log is None:
+        raise ValueError("Operation file without metadata")
+    return log
+
+
+# ----------------------------------------------------------------------
+# Arrow IPC file: one record batch per segment, the metadata in the schema
+# ----------------------------------------------------------------------
+
+
+def _arrow_schema(log):
+    return pa.schema(
+        [
+            pa.field("action", pa.int8()),
+            pa.field("kind", pa.int16()),
+            pa.field("source", pa.int32()),
+            pa.field("target", pa.int32()),
+            pa.field("timestamp", pa.int32()),
+            pa.field("properties", pa.large_string()),
+        ],
+        metadata={b"operations": json.dumps(_metadata(log)).encode()},
+    )
+
+
+def _save_arrow(log, path):
+    schema = _arrow_schema(log)
+    dtypes = (np.int8, np.int16, np.int32, np.int32, np.int32)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for segment in log.segments():
+            blobs = [json.dumps(properties, default=json_default) for properties in segment.properties]
+            arrays = [
+                pa.array(np.frombuffer(getattr(segment, column), dtype=dtype))
+                for column, dtype in zip(_INT_COLUMNS, dtypes)
+            ]
+            arrays.append(pa.array([blobs[offset] for offset in segment.offset], type=pa.large_string()))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+
+
+def _load_arrow(path, spill_dir, segment_size):
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        log = _new_log(json.loads(reader.schema.metadata[b"operations"]), spill_dir, segment_size)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            columns = [batch.column(column).to_numpy() for column in _INT_COLUMNS[:-1]]
+            properties = [json.loads(blob) for blob in batch.column("properties").to_pylist()]
+            columns.append(np.arange(len(properties)))
+            _append_segment(log, columns, properties)
+    return log
+
+
+# ----------------------------------------------------------------------
+# Replay
+# ----------------------------------------------------------------------
+
+
+def replay(log, timestamp=None):
+    """
+    Graph state described by a log at `timestamp` (the last one by default): every create up to it, then every
+    update up to it, timestamp by timestamp, the way the graph server applies a push. Node properties are set
+    under the graph attributes of the generator (e.g. the `capacity` updates of warehouses set `current_capacity`),
+    so a replayed period compares with `SupplyChainGenerator.get_graph_snapshot`.
+    """
+    graph = nx.DiGraph()
+    node_id = log.ids.id
+    kinds = log.kinds
+    for action in ("create", "update"):
+        action_code = ACTION_CODES[action]
+        for ts in log.timestamps(action):
+            if timestamp is not None and ts > timestamp:
+                break
+            key = (action_code, ts)
+            for segment in log.segments(key):
+                for row in segment.rows[key]:
+                    properties = segment.properties[segment.offset[row]]
+                    source = node_id(segment.source[row])
+                    if segment.target[row] == NO_TARGET:
+                        kind = kinds[segment.kind[row]]
+                        attributes = {graph_attribute(kind, key): value for key, value in properties.items()}
+                        if action == "create":
+                            graph.add_node(source, **attributes, node_type=GRAPH_NODE_TYPES.get(kind, kind))
+                        else:
+                            graph.add_node(source, **attributes)
+                    else:
+                        graph.add_edge(source, node_id(segment.target[row]), **properties)
+    return graph
@@ -0,0 +1,468 @@
+# operation_log.py
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+
+ACTIONS = ("create", "update")
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+NO_TARGET = -1  # target column of node operations
+DEFAULT_SEGMENT_SIZE = 50_000  # operations per segment of a spilling log
+# Typed columns of the segments (array typecodes)
+COLUMN_TYPECODES = {"action": "b", "kind": "h", "source": "i", "target": "i", "timestamp": "i", "offset": "i"}
+# Node properties logged under another key than the graph attribute they set, per node type of the operations
+GRAPH_ATTRIBUTES = {"WAREHOUSE": {"capacity": "current_capacity"}}
+
+
+def graph_attribute(node_type, key):
+    """Graph attribute set by the `key` property of an operation on a node of `node_type`"""
+    return GRAPH_ATTRIBUTES.get(node_type, {}).get(key, key)
+
+
+class _Segment:
+    """
+    Rows of an OperationLog kept in memory: typed columns (action code, kind code, interned source / target ids,
+    timestamp, properties offset), the properties by reference and the row numbers per (action code, timestamp).
+    """
+
+    COLUMNS = ("action", "kind", "source", "target", "timestamp", "offset", "properties", "rows")
+
+    def __init__(self, log):
+        self.log = log
+        for column, typecode in COLUMN_TYPECODES.items():
+            setattr(self, column, array(typecode))
+        self.properties = []
+        self.rows = {}  # (action code, timestamp) : array of row numbers
+
+    def append(self, action_code, kind_code, source, target, timestamp, properties):
+        row = len(self.action)
+        # Consecutive operations logging the same object share their properties
+        if not self.properties or self.properties[-1] is not properties:
+            self.properties.append(properties)
+
+        self.action.append(action_code)
+        self.kind.append(kind_code)
+        self.source.append(source)
+        self.target.append(target)
+        self.timestamp.append(timestamp)
+        self.offset.append(len(self.properties) - 1)
+
+        key = (action_code, timestamp)
+        rows = self.rows.get(key)
+        if rows is None:
+            rows = self.rows[key] = array("i")
+        rows.append(row)
+
+    def __len__(self):
+        return len(self.action)
+
+    def counts(self):
+        return {key: len(rows) for key, rows in self.rows.items()}
+
+    def count(self, key):
+        if key is None:
+            return len(self)
+        rows = self.rows.get(key)
+        return len(rows) if rows is not None else 0
+
+    def operation(self, key, i):
+        """The operation dict of the i-th row of `key` (of the segment when key is None)"""
+        row = i if key is None else self.rows[key][i]
+        log = self.log
+        if self.target[row] == NO_TARGET:
+            payload = {
+                "node_id": log.ids.id(self.source[row]),
+                "node_type": log.kinds[self.kind[row]],
+                "properties": self.properties[self.offset[row]],
+            }
+        else:
+            payload = {
+                "source_id": log.ids.id(self.source[row]),
+                "target_id": log.ids.id(self.target[row]),
+                "edge_type": log.kinds[self.kind[row]],
+                "properties": self.properties[self.offset[row]],
+            }
+        return {
+            "action": ACTIONS[self.action[row]],
+            "type": "schema",
+            "payload": payload,
+            "timestamp": self.timestamp[row],
+            "version": log.version,
+        }
+
+    def operations(self, key=None, start=0, stop=None):
+        if stop is None:
+            stop = self.count(key)
+        for i in range(start, stop):
+            yield self.operation(key, i)
+
+
+class _SpilledSegment:
+    """A segment written to disk (pickle of its columns), only its row counts stay in memory"""
+
+    def __init__(self, log, path, counts, length):
+        self.log = log
+        self.path = path
+        self._counts = counts  # (action code, timestamp) : number of rows
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def counts(self):
+        return dict(self._counts)
+
+    def count(self, key):
+        if key is None:
+            return self._length
+        return self._counts.get(key, 0)
+
+    def operation(self, key, i):
+        return self.log._read_segment(self).operation(key, i)
+
+    def operations(self, key=None, start=0, stop=None):
+        if key is not None and key not in self._counts:
+            return iter(())
+        return self.log._read_segment(self).operations(key, start, stop)
+
+
+class OperationSink:
+    """
+    Interface of the operation logs of a SupplyChainGenerator (`operations_log`, `simulation_log`). The generator
+    binds its IdTable and version to the sink, then sends every create/update through `log_node` / `log_edge` and
+    calls `flush` at the end of each generation or simulation step.
+
+    Implementations:
+    - OperationLog: columnar log in memory, or spilling its segments to disk with a `spill_dir`
+    - NullOperationLog: drops everything (CSV only workflows)
+    - StreamingOperationLog: forwards batches of operations to a consumer as they are produced
+    """
+
+    enabled = True  # False when the logged operations are dropped, callers can skip building them
+
+    def __init__(self):
+        self.ids = None
+        self.version = None
+
+    def bind(self, ids, version):
+        self.ids = ids  # IdTable of the generator
+        self.version = version
+
+    def log_node(self, action, timestamp, node_id, node_type, properties):
+        raise NotImplementedError
+
+    def log_edge(self, action, timestamp, source_id, target_id, edge_type, properties):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Release what the sink holds outside of memory (files), once the generator using it is dropped"""
+
+    def operations(self, action, coalesce=False):
+        """{timestamp: view of the operations of `action` at that timestamp} still held by the sink"""
+        return {}
+
+    def view(self):
+        """View of every operation held by the sink, in logging order"""
+        return OperationView([])
+
+    def __len__(self):
+        return 0
+
+
+class OperationLog(OperationSink):
+    """
+    Append-only columnar log of the create/update operations of a SupplyChainGenerator.
+
+    Operations are rows of typed columns, see `_Segment`. Node ids are interned in the IdTable of the generator and
+    the kinds (node / edge types) in `kinds`; properties are kept by reference (records, edge dicts).
+
+    Rows are indexed per (action, timestamp), so `operations(action)` returns views over the log instead of lists
+    of operation dicts. The dicts of the old format are built when a view is read.
+
+    With a `spill_dir`, the log is cut in segments of `segment_size` operations and every full segment is written
+    to a file in a directory of its own under `spill_dir`; only the active segment (and the last segment read back)
+    stays in memory. Spilled operations hold the properties as they were when their segment was written.
+    `close()` deletes that directory; it is also deleted when the log is garbage collected or at exit.
+    """
+
+    def __init__(self, spill_dir=None, segment_size=DEFAULT_SEGMENT_SIZE):
+        super().__init__()
+        self.kinds = []
+        self._kind_codes = {}
+
+        self.segment_size = segment_size
+        self.directory = None
+        self._cleanup = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self.directory = tempfile.mkdtemp(prefix="oplog-", dir=spill_dir)
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+        self._segments = [_Segment(self)]
+        self._length = 0
+        self._read = None  # (spilled segment, segment read back) of the last segment read
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_read"] = None
+        state["_cleanup"] = None  # the directory stays owned by the original log
+        return state
+
+    def close(self):
+        """Delete the spill directory and drop every operation, the log is empty afterwards"""
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+        self._segments = [_Segment(self)]
+        self._length = 0
+        self._read = None
+
+    def _kind_code(self, kind):
+        code = self._kind_codes.get(kind)
+        if code is None:
+            code = self._kind_codes[kind] = len(self.kinds)
+            self.kinds.append(kind)
+        return code
+
+    def _append(self, action, kind, source, target, timestamp, properties):
+        action_code = ACTION_CODES.get(action)
+        if action_code is None:
+            raise ValueError(f"Unknown operation action: {action}")
+        self.append_row(action_code, self._kind_code(kind), source, target, timestamp, properties)
+
+    def append_row(self, action_code, kind_code, source, target, timestamp, properties):
+        """Append a row of codes (ids interned in the bound IdTable, kind in `kinds`), used to load saved logs"""
+        active = self._segments[-1]
+        active.append(action_code, kind_code, source, target, timestamp, properties)
+        self._length += 1
+        if self.directory is not None and len(active) >= self.segment_size:
+            self._spill()
+
+    def log_node(self, action, timestamp, node_id, node_type, properties):
+        self._append(action, node_type, self.ids.intern(node_id), NO_TARGET, timestamp, properties)
+
+    def log_edge(self, action, timestamp, source_id, target_id, edge_type, properties):
+        self._append(
+            action, edge_type, self.ids.intern(source_id), self.ids.intern(target_id), timestamp, properties
+        )
+
+    # ------------------------------------------------------------------
+    # Spilling
+    # ------------------------------------------------------------------
+
+    def _spill(self):
+        """Write the active segment to disk and start a new one"""
+        active = self._segments[-1]
+        path = os.path.join(self.directory, f"segment_{len(self._segments) - 1:06d}.pkl")
+        with open(path, "wb") as f:
+            pickle.dump(
+                [getattr(active, column) for column in _Segment.COLUMNS], f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        # Views taken before keep a reference to the in memory segment, new ones read the file
+        self._segments[-1] = _SpilledSegment(self, path, active.counts(), len(active))
+        self._segments.append(_Segment(self))
+
+    def _read_segment(self, segment):
+        """In memory segment of a spilled one, the last one read is kept"""
+        if self._read is not None and self._read[0] is segment:
+            return self._read[1]
+        loaded = _Segment(self)
+        with open(segment.path, "rb") as f:
+            for column, values in zip(_Segment.COLUMNS, pickle.load(f)):
+                setattr(loaded, column, values)
+        self._read = (segment, loaded)
+        return loaded
+
+    def segments(self, key=None):
+        """
+        The segments of the log with their columns in memory (spilled ones are read back one at a time), only
+        those holding rows of `key` ((action code, timestamp)) when given
+        """
+        for segment in self._segments:
+            if key is not None and not segment.count(key):
+                continue
+            yield self._read_segment(segment) if isinstance(segment, _SpilledSegment) else segment
+
+    def timestamps(self, action):
+        """Sorted timestamps having operations of `action`"""
+        action_code = ACTION_CODES[action]
+        return sorted({key[1] for segment in self._segments for key in segment.counts() if key[0] == action_code})
+
+    def iter_segments(self):
+        """Stream the operations segment by segment (lists of operation dicts), for exports"""
+        for segment in self._segments:
+            yield list(segment.operations())
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def operations(self, action, coalesce=False):
+        """
+        {timestamp: view of the operations of `action` at that timestamp}, ordered by timestamp.
+
+        With `coalesce`, the operations on the same entity (node, or edge) within a timestamp are merged into one
+        operation holding the final value of every property they set, placed where the last of them was logged.
+        Meant for updates, e.g. the capacity of a warehouse updated after each part it gets connected to.
+        """
+        action_code = ACTION_CODES[action]
+        parts = {}
+        for segment in self._segments:
+            for key, count in segment.counts().items():
+                if key[0] == action_code and count:
+                    parts.setdefault(key[1], []).append((segment, key, count))
+        if coalesce:
+            views = {}
+            for timestamp in sorted(parts):
+                segment = self._coalesce(parts[timestamp])
+                views[timestamp] = OperationView([(segment, None, len(segment))])
+            return views
+        return {timestamp: OperationView(parts[timestamp]) for timestamp in sorted(parts)}
+
+    def _coalesce(self, parts):
+        """In memory segment holding one operation per entity of the rows of `parts` (a single action and timestamp)"""
+        merged = {}  # (kind, source, target) : (properties, whether they are a merged copy)
+        for segment, key, _ in parts:
+            if isinstance(segment, _SpilledSegment):
+                segment = self._read_segment(segment)
+            for row in segment.rows[key]:
+                entity = (segment.kind[row], segment.source[row], segment.target[row])
+                properties = segment.properties[segment.offset[row]]
+                previous = merged.pop(entity, None)  # re-inserted, entities are ordered by their last operation
+                if previous is None:
+                    merged[entity] = (properties, False)
+                elif previous[1]:
+                    previous[0].update(properties)
+                    merged[entity] = previous
+                else:
+                    merged[entity] = ({**previous[0], **properties}, True)
+
+        coalesced = _Segment(self)
+        action_code, timestamp = parts[0][1]
+        for (kind, source, target), (properties, _) in merged.items():
+            coalesced.append(action_code, kind, source, target, timestamp, properties)
+        return coalesced
+
+    def view(self):
+        """View of every operation, in logging order"""
+        return OperationView([(segment, None, len(segment)) for segment in self._segments if len(segment)])
+
+    def __iter__(self):
+        for segment in self._segments:
+            yield from segment.operations()
+
+    def __len__(self):
+        return self._length
+
+
+class OperationView(Sequence):
+    """
+    Read only sequence over parts of an OperationLog: (segment, key, count) triples, `key` being an
+    (action code, timestamp) row index or None for every row of the segment. Slicing narrows the range without copying,
+    items are built as operation dicts when read.
+    """
+
+    __slots__ = ("parts", "ends", "start", "stop")
+
+    def __init__(self, parts, start=0, stop=None):
+        self.parts = parts
+        self.ends = []
+        total = 0
+        for _, _, count in parts:
+            total += count
+            self.ends.append(total)
+        self.start = start
+        self.stop = total if stop is None else stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            return OperationView(self.parts, self.start + start, self.start + max(start, stop))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("operation index out of range")
+        position = self.start + i
+        part = bisect_right(self.ends, position)
+        segment, key, count = self.parts[part]
+        return segment.operation(key, position - (self.ends[part] - count))
+
+    def __iter__(self):
+        part_start = 0
+        for (segment, key, count), part_end in zip(self.parts, self.ends):
+            if part_end > self.start and part_start < self.stop:
+                yield from segment.operations(
+                    key, max(self.start - part_start, 0), min(self.stop, part_end) - part_start
+                )
+            part_start = part_end
+
+
+class NullOperationLog(OperationSink):
+    """Sink dropping every operation, for runs that never push to the graph server"""
+
+    enabled = False
+
+    def log_node(self, action, timestamp, node_id, node_type, properties):
+        pass
+
+    def log_edge(self, action, timestamp, source_id, target_id, edge_type, properties):
+        pass
+
+
+class StreamingOperationLog(OperationSink):
+    """
+    Sink forwarding the operations to `consumer(action, timestamp, operations)` as they are produced, in batches of
+    about `batch_size` operations (and on `flush`). Nothing is kept once forwarded.
+
+    A batch is split per (action, timestamp) and its creates are forwarded before its updates, so an update never
+    reaches the consumer before the create of its entity.
+    """
+
+    def __init__(self, consumer, batch_size=1000):
+        super().__init__()
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self._batch = OperationLog()
+        self._forwarded = 0
+
+    def bind(self, ids, version):
+        super().bind(ids, version)
+        self._batch.bind(ids, version)
+
+    def log_node(self, action, timestamp, node_id, node_type, properties):
+        self._batch.log_node(action, timestamp, node_id, node_type, properties)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def log_edge(self, action, timestamp, source_id, target_id, edge_type, properties):
+        self._batch.log_edge(action, timestamp, source_id, target_id, edge_type, properties)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not len(self._batch):
+            return
+        batch = self._batch
+        # A new batch first: the consumer may run while the generator keeps logging
+        self._batch = OperationLog()
+        self._batch.bind(self.ids, self.version)
+        for action in ACTIONS:
+            for timestamp, operations in batch.operations(action).items():
+                self.consumer(action, timestamp, list(operations))
+        self._forwarded += len(batch)
+
+    @property
+    def forwarded(self):
+        """Number of operations forwarded to the consumer"""
+        return self._forwarded
@@ -2,13 +2,19 @@ import streamlit as st
 import pandas as pd
 import os
 from dotenv import load_dotenv
-import requests
 from data_generator import SupplyChainGenerator
 import time
 import copy
+import json
 import plotly.express as px
 import copy
 from datetime import datetime
+from operation_file import load_operations, save_operations
+from operation_log import NullOperationLog, OperationLog, StreamingOperationLog
+from push_engine import (
+    DEFAULT_MAX_IN_FLIGHT, BatchSizer, PushCheckpoint, PushChunk, PushEngine, PushPipeline, PushTelemetry,
+    dictionary_chunks, dictionary_entries, operation_chunks, pending_ranges
+)
 
 load_dotenv()
 server_url = os.getenv("SERVER_URL", "http://172.17.149.238/api")
@@ -19,6 +25,77 @@ server_url = os.getenv("SERVER_URL", "http://172.17.149.238/api")
 st.set_page_config(layout="wide")
 
 
+def upload_pipeline(url, version):
+    """Consumer of a StreamingOperationLog uploading its batches in the background while the generator runs"""
+    engine = PushEngine(
+        f"{url}/schema/live/update", max_in_flight=st.session_state.push_in_flight, **push_encoding()
+    )
+    return PushPipeline(engine, version, exclude=excluded_properties())
+
+
+def upload_pipelines(generator):
+    """{log name: PushPipeline} of the logs the generator streams to the server (Stream to server)"""
+    return {
+        log: sink.consumer
+        for log, sink in (("generation", generator.operations_log), ("simulation", generator.simulation_log))
+        if isinstance(sink, StreamingOperationLog) and isinstance(sink.consumer, PushPipeline)
+    }
+
+
+def mark_uploads(generator):
+    """Telemetry marks of the upload pipelines, taken before a generation step to summarize its uploads only"""
+    return {log: pipeline.engine.telemetry.mark() for log, pipeline in upload_pipelines(generator).items()}
+
+
+def wait_for_uploads(generator, marks=None):
+    """
+    Wait for the batches the generator streamed to the server (Stream to server) during the step started at
+    `marks` (see mark_uploads) to be uploaded, and show / save the telemetry of these uploads
+    """
+    marks = marks or {}
+    for log, pipeline in upload_pipelines(generator).items():
+        telemetry = pipeline.engine.telemetry
+        since = marks.get(log)
+        status = "complete"
+        with st.spinner(f"Uploading the last {pipeline.pending} streamed batches..."):
+            try:
+                pipeline.join()
+            except Exception as e:
+                status = f"failed: {str(e)}"
+                st.error(f"Error streaming operations to the server: {str(e)}")
+        if not telemetry.summary(since=since)["requests"]:
+            continue  # nothing was streamed to this log during the step
+        summary = finish_push_telemetry(
+            telemetry, f"{pipeline.version}-{generator.seed}-{log}-stream", status, since
+        )
+        st.write(f"{summary['operations']} operations streamed to the server")
+
+
+def close_uploads(generator):
+    """
+    Stop the upload threads and HTTP sessions of a generator that is being replaced (Stream to server) and delete
+    the segments its operation logs spilled to disk
+    """
+    if generator is None:
+        return
+    for pipeline in upload_pipelines(generator).values():
+        pipeline.close()
+    generator.operations_log.close()
+    generator.simulation_log.close()
+
+
+def operation_log_sinks(mode, url, version):
+    """Sink arguments of SupplyChainGenerator for the selected operation log mode"""
+    if mode == "Drop (CSV only)":
+        return {"op_log": NullOperationLog(), "simulation_op_log": NullOperationLog()}
+    if mode == "Stream to server":
+        return {
+            "op_log": StreamingOperationLog(upload_pipeline(url, version)),
+            "simulation_op_log": StreamingOperationLog(upload_pipeline(url, version)),
+        }
+    return {}
+
+
 def initialize_session_state():
     if 'generator' not in st.session_state:
         st.session_state.generator = None
@@ -26,6 +103,22 @@ def initialize_session_state():
         st.session_state.current_period = 0
     if 'include_units_in_chain' not in st.session_state:
         st.session_state.include_units_in_chain = False
+    if 'coalesce_updates' not in st.session_state:
+        st.session_state.coalesce_updates = False
+    if 'push_in_flight' not in st.session_state:
+        st.session_state.push_in_flight = DEFAULT_MAX_IN_FLIGHT
+    if 'push_checkpoint_dir' not in st.session_state:
+        st.session_state.push_checkpoint_dir = os.getenv("PUSH_CHECKPOINT_DIR", "push_checkpoints")
+    if 'push_batch_sizes' not in st.session_state:
+        st.session_state.push_batch_sizes = {"min_size": 100, "max_size": 20000, "target_seconds": 1.0}
+    if 'dict_timestamps_per_request' not in st.session_state:
+        st.session_state.dict_timestamps_per_request = 0
+    if 'push_compression' not in st.session_state:
+        st.session_state.push_compression = None
+    if 'push_float_digits' not in st.session_state:
+        st.session_state.push_float_digits = None
+    if 'push_telemetry_dir' not in st.session_state:
+        st.session_state.push_telemetry_dir = os.getenv("PUSH_TELEMETRY_DIR", "push_telemetry")
 
 
 def export_data(generator, export_dir):
@@ -51,92 +144,167 @@ def export_data_for_simulation(generator, export_dir):
 
 
 def export_dictionaries(generator, url, version):
-    [temporal_po_demand, temporal_po_cost] = generator.return_simulation_dictionaries_po()
-    [temporal_sa_demand, temporal_sa_cost] = generator.return_simulation_dictionaries_sa()
-    [temporal_rm_demand, temporal_rm_cost] = generator.return_simulation_dictionaries_rm()
-    supplier_parts = generator.return_suppliers_parts()
-
-    for timestamp, po_demand in temporal_po_demand.items():
-        payload_po = {
-            "version": version,
-            "timestamp": timestamp,
-            "type": "PRODUCT_OFFERING_DEMAND",
-            "dict": po_demand
-        }
-
-        requests.post(f"{url}/dicts", json=payload_po)
-        # time.sleep(1)
-
-    for timestamp, po_cost in temporal_po_cost.items():
-        payload_po = {
-            "version": version,
-            "timestamp": timestamp,
-            "type": "PRODUCT_OFFERING_COST",
-            "dict": po_cost
-        }
-
-        requests.post(f"{url}/dicts", json=payload_po)
-        # time.sleep(1)
-
-    for timestamp, sa_demand in temporal_sa_demand.items():
-        payload_sa = {
-            "version": version,
-            "timestamp": timestamp,
-            "type": "SUB_ASSEMBLIES_DEMAND",
-            "dict": sa_demand
-        }
-
-        requests.post(f"{url}/dicts", json=payload_sa)
-        # time.sleep(1)
-
-    for timestamp, sa_cost in temporal_sa_cost.items():
-        payload_sa = {
-            "version": version,
-            "timestamp": timestamp,
-            "type": "SUB_ASSEMBLIES_COST",
-            "dict": sa_cost
-        }
-
-        requests.post(f"{url}/dicts", json=payload_sa)
-        # time.sleep(1)
-
-    for timestamp, rm_demand in temporal_rm_demand.items():
-        payload_rm = {
-            "version": version,
-            "timestamp": timestamp,
-            "type": "RAW_MATERIALS_DEMAND",
-            "dict": rm_demand
-        }
-
-        requests.post(f"{url}/dicts", json=payload_rm)
-        # time.sleep(1)
-
-    for timestamp, rm_cost in temporal_rm_cost.items():
-        payload_rm = {
-            "version": version,
-            "timestamp": timestamp,
-            "type": "RAW_MATERIALS_COST",
-            "dict": rm_cost
-        }
-
-        requests.post(f"{url}/dicts", json=payload_rm)
+    """
+    Upload the simulation dictionaries concurrently. One request per dictionary to /dicts, or with "Batched per
+    timestamps" all the dictionaries of `dict_timestamps_per_request` timestamps per request to /dicts/bulk
+    ({"version", "dicts": [{"timestamp", "type", "dict"}, ...]}).
+    """
+    entries = list(dictionary_entries(generator))
+    if st.session_state.dict_timestamps_per_request:
+        endpoint = f"{url}/dicts/bulk"
+        chunks = dictionary_chunks(entries, version, st.session_state.dict_timestamps_per_request)
+    else:
+        endpoint = f"{url}/dicts"
+        chunks = (PushChunk({"version": version, **entry}, 1) for entry in entries)
+    telemetry = PushTelemetry()
+    status = "failed"
+    try:
+        with PushEngine(
+                endpoint, max_in_flight=st.session_state.push_in_flight, telemetry=telemetry, **push_encoding()
+        ) as engine:
+            engine.push(chunks)
+        status = "complete"
+    finally:
+        finish_push_telemetry(telemetry, f"{version}-{generator.seed}-dictionaries", status)
+
+
+def push_encoding():
+    """Body encoding arguments of PushEngine selected in the sidebar"""
+    return {
+        "compression": st.session_state.push_compression,
+        "float_digits": st.session_state.push_float_digits,
+    }
 
-        # time.sleep(1)
 
-    payload_sup_parts = {
-        "version": version,
-        "timestamp": 0,
-        "type" : "SUPPLIERS_PARTS",
-        "dict" : supplier_parts
-    }
+def push_checkpoint(name):
+    """Checkpoint of the push `name` in the Push Checkpoint Directory, None when it is disabled"""
+    if not st.session_state.push_checkpoint_dir:
+        return None
+    return PushCheckpoint(os.path.join(st.session_state.push_checkpoint_dir, f"{name}.jsonl"))
+
+
+def show_push_metrics(placeholder, telemetry, window=None, since=None):
+    """
+    Throughput, latency percentiles and errors of a push so far (from the mark `since`) in `placeholder`, with the
+    ops/s of the last `window` seconds
+    """
+    summary = telemetry.summary(window, since)
+    with placeholder.container():
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Operations / s", f"{summary['ops_per_second']:,.0f}")
+        col2.metric(
+            "Latency p50 / p95 / p99",
+            f"{summary['p50_ms']:.0f} / {summary['p95_ms']:.0f} / {summary['p99_ms']:.0f} ms"
+        )
+        col3.metric(
+            "Errors", summary["errors"],
+            help=", ".join(f"{status}: {count}" for status, count in summary["statuses"].items()) or None
+        )
+        col4.metric("Retries", summary["retries"], help=f"{summary['throttled']} throttled (429 / 503)")
+    return summary
+
+
+def finish_push_telemetry(telemetry, name, status, since=None):
+    """
+    Show the final metrics of a push (the requests after the mark `since`) and save them in the Push Telemetry
+    Directory (when set). Returns the summary
+    """
+    summary = show_push_metrics(st.empty(), telemetry, since=since)
+    st.caption(
+        f"{summary['acknowledged']} requests in {summary['seconds']:.1f} s: {summary['server_seconds']:.1f} s "
+        f"waiting on the server, {summary['encode_seconds']:.1f} s encoding, {summary['wait_seconds']:.1f} s "
+        f"backing off (summed over the request threads)"
+    )
+    if st.session_state.push_telemetry_dir:
+        path = os.path.join(
+            st.session_state.push_telemetry_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        telemetry.write(path, since, name=name, status=status)
+        st.write(f"Push telemetry saved to {path}")
+    return summary
+
+
+def excluded_properties():
+    """Properties left out of the pushed payloads"""
+    return frozenset() if st.session_state.include_units_in_chain else frozenset(['units_in_chain'])
+
+
+def push_operations(create_ops_dict, update_ops_dict, url, version, checkpoint=None, stream=None):
+    """
+    Push {timestamp: operations} to the graph server in bulk payloads, with up to `push_in_flight` concurrent
+    requests. Every create is acknowledged before the first update is sent.
+
+    With a PushCheckpoint, the chunks acknowledged by an earlier (failed) push are skipped and the new ones are
+    recorded; the checkpoint is cleared once everything went through. `stream` names the pushed log in the chunk
+    keys (see operation_chunks).
+    """
+    stream = stream or version
+    total_create_ops = sum(len(ops) for ops in create_ops_dict.values())
+    total_update_ops = sum(len(ops) for ops in update_ops_dict.values())
+    total_ops = total_create_ops + total_update_ops
+    pending_ops = sum(
+        stop - start
+        for action, ops_dict in (("create", create_ops_dict), ("update", update_ops_dict))
+        for _, _, ranges in pending_ranges(ops_dict, action, stream, checkpoint)
+        for start, stop in ranges
+    )
 
-    requests.post(f"{url}/dicts", json=payload_sup_parts)
+    st.write(f"Total operations : {total_ops}")
+    if pending_ops < total_ops:
+        st.write(f"Resuming, {total_ops - pending_ops} operations were already acknowledged")
+    st.write(f"Pushing into : {server_url}")
+
+    progress = st.progress(0)
+    metrics = st.empty()
+    telemetry = PushTelemetry()
+    pushed = total_ops - pending_ops
+    shown = 0.0
+
+    def on_ack(chunk):
+        nonlocal pushed, shown
+        if checkpoint is not None:
+            checkpoint.record(chunk)
+        pushed += chunk.operations
+        progress.progress(pushed / total_ops if total_ops else 1.0)
+        if time.monotonic() - shown > 0.5:
+            show_push_metrics(metrics, telemetry, window=5.0)
+            shown = time.monotonic()
+
+    # Creates and updates are sized separately, node creates are much larger than edge updates
+    sizers = {action: BatchSizer(**st.session_state.push_batch_sizes) for action in ("create", "update")}
+    status = "failed"
+    try:
+        with PushEngine(
+                f"{url}/schema/live/update", max_in_flight=st.session_state.push_in_flight, telemetry=telemetry,
+                **push_encoding()
+        ) as engine:
+            for action, ops_dict in (("create", create_ops_dict), ("update", update_ops_dict)):
+                chunks = operation_chunks(
+                    ops_dict, action, version, checkpoint, sizers[action], excluded_properties(), stream
+                )
+                engine.push(chunks, on_ack, sizers[action])
+        status = "complete"
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        metrics.empty()
+        finish_push_telemetry(telemetry, stream, status)
+    if checkpoint is not None:
+        checkpoint.complete()
+
+    st.write(
+        f"Sent {engine.bytes_sent / 1e6:.2f} MB ({engine.json_bytes / 1e6:.2f} MB of JSON), "
+        f"{engine.bytes_per_op:.1f} bytes per operation"
+    )
+    for action, sizer in sizers.items():
+        st.write(f"Bulk {action}: {sizer.summary()}")
 
 
 def export_to_server(generator, url, version, simulation=False):
     try:
         st.write(version)
         # export_list = generator.return_operation()
+        generator.coalesce_updates = st.session_state.coalesce_updates
         if not simulation:
             create_ops_dict = generator.return_create_operations()
             update_ops_dict = generator.return_update_operations()
@@ -145,105 +313,12 @@ def export_to_server(generator, url, version, simulation=False):
             create_ops_dict = generator.return_simulate_create_operations()
             update_ops_dict = generator.return_simulate_update_operations()
 
-        total_create_ops = sum(len(ops) for ops in create_ops_dict.values())
-        total_update_ops = sum(len(ops) for ops in update_ops_dict.values())
-        total_ops = total_create_ops + total_update_ops
-        # print(create_ops_dict)
-        # sorted_create_ops_dict = {k:create_ops_dict[k] for k in sorted(create_ops_dict.keys())}
-        # sorted_update_ops_dict = {k:update_ops_dict[k] for k in sorted(update_ops_dict.keys())}
-
-        # print(update_ops_dict)
-
-        st.write(f"Total operations : {total_ops}")
-        st.write(f"Pushing into : {server_url}")
-
-        progress = st.progress(0)
-        current_progress = 0
-
         # if simulation:
         #     export_simulation_data(generator, url, version)
 
-        # Add toggle for units_in_chain
-        if not st.session_state.include_units_in_chain:
-            # Current implementation (excluding units_in_chain)
-            for key, list_ops in create_ops_dict.items():
-                for i in range(0, len(list_ops), 1000):
-                    bulk_create_payload = {
-                        "version": version,
-                        "action": "bulk_create",
-                        "type": "schema",
-                        "timestamp": key,
-                        "payload": []
-                    }
-                    for op in list_ops[i:i + 1000]:
-                        new_ops = copy.deepcopy(op['payload'])
-
-                        new_ops['properties'] = {k: v for k, v in new_ops['properties'].items() if
-                                                 k != 'units_in_chain'}
-
-                        bulk_create_payload['payload'].append(new_ops)
-                    requests.post(f"{url}/schema/live/update", json=bulk_create_payload)
-                    time.sleep(1)
-
-                    current_progress += len(list_ops[i:i + 1000])
-                    progress.progress(current_progress / total_ops)
-
-            for key, list_ops in update_ops_dict.items():
-                for i in range(0, len(list_ops), 1000):
-                    bulk_update_payload = {
-                        "version": version,
-                        "action": "bulk_update",
-                        "type": "schema",
-                        "timestamp": key,
-                        "payload": []
-                    }
-                    for op in list_ops[i:i + 1000]:
-                        new_ops = copy.deepcopy(op['payload'])
-
-                        new_ops['properties'] = {k: v for k, v in new_ops['properties'].items() if
-                                                 k != 'units_in_chain'}
-
-                        bulk_update_payload['payload'].append(new_ops)
-                    requests.post(f"{url}/schema/live/update", json=bulk_update_payload)
-                    time.sleep(1)
-
-                    current_progress += len(list_ops[i:i + 1000])
-                    progress.progress(current_progress / total_ops)
-        else:
-            # Original implementation (including units_in_chain)
-            for key, list_ops in create_ops_dict.items():
-                for i in range(0, len(list_ops), 1000):
-                    bulk_create_payload = {
-                        "version": version,
-                        "action": "bulk_create",
-                        "type": "schema",
-                        "timestamp": key,
-                        "payload": []
-                    }
-                    for op in list_ops[i:i + 1000]:
-                        bulk_create_payload['payload'].append(op['payload'])
-                    requests.post(f"{url}/schema/live/update", json=bulk_create_payload)
-                    time.sleep(1)
-
-                    current_progress += len(list_ops[i:i + 1000])
-                    progress.progress(current_progress / total_ops)
-
-            for key, list_ops in update_ops_dict.items():
-                for i in range(0, len(list_ops), 1000):
-                    bulk_update_payload = {
-                        "version": version,
-                        "action": "bulk_update",
-                        "type": "schema",
-                        "timestamp": key,
-                        "payload": []
-                    }
-                    for op in list_ops[i:i + 1000]:
-                        bulk_update_payload['payload'].append(op['payload'])
-                    requests.post(f"{url}/schema/live/update", json=bulk_update_payload)
-                    time.sleep(1)
-
-                    current_progress += len(list_ops[i:i + 1000])
-                    progress.progress(current_progress / total_ops)
+        # Checkpoint per generator and operation log, an export that fails resumes where it stopped
+        name = f"{version}-{generator.seed}-{'simulation' if simulation else 'generation'}"
+        push_operations(create_ops_dict, update_ops_dict, url, version, push_checkpoint(name), name)
 
         if simulation:
             export_dictionaries(generator, url, version)
@@ -252,9 +327,42 @@ def export_to_server(generator, url, version, simulation=False):
 
 
     except Exception as e:
+        if st.session_state.push_checkpoint_dir:
+            return False, f"Error exporting data: {str(e)} (exporting again resumes after the acknowledged chunks)"
         return False, f"Error exporting data: {str(e)}"
 
 
+def save_operation_log(generator, path, simulation=False):
+    try:
+        log = generator.simulation_log if simulation else generator.operations_log
+        if not isinstance(log, OperationLog):
+            return False, "The operations of this generator were not kept (Operation Log setting)"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        save_operations(generator.return_operations_log(simulation), path)
+        return True, f"Operation log saved to {path}"
+    except Exception as e:
+        return False, f"Error saving the operation log: {str(e)}"
+
+
+def push_saved_operation_log(path, url, version):
+    try:
+        log = load_operations(path)
+        name = f"{log.version or version}-{os.path.basename(path)}"
+        push_operations(
+            log.operations("create"),
+            log.operations("update", coalesce=st.session_state.coalesce_updates),
+            url,
+            log.version or version,
+            push_checkpoint(name),
+            name
+        )
+        return True, f"Operation log {path} successfully pushed to Server"
+    except Exception as e:
+        return False, f"Error pushing the operation log: {str(e)}"
+
+
 def display_bottleneck_analysis(generator):
     if not hasattr(generator, 'bottleneck_details_sa') or not hasattr(generator, 'bottleneck_details_po'):
         st.warning("No bottleneck analysis data available. Please run the simulation first.")
@@ -717,6 +825,7 @@ def simulate_disaster_section():
     if st.button("🚀 Simulate Disaster", type="primary"):
         if 'generator' in st.session_state and st.session_state.generator:
             with st.spinner("Simulating disaster impact..."):
+                marks = mark_uploads(st.session_state.generator)
                 # Run the disaster simulation
                 disaster_results = st.session_state.generator.simulate_disaster(
                     disaster_type=disaster_type,
@@ -724,6 +833,8 @@ def simulate_disaster_section():
                     affected_nodes_percentage=affected_percentage
                 )
 
+                wait_for_uploads(st.session_state.generator, marks)
+
                 # Analyze and visualize the results
                 analyze_disaster_impact(st.session_state.generator, disaster_results)
         else:
@@ -873,11 +984,136 @@ def main():
             step=1
         )
         version = st.text_input("Enter the version")
+        lazy_periods = st.checkbox(
+            "Generate periods on demand",
+            value=False,
+            help="Only keep each period's seed and produce its graph when it is read (for long horizons on large networks)"
+        )
+        checkpoint_every = st.number_input(
+            "Checkpoint Every N Periods",
+            min_value=0,
+            max_value=108,
+            value=0,
+            step=1,
+            help="Keep every N-th period in full and rebuild the others from the operation log when read (0 keeps all)"
+        )
+        snapshot_cache_size = st.number_input(
+            "Materialized Periods to Keep",
+            min_value=1,
+            max_value=108,
+            value=4,
+            step=1
+        )
+        workers = st.number_input(
+            "Worker Processes",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=1,
+            step=1,
+            help="Processes used to generate the time periods, the result is the same for any number of workers"
+        )
+        seed = st.number_input(
+            "Seed",
+            min_value=0,
+            value=0,
+            step=1,
+            help="Master seed of the generation, 0 draws a random one"
+        )
+        cache_dir = st.text_input(
+            "Artifact Cache Directory",
+            value=os.getenv("ARTIFACT_CACHE_DIR", ""),
+            help="Reuse generated data, simulations and LP solutions of the same seed and configuration (empty disables the cache)"
+        )
+        op_log_dir = st.text_input(
+            "Operation Log Spill Directory",
+            value=os.getenv("OPERATION_LOG_DIR", ""),
+            help="Write the operation logs to disk in segments to keep memory flat on long sessions (empty keeps them in memory)"
+        )
+        op_log_mode = st.selectbox(
+            "Operation Log",
+            ["Keep for export", "Drop (CSV only)", "Stream to server"],
+            help="Keep the operations for the Export to Server buttons, skip logging, or push them while generating"
+        )
         st.session_state.include_units_in_chain = st.checkbox(
             'Include units_in_chain in payload',
             value=st.session_state.include_units_in_chain,
             key='units_in_chain_toggle'
         )
+        st.session_state.coalesce_updates = st.checkbox(
+            'Coalesce updates per entity',
+            value=st.session_state.coalesce_updates,
+            help="Push one update per entity and timestamp holding its final values",
+            key='coalesce_updates_toggle'
+        )
+        st.session_state.push_in_flight = st.number_input(
+            "Concurrent Push Requests",
+            min_value=1,
+            max_value=32,
+            value=st.session_state.push_in_flight,
+            step=1,
+            help="Bulk payloads in flight to the server at once, it can still slow the push down (429 / 503 Retry-After)"
+        )
+        st.session_state.push_checkpoint_dir = st.text_input(
+            "Push Checkpoint Directory",
+            value=st.session_state.push_checkpoint_dir,
+            help="Record the chunks the server acknowledged, so an export that fails resumes where it stopped (empty disables it)"
+        )
+        st.session_state.push_telemetry_dir = st.text_input(
+            "Push Telemetry Directory",
+            value=st.session_state.push_telemetry_dir,
+            help="Write the throughput, latency percentiles and errors of every push as a JSON summary (empty disables it)"
+        )
+        batch_sizes = st.session_state.push_batch_sizes
+        min_batch_size = st.number_input(
+            "Min Operations per Payload",
+            min_value=1,
+            max_value=100000,
+            value=batch_sizes["min_size"],
+            step=100
+        )
+        max_batch_size = st.number_input(
+            "Max Operations per Payload",
+            min_value=1,
+            max_value=100000,
+            value=max(batch_sizes["max_size"], min_batch_size),
+            step=1000,
+            help="Payload sizes are picked in this range from the server latency and the payload bytes"
+        )
+        target_seconds = st.number_input(
+            "Target Seconds per Request",
+            min_value=0.1,
+            max_value=60.0,
+            value=batch_sizes["target_seconds"],
+            step=0.5
+        )
+        st.session_state.push_batch_sizes = {
+            "min_size": min_batch_size,
+            "max_size": max(max_batch_size, min_batch_size),
+            "target_seconds": target_seconds,
+        }
+        st.session_state.dict_timestamps_per_request = st.number_input(
+            "Timestamps per Dictionary Request",
+            min_value=0,
+            max_value=108,
+            value=st.session_state.dict_timestamps_per_request,
+            step=1,
+            help="Pack all the simulation dictionaries of this many timestamps per /dicts/bulk request (0 sends one request per dictionary to /dicts)"
+        )
+        compression = st.selectbox(
+            "Payload Compression",
+            ["none", "gzip", "deflate"],
+            help="Content-Encoding of the pushed payloads, the server has to accept it"
+        )
+        st.session_state.push_compression = None if compression == "none" else compression
+        float_digits = st.number_input(
+            "Round Pushed Floats to Decimals",
+            min_value=-1,
+            max_value=15,
+            value=-1,
+            step=1,
+            help="Decimals kept in the float values of the pushed payloads (-1 sends them at full precision)"
+        )
+        st.session_state.push_float_digits = None if float_digits < 0 else float_digits
 
     # Main area tabs
 
@@ -890,13 +1126,24 @@ def main():
         with col1:
             if st.button("Generate New Supply Chain"):
                 with st.spinner("Generating supply chain data..."):
+                    close_uploads(st.session_state.generator)
                     st.session_state.generator = SupplyChainGenerator(
                         total_variable_nodes=total_nodes,
                         base_periods=base_periods,
-                        version=version
+                        version=version,
+                        snapshot_cache_size=snapshot_cache_size,
+                        lazy_periods=lazy_periods,
+                        checkpoint_every=checkpoint_every or None,
+                        workers=workers,
+                        seed=seed or None,
+                        cache_dir=cache_dir or None,
+                        op_log_dir=op_log_dir or None,
+                        **operation_log_sinks(op_log_mode, server_url, version)
                     )
+                    marks = mark_uploads(st.session_state.generator)
                     st.session_state.generator.generate_data()
-                    st.success("✅ Initial data generation complete!")
+                    wait_for_uploads(st.session_state.generator, marks)
+                    st.success(f"✅ Initial data generation complete! (seed {st.session_state.generator.seed})")
 
         with col2:
             if st.session_state.generator is not None:
@@ -926,6 +1173,40 @@ def main():
                             else:
                                 st.error(message)
 
+                saved_log = st.radio(
+                    "Operation Log to Save",
+                    ["Generation", "Simulation"],
+                    horizontal=True,
+                    help="The simulation log holds the operations of the temporal simulation and the disasters"
+                )
+                operation_log_path = st.text_input(
+                    "Operation Log File",
+                    value=os.path.join(
+                        export_dir, "operations.oplog" if saved_log == "Generation" else "simulation_operations.oplog"
+                    ),
+                    key=f"operation_log_path_{saved_log}",
+                    help="Binary file of the create/update operations, to push them again without regenerating"
+                )
+                col5, col6 = st.columns(2)
+                with col5:
+                    if st.button("Save Operation Log"):
+                        with st.spinner("Saving the operation log..."):
+                            success, message = save_operation_log(
+                                st.session_state.generator, operation_log_path, simulation=saved_log == "Simulation"
+                            )
+                            if success:
+                                st.success(message)
+                            else:
+                                st.error(message)
+                with col6:
+                    if st.button("Push Saved Operation Log"):
+                        with st.spinner("Pushing the saved operation log to Server..."):
+                            success, message = push_saved_operation_log(operation_log_path, url, version)
+                            if success:
+                                st.success(message)
+                            else:
+                                st.error(message)
+
     with tab2:
         if st.session_state.generator is not None:
             col1, col2 = st.columns(2)
@@ -981,10 +1262,20 @@ def main():
                     st.session_state.generator = SupplyChainGenerator(
                         total_variable_nodes=total_nodes,
                         base_periods=base_periods,
-                        version=version
+                        version=version,
+                        snapshot_cache_size=snapshot_cache_size,
+                        lazy_periods=lazy_periods,
+                        checkpoint_every=checkpoint_every or None,
+                        workers=workers,
+                        seed=seed or None,
+                        cache_dir=cache_dir or None,
+                        op_log_dir=op_log_dir or None,
+                        **operation_log_sinks(op_log_mode, server_url, version)
                     )
 
+                marks = mark_uploads(st.session_state.generator)
                 st.session_state.generator.create_temporal_simulation()
+                wait_for_uploads(st.session_state.generator, marks)
                 st.success("✅ Simulation Done!")
 
         with col2:
@@ -360,6 +360,7 @@ def apply_bulk_update(generator, update_type, preview_data):
                 supplier_id = supplier_data['id']
                 current_graph.add_node(supplier_id, **supplier_data, node_type='supplier')
                 generator.suppliers.append(supplier_data)
+                generator.index_entity(supplier_data)
 
         elif update_type == 'parts':
             for _, row in preview_data.iterrows():
@@ -367,6 +368,7 @@ def apply_bulk_update(generator, update_type, preview_data):
                 part_id = part_data['id']
                 current_graph.add_node(part_id, **part_data, node_type='part')
                 generator.parts[part_data['type']].append(part_data)
+                generator.index_entity(part_data)
 
         elif update_type == 'warehouses':
             for _, row in preview_data.iterrows():
@@ -374,6 +376,7 @@ def apply_bulk_update(generator, update_type, preview_data):
                 warehouse_id = warehouse_data['id']
                 current_graph.add_node(warehouse_id, **warehouse_data, node_type='warehouse')
                 generator.warehouses[warehouse_data['type']].append(warehouse_data)
+                generator.index_entity(warehouse_data)
         
         # st.write("Before adding new nodes")
         connect_new_nodes(generator, update_type, preview_data)
@@ -0,0 +1,133 @@
+# push_benchmark.py
+"""
+Push throughput of the server exports, against the local graph server stand-in (or a real server with --url).
+
+    python push_benchmark.py --nodes 1000 10000 100000 --in-flight 8 --compression gzip --latency-ms 20
+
+For every network size a supply chain is generated, then its create and update operations are pushed like the
+Export to Server button does (creates first), followed by its simulation dictionaries when --simulate is set.
+Reports operations per second, bytes per second, the p50 / p95 / p99 request latency, the retries and the time
+spent encoding versus waiting on the server (see PushTelemetry).
+"""
+import argparse
+import json
+import random
+import time
+
+from data_generator import SupplyChainGenerator
+from local_graph_server import LocalGraphServer
+from push_engine import (
+    DEFAULT_MAX_IN_FLIGHT, BatchSizer, PushChunk, PushEngine, PushTelemetry, dictionary_entries, operation_chunks
+)
+
+
+def push_run(generator, url, version, in_flight, compression=None, float_digits=None, adaptive=True,
+             exclude=frozenset(["units_in_chain"]), simulate=False):
+    """Push the operations (and dictionaries with `simulate`) of a generator, returns the measures of the push"""
+    telemetry = PushTelemetry()
+    start = time.perf_counter()
+    sizes = {}
+    with PushEngine(
+            f"{url}/schema/live/update", max_in_flight=in_flight, compression=compression,
+            float_digits=float_digits, telemetry=telemetry
+    ) as engine:
+        for action, ops_dict in (
+                ("create", generator.return_create_operations()),
+                ("update", generator.return_update_operations()),
+        ):
+            sizer = BatchSizer() if adaptive else None
+            engine.push(operation_chunks(ops_dict, action, version, sizer=sizer, exclude=exclude), sizer=sizer)
+            if sizer is not None:
+                sizes[action] = sizer.summary()
+        if simulate:
+            # One request per dictionary, like export_dictionaries does by default
+            engine.url = f"{url}/dicts"
+            engine.push(PushChunk({"version": version, **entry}, 0) for entry in dictionary_entries(generator))
+    seconds = time.perf_counter() - start
+
+    return {
+        **telemetry.summary(),
+        "operations": engine.operations_sent,
+        "seconds": seconds,
+        "ops_per_second": engine.operations_sent / seconds,
+        "bytes_per_second": engine.bytes_sent / seconds,
+        "bytes_per_op": engine.bytes_per_op,
+        "batch_sizes": sizes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--base-periods", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    parser.add_argument("--compression", choices=["gzip", "deflate"], default=None)
+    parser.add_argument("--float-digits", type=int, default=None)
+    parser.add_argument("--fixed-batches", action="store_true", help="1000 operations per payload")
+    parser.add_argument("--simulate", action="store_true", help="Also run and push the temporal simulation")
+    parser.add_argument("--url", default=None, help="Push to this server instead of the local stand-in")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Stand-in time per request")
+    parser.add_argument("--latency-per-op-us", type=float, default=20.0, help="Stand-in time per operation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stand-in probability of a 500")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Stand-in operations per second")
+    parser.add_argument("--json", default=None, help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for nodes in args.nodes:
+        random.seed(args.seed)
+        generator = SupplyChainGenerator(total_variable_nodes=nodes, base_periods=args.base_periods, seed=args.seed)
+        start = time.perf_counter()
+        generator.generate_data()
+        if args.simulate:
+            generator.create_temporal_simulation()
+        generation = time.perf_counter() - start
+
+        server = None
+        url = args.url
+        if url is None:
+            server = LocalGraphServer(
+                latency=args.latency_ms / 1e3,
+                latency_per_op=args.latency_per_op_us / 1e6,
+                error_rate=args.error_rate,
+                rate_limit=args.rate_limit,
+                seed=args.seed,
+            ).start()
+            url = server.url
+        try:
+            result = push_run(
+                generator, url, "BENCH", args.in_flight, args.compression, args.float_digits,
+                adaptive=not args.fixed_batches, simulate=args.simulate,
+            )
+        finally:
+            if server is not None:
+                server.stop()
+        if server is not None:
+            result["server"] = server.stats()
+        result.update(nodes=nodes, generation_seconds=generation)
+        results.append(result)
+
+        print(
+            f"{nodes:>7} nodes  {result['operations']:>9} ops  {result['seconds']:7.2f} s  "
+            f"{result['ops_per_second']:9.0f} ops/s  {result['bytes_per_second'] / 1e6:7.2f} MB/s  "
+            f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms"
+        )
+        if "server" in result:
+            stats = result["server"]
+            print(
+                f"         server: {stats['requests']} requests, {stats['throttled']} throttled, "
+                f"{stats['errors']} errors, {stats['orphan_updates']} orphan updates"
+            )
+        print(
+            f"         client: {result['retries']} retries, {result['encode_seconds']:.2f} s encoding, "
+            f"{result['server_seconds']:.2f} s in requests, {result['wait_seconds']:.2f} s backing off"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,755 @@
+# push_engine.py
+import bisect
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import defaultdict, namedtuple
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from entity_records import json_default
+
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_BATCH_SIZE = 1000
+BACKPRESSURE_STATUSES = (429, 503)  # the server asks to slow down, the request is sent again
+TRANSIENT_STATUSES = (500, 502, 504)  # sent again after a backoff, the payloads are idempotent
+COMPRESSIONS = ("gzip", "deflate")  # Content-Encoding of the request bodies
+
+
+# A bulk payload, the number of operations it holds and its key (stream, action, timestamp, total, start, stop):
+# the operations [start, stop) of the `total` operations of `action` at `timestamp` of a pushed log (`stream`, the
+# version by default). The key is sent as the Idempotency-Key of the request and recorded in a PushCheckpoint once
+# the server acknowledged the payload.
+PushChunk = namedtuple("PushChunk", ["payload", "operations", "key"], defaults=[None])
+
+
+class Projection:
+    """
+    An operation payload pushed without the properties in `exclude` (e.g. `units_in_chain`). Neither the payload
+    nor its properties are copied: the projection is only made while `PushEngine.encode` writes the body.
+    """
+
+    __slots__ = ("payload", "exclude")
+
+    def __init__(self, payload, exclude):
+        self.payload = payload
+        self.exclude = exclude
+
+    def project(self):
+        exclude = self.exclude
+        return {
+            key: {k: v for k, v in value.items() if k not in exclude} if key == "properties" else value
+            for key, value in self.payload.items()
+        }
+
+
+class PushError(Exception):
+    """A payload the graph server kept rejecting"""
+
+
+# One HTTP attempt of a push: when it ended (seconds since the telemetry started), its latency (seconds), body
+# bytes, operations, HTTP status (None for a connection error or timeout) and the number of attempts before it
+RequestRecord = namedtuple("RequestRecord", ["end", "latency", "bytes", "operations", "status", "retry"])
+
+
+class PushTelemetry:
+    """
+    Per-request metrics of a push, shared by the threads of a PushEngine: a RequestRecord per HTTP attempt, plus
+    the time spent on our side (encoding and compressing the bodies) and waiting (server backpressure and retry
+    backoffs), both summed over the threads. Comparing `encode_seconds` with the request latencies tells whether
+    a slow push is the client or the graph server.
+
+    `summary` gives the throughput, the p50 / p95 / p99 latency of the acknowledged requests and the count of
+    every status, `write` saves it as JSON. An engine used for several pushes (e.g. a PushPipeline uploading every
+    generation step) summarizes one of them from a `mark` taken when it started.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.records = []
+        self.encode_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def record(self, latency, size, operations, status, retry):
+        with self._lock:
+            self.records.append(
+                RequestRecord(time.monotonic() - self.started, latency, size, operations, status, retry)
+            )
+
+    def encoded(self, seconds):
+        with self._lock:
+            self.encode_seconds += seconds
+
+    def waited(self, seconds):
+        with self._lock:
+            self.wait_seconds += seconds
+
+    def mark(self):
+        """Point to summarize the requests from: (number of records, seconds since started, encode / wait seconds)"""
+        with self._lock:
+            return len(self.records), time.monotonic() - self.started, self.encode_seconds, self.wait_seconds
+
+    def summary(self, window=None, since=None):
+        """
+        Metrics of the push so far, or of the requests after the `mark` `since`. `ops_per_second` covers the last
+        `window` seconds when given (the live rate), the whole push otherwise; the other metrics always cover the
+        whole push.
+        """
+        first, started, encode_before, wait_before = since or (0, 0.0, 0.0, 0.0)
+        with self._lock:
+            records = self.records[first:]
+            encode_seconds = self.encode_seconds - encode_before
+            wait_seconds = self.wait_seconds - wait_before
+            now = time.monotonic() - self.started
+        elapsed = now - started
+        acked = [record for record in records if record.status is not None and record.status < 400]
+        operations = sum(record.operations for record in acked)
+        if window is not None:
+            recent = sum(record.operations for record in acked if record.end >= now - window)
+            ops_per_second = recent / min(window, elapsed) if elapsed else 0.0
+        else:
+            ops_per_second = operations / elapsed if elapsed else 0.0
+        latencies = np.array([record.latency for record in acked]) * 1e3
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        statuses = defaultdict(int)
+        for record in records:
+            statuses["connection" if record.status is None else str(record.status)] += 1
+        return {
+            "seconds": elapsed,
+            "requests": len(records),
+            "acknowledged": len(acked),
+            "errors": len(records) - len(acked),
+            "retries": sum(1 for record in records if record.retry),
+            "throttled": sum(1 for record in records if record.status in BACKPRESSURE_STATUSES),
+            "statuses": dict(sorted(statuses.items())),
+            "operations": operations,
+            "bytes": sum(record.bytes for record in acked),
+            "ops_per_second": ops_per_second,
+            "bytes_per_second": sum(record.bytes for record in acked) / elapsed if elapsed else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "server_seconds": float(sum(record.latency for record in records)),
+            "encode_seconds": encode_seconds,
+            "wait_seconds": wait_seconds,
+        }
+
+    def write(self, path, since=None, **extra):
+        """Save the summary (from the `mark` `since`, and the `extra` fields, e.g. the push name) as JSON to `path`"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({**extra, **self.summary(since=since)}, f, indent=2)
+
+
+class PushEngine:
+    """
+    Pushes bulk payloads to the graph server over one pooled HTTP session, with up to `max_in_flight` requests
+    in flight.
+
+    Payloads are pushed in phases (`push` calls): a phase returns once every one of its payloads was acknowledged,
+    so pushing the creates then the updates keeps every create ahead of the updates of its entity. Within a phase
+    payloads may reach the server in any order, except the update chunks of one timestamp: a log may update the same
+    entity several times in a timestamp, so they are sent one after the other (see `ordering_group`).
+
+    There is no fixed delay between requests: when the server answers 429 / 503 every request waits for its
+    `Retry-After` (or an exponential backoff when it doesn't give one), then the payload is sent again, for up to
+    `max_wait` seconds. Transient failures (500 / 502 / 504, connection errors and timeouts) are retried up to
+    `max_retries` times after a backoff.
+
+    Bodies are compact JSON (no whitespace), floats rounded to `float_digits` decimals when given, and compressed
+    with `compression` ("gzip" or "deflate", sent as the Content-Encoding of the request). The bulk payloads repeat
+    the same keys, node types and version in every entry, so they compress several times over. `bytes_sent`,
+    `json_bytes` and `operations_sent` measure what went over the wire, see `bytes_per_op`. Every request is
+    recorded in `telemetry` (a PushTelemetry, which may be shared by several engines of one push).
+    """
+
+    def __init__(self, url, max_in_flight=DEFAULT_MAX_IN_FLIGHT, max_retries=5, backoff=0.5, timeout=120,
+                 session=None, compression=None, float_digits=None, max_wait=600, telemetry=None):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.url = url
+        self.compression = compression
+        self.float_digits = float_digits
+        self.max_in_flight = max(int(max_in_flight), 1)
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._resume_at = 0.0  # time.monotonic() before which no request is sent (server backpressure)
+        self._lock = threading.Lock()
+        self.bytes_sent = 0  # request bodies as sent (compressed)
+        self.json_bytes = 0  # request bodies before compression
+        self.operations_sent = 0
+        self.telemetry = telemetry or PushTelemetry()
+
+    @property
+    def bytes_per_op(self):
+        """Bytes sent per acknowledged operation"""
+        return self.bytes_sent / self.operations_sent if self.operations_sent else 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def encode(self, payload):
+        """JSON body of a payload, the op log payloads hold entity records (see json_default)"""
+        if self.float_digits is not None:
+            payload = round_floats(payload, self.float_digits)
+        return json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+
+    def compress(self, body):
+        if self.compression == "gzip":
+            return gzip.compress(body, compresslevel=6)
+        if self.compression == "deflate":
+            return zlib.compress(body, 6)
+        return body
+
+    def prepare(self, payload):
+        """(request body, size of its JSON) of a payload, the values it references are read now"""
+        start = time.perf_counter()
+        body = self.encode(payload)
+        compressed = self.compress(body)
+        self.telemetry.encoded(time.perf_counter() - start)
+        return compressed, len(body)
+
+    def post(self, payload, url=None, operations=0, key=None, sizer=None):
+        """
+        POST one payload (holding `operations` operations, for the metrics), waiting out the backpressure of the
+        server. A chunk `key` is sent as the Idempotency-Key of the request, so the server can skip a payload it
+        already applied when a push is resumed. The size and duration of the request are reported to `sizer` once
+        it is acknowledged. Returns the response
+        """
+        body, json_size = self.prepare(payload)
+        return self.send(body, json_size, url, operations, key, sizer)
+
+    def send(self, body, json_size, url=None, operations=0, key=None, sizer=None):
+        """POST a body made by `prepare`, see `post`"""
+        headers = {"Content-Type": "application/json"}
+        if self.compression is not None:
+            headers["Content-Encoding"] = self.compression
+        if key is not None:
+            headers["Idempotency-Key"] = idempotency_key(key)
+        attempt = 0  # transient failures
+        throttled = 0  # backpressure answers
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            self._wait_for_server()
+            retry = attempt + throttled
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url or self.url, data=body, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self.telemetry.record(time.perf_counter() - start, len(body), operations, None, retry)
+                if attempt == self.max_retries:
+                    raise
+                self._back_off(attempt)
+                attempt += 1
+                continue
+            self.telemetry.record(time.perf_counter() - start, len(body), operations, response.status_code, retry)
+            if response.status_code in TRANSIENT_STATUSES and attempt < self.max_retries:
+                self._back_off(attempt)
+                attempt += 1
+                continue
+            if response.status_code in BACKPRESSURE_STATUSES:
+                if time.monotonic() > deadline:
+                    raise PushError(
+                        f"{url or self.url} still answered {response.status_code} after {self.max_wait} seconds"
+                    )
+                self._slow_down(response, throttled)
+                throttled += 1
+                continue
+            response.raise_for_status()
+            with self._lock:
+                self.bytes_sent += len(body)
+                self.json_bytes += json_size
+                self.operations_sent += operations
+            if sizer is not None and operations:
+                sizer.observe(operations, len(body), response.elapsed.total_seconds())
+            return response
+
+    def push(self, chunks, on_ack=None, sizer=None):
+        """
+        Push PushChunks and wait for all of them. `on_ack(chunk)` is called from the calling thread as chunks are
+        acknowledged. The first failure is raised once the requests in flight ended, no new chunk is sent after it.
+
+        The acknowledged requests are reported to `sizer`, a BatchSizer the producer of `chunks` reads the size of
+        the next chunk from (chunks are only built as they are sent).
+        """
+        if self.max_in_flight == 1:
+            for chunk in chunks:
+                self.post(chunk.payload, operations=chunk.operations, key=chunk.key, sizer=sizer)
+                if on_ack is not None:
+                    on_ack(chunk)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            in_flight = {}
+            busy = set()  # ordering groups with a chunk in flight
+            held = []  # chunks read ahead while a chunk of their group was in flight, in order
+            error = None
+            chunks = iter(chunks)
+            exhausted = False
+            while True:
+                while error is None and len(in_flight) < self.max_in_flight:
+                    chunk = next((c for c in held if ordering_group(c) not in busy), None)
+                    if chunk is not None:
+                        held.remove(chunk)
+                    else:
+                        # Read ahead up to max_in_flight chunks, a later group may be sent meanwhile
+                        if exhausted or len(held) >= self.max_in_flight:
+                            break
+                        chunk = next(chunks, None)
+                        if chunk is None:
+                            exhausted = True
+                            break
+                        group = ordering_group(chunk)
+                        if group is not None and (group in busy or any(ordering_group(c) == group for c in held)):
+                            held.append(chunk)
+                            continue
+                    group = ordering_group(chunk)
+                    if group is not None:
+                        busy.add(group)
+                    in_flight[
+                        pool.submit(self.post, chunk.payload, None, chunk.operations, chunk.key, sizer)
+                    ] = chunk
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    busy.discard(ordering_group(chunk))
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                    elif on_ack is not None:
+                        on_ack(chunk)
+            if error is not None:
+                raise error
+
+    def _wait_for_server(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            self.telemetry.waited(delay)
+
+    def _back_off(self, attempt):
+        delay = self.backoff * 2 ** attempt
+        time.sleep(delay)
+        self.telemetry.waited(delay)
+
+    def _slow_down(self, response, attempt):
+        try:
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            delay = min(self.backoff * 2 ** attempt, 30.0)
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+
+class PushPipeline:
+    """
+    Consumer of a StreamingOperationLog (see operation_log.py) uploading its batches in the background while the
+    generator keeps running. Batches are encoded when they are handed over (the payloads reference records the
+    generator keeps changing), then queued for `engine.max_in_flight` upload threads. The queue holds
+    `queue_size` batches: when the uploads fall behind, handing over a batch blocks and the generation waits.
+
+    An update batch is only sent once every create batch queued before it was acknowledged (creates are numbered
+    as they are queued), so no update reaches the server ahead of the create of its entity. The update batches of a
+    timestamp are sent one after the other, in the order they were queued, as they may update the same entity.
+    After a failed upload the queued batches are dropped, the error is raised by `join`. `close` stops the upload
+    threads and closes the engine once the pipeline isn't used anymore.
+    """
+
+    def __init__(self, engine, version, queue_size=16, exclude=frozenset()):
+        self.engine = engine
+        self.version = version
+        self.exclude = exclude
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._acked = threading.Condition()
+        self._creates_queued = 0
+        self._creates_done = set()  # numbers of the creates done beyond the first `_creates_before` ones
+        self._creates_before = 0  # creates 0 .. _creates_before - 1 are all done (acknowledged, or failed)
+        self._updates_queued = defaultdict(int)  # timestamp : update batches queued
+        self._updates_done = defaultdict(int)  # timestamp : update batches done, they are sent in order
+        self.operations_acked = 0
+        self.error = None
+        self._workers = [
+            threading.Thread(target=self._upload, daemon=True) for _ in range(engine.max_in_flight)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __call__(self, action, timestamp, operations):
+        body, json_size = self.engine.prepare(bulk_payload(operations, action, self.version, timestamp, self.exclude))
+        if action == "create":
+            number = self._creates_queued  # creates are numbered
+            self._creates_queued += 1
+        else:
+            number = (self._creates_queued, self._updates_queued[timestamp])  # creates before it, its rank
+            self._updates_queued[timestamp] += 1
+        self._queue.put((action, timestamp, body, json_size, len(operations), number))
+
+    def _ready(self, timestamp, number):
+        """An update can go: every create queued before it and the updates of its timestamp queued before it are done"""
+        creates_before, rank = number
+        return self._creates_before >= creates_before and self._updates_done[timestamp] >= rank
+
+    def _upload(self):
+        while True:
+            item = self._queue.get()
+            if item is None:  # close
+                self._queue.task_done()
+                return
+            action, timestamp, body, json_size, operations, number = item
+            try:
+                if self.error is None:
+                    if action != "create":
+                        with self._acked:
+                            self._acked.wait_for(lambda: self._ready(timestamp, number) or self.error is not None)
+                    if self.error is None:
+                        self.engine.send(body, json_size, operations=operations)
+                        with self._acked:
+                            self.operations_acked += operations
+            except Exception as e:
+                self.error = self.error or e
+            finally:
+                with self._acked:
+                    if action == "create":
+                        self._creates_done.add(number)
+                        while self._creates_before in self._creates_done:
+                            self._creates_done.remove(self._creates_before)
+                            self._creates_before += 1
+                    else:
+                        self._updates_done[timestamp] += 1
+                    self._acked.notify_all()
+                self._queue.task_done()
+
+    @property
+    def pending(self):
+        """Batches waiting to be uploaded"""
+        return self._queue.qsize()
+
+    def join(self):
+        """Wait until every batch handed over so far was uploaded, raise the first upload error"""
+        self._queue.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        """Upload the batches still queued, then stop the upload threads and close the engine"""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        self.engine.close()
+
+
+class BatchSizer:
+    """
+    Number of operations to put in the next bulk payload, adapted to what the server takes: from the acknowledged
+    requests it estimates the seconds and bytes per operation (exponential moving averages) and sizes payloads to
+    take about `target_seconds` and stay under `max_bytes`, within [min_size, max_size]. A size grows at most
+    `max_growth` times per request, so one fast answer doesn't jump to `max_size`.
+
+    `sizes` holds the size chosen after each acknowledged request, for the push metrics.
+    """
+
+    def __init__(self, initial_size=DEFAULT_BATCH_SIZE, min_size=100, max_size=20000, target_seconds=1.0,
+                 max_bytes=8 * 2 ** 20, smoothing=0.3, max_growth=2.0):
+        if not 0 < min_size <= max_size:
+            raise ValueError("Batch sizes need 0 < min_size <= max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self.smoothing = smoothing
+        self.max_growth = max_growth
+        self.size = self._clamp(initial_size)
+        self.seconds_per_op = None
+        self.bytes_per_op = None
+        self.sizes = []
+        self._lock = threading.Lock()
+
+    def _clamp(self, size):
+        return int(min(max(size, self.min_size), self.max_size))
+
+    def _average(self, current, value):
+        return value if current is None else current + self.smoothing * (value - current)
+
+    def observe(self, operations, body_bytes, seconds):
+        """Account for an acknowledged request of `operations` operations and pick the next size"""
+        with self._lock:
+            self.seconds_per_op = self._average(self.seconds_per_op, seconds / operations)
+            self.bytes_per_op = self._average(self.bytes_per_op, body_bytes / operations)
+            size = self.max_size
+            if self.seconds_per_op > 0:
+                size = min(size, self.target_seconds / self.seconds_per_op)
+            if self.max_bytes and self.bytes_per_op > 0:
+                size = min(size, self.max_bytes / self.bytes_per_op)
+            self.size = self._clamp(min(size, self.size * self.max_growth))
+            self.sizes.append(self.size)
+
+    def summary(self):
+        """Short description of the chosen sizes"""
+        if not self.sizes:
+            return f"{self.size} operations per payload"
+        return (
+            f"{min(self.sizes)}-{max(self.sizes)} operations per payload (last {self.sizes[-1]}, "
+            f"{self.seconds_per_op * self.size:.2f} s per request)"
+        )
+
+
+class PushCheckpoint:
+    """
+    Chunks of a push acknowledged by the server, appended to a JSON lines file as they are acknowledged. A push
+    that failed midway is resumed by only sending the `pending` operations. The ranges recorded for a timestamp are
+    dropped when its number of operations changed since (the operations aren't the ones that were pushed).
+
+    The chunks are also recorded as they are sent ({"sent": key} lines): the server may have applied a chunk whose
+    answer was lost, so a resumed push has to send the same ranges again under the same keys (see `sent`).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._acknowledged = defaultdict(list)  # (stream, action, timestamp, total) : [(start, stop), ...]
+        self._sent = defaultdict(dict)  # (stream, action, timestamp, total) : {start: stop}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        if isinstance(entry, dict):
+                            self._add_sent(entry["sent"])
+                        else:
+                            self._add(entry)
+        self._file = None
+
+    def _add(self, key):
+        stream, action, timestamp, total, start, stop = key
+        self._acknowledged[(stream, action, timestamp, total)].append((start, stop))
+
+    def _add_sent(self, key):
+        stream, action, timestamp, total, start, stop = key
+        self._sent[(stream, action, timestamp, total)][start] = stop
+
+    def pending(self, stream, action, timestamp, total):
+        """[start, stop) ranges of the `total` operations of `action` at `timestamp` not acknowledged yet"""
+        ranges = []
+        position = 0
+        for start, stop in sorted(self._acknowledged.get((stream, action, timestamp, total), ())):
+            if start > position:
+                ranges.append((position, start))
+            position = max(position, stop)
+        if position < total:
+            ranges.append((position, total))
+        return ranges
+
+    def sent(self, stream, action, timestamp, total):
+        """{start: stop} of the chunks of `action` at `timestamp` sent so far, acknowledged or not"""
+        return self._sent.get((stream, action, timestamp, total), {})
+
+    def acknowledged(self):
+        """Number of operations acknowledged"""
+        return sum(stop - start for ranges in self._acknowledged.values() for start, stop in ranges)
+
+    def record(self, chunk):
+        """Record an acknowledged chunk"""
+        self._write(list(chunk.key))
+        self._add(chunk.key)
+
+    def record_sent(self, chunk):
+        """Record a chunk about to be sent"""
+        self._write({"sent": list(chunk.key)})
+        self._add_sent(chunk.key)
+
+    def _write(self, entry):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def complete(self):
+        """The push went through: forget it, pushing the same operations again sends them all"""
+        self.close()
+        self._acknowledged.clear()
+        self._sent.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def pending_ranges(ops_dict, action, stream, checkpoint=None):
+    """(timestamp, operations, [(start, stop), ...]) of the operations the checkpoint hasn't acknowledged yet"""
+    for timestamp, operations in ops_dict.items():
+        if checkpoint is None:
+            yield timestamp, operations, [(0, len(operations))]
+        else:
+            yield timestamp, operations, checkpoint.pending(stream, action, timestamp, len(operations))
+
+
+def operation_chunks(ops_dict, action, version, checkpoint=None, sizer=None, exclude=frozenset(), stream=None):
+    """
+    PushChunks of the bulk payloads of {timestamp: operations} (op log views), in timestamp order, leaving out the
+    operations `checkpoint` acknowledged and the properties in `exclude`. Each chunk takes the current size of the
+    BatchSizer (DEFAULT_BATCH_SIZE operations without one).
+
+    The chunks are recorded in `checkpoint` as they are handed over. When a push is resumed, the ranges an earlier
+    push sent without an answer are sent again with the same boundaries, so their Idempotency-Key is unchanged and
+    the server can skip the ones it applied; the sizer only cuts the ranges that were never sent.
+
+    `stream` names the pushed log in the chunk keys (the version by default). Logs pushed under the same version
+    (generation and simulation, or two generators) need different names, or the server takes their chunks for
+    ones it already applied.
+
+    Update chunks are yielded round robin over the timestamps: PushEngine sends the update chunks of a timestamp one
+    after the other, so the chunks of different timestamps are the ones that can be in flight together.
+    """
+    stream = stream or version
+    timestamps = [
+        _timestamp_chunks(operations, ranges, action, version, timestamp, checkpoint, sizer, exclude, stream)
+        for timestamp, operations, ranges in pending_ranges(ops_dict, action, stream, checkpoint)
+    ]
+    if action != "update":
+        for chunks in timestamps:
+            yield from chunks
+        return
+    while timestamps:
+        for chunks in list(timestamps):
+            chunk = next(chunks, None)
+            if chunk is None:
+                timestamps.remove(chunks)
+            else:
+                yield chunk
+
+
+def _timestamp_chunks(operations, ranges, action, version, timestamp, checkpoint, sizer, exclude, stream):
+    """PushChunks of the pending `ranges` of the operations of one timestamp, see operation_chunks"""
+    sent = checkpoint.sent(stream, action, timestamp, len(operations)) if checkpoint is not None else {}
+    starts = sorted(sent)
+    for start, stop in ranges:
+        i = start
+        while i < stop:
+            if i in sent:
+                end = min(sent[i], stop)
+            else:
+                end = min(i + (sizer.size if sizer is not None else DEFAULT_BATCH_SIZE), stop)
+                # Never overlap a range sent before, the server may have applied it under its own key
+                later = bisect.bisect_right(starts, i)
+                if later < len(starts):
+                    end = min(end, starts[later])
+            chunk = PushChunk(
+                bulk_payload(operations[i:end], action, version, timestamp, exclude),
+                end - i,
+                (stream, action, timestamp, len(operations), i, end),
+            )
+            if checkpoint is not None:
+                checkpoint.record_sent(chunk)
+            yield chunk
+            i = end
+
+
+def bulk_payload(operations, action, version, timestamp, exclude=frozenset()):
+    """Bulk payload of operations of `action` at `timestamp`, projected without the properties in `exclude`"""
+    if exclude:
+        payload = [Projection(op["payload"], exclude) for op in operations]
+    else:
+        payload = [op["payload"] for op in operations]
+    return {
+        "version": version,
+        "action": f"bulk_{action}",
+        "type": "schema",
+        "timestamp": timestamp,
+        "payload": payload,
+    }
+
+
+def dictionary_entries(generator):
+    """The simulation dictionaries to upload, {"timestamp", "type", "dict"} each"""
+    [temporal_po_demand, temporal_po_cost] = generator.return_simulation_dictionaries_po()
+    [temporal_sa_demand, temporal_sa_cost] = generator.return_simulation_dictionaries_sa()
+    [temporal_rm_demand, temporal_rm_cost] = generator.return_simulation_dictionaries_rm()
+    dictionaries = [
+        ("PRODUCT_OFFERING_DEMAND", temporal_po_demand),
+        ("PRODUCT_OFFERING_COST", temporal_po_cost),
+        ("SUB_ASSEMBLIES_DEMAND", temporal_sa_demand),
+        ("SUB_ASSEMBLIES_COST", temporal_sa_cost),
+        ("RAW_MATERIALS_DEMAND", temporal_rm_demand),
+        ("RAW_MATERIALS_COST", temporal_rm_cost),
+    ]
+    for dict_type, temporal_dict in dictionaries:
+        for timestamp, values in temporal_dict.items():
+            yield {"timestamp": timestamp, "type": dict_type, "dict": values}
+    yield {"timestamp": 0, "type": "SUPPLIERS_PARTS", "dict": generator.return_suppliers_parts()}
+
+
+def dictionary_chunks(entries, version, timestamps_per_request):
+    """PushChunks of /dicts/bulk packing the dictionaries of `timestamps_per_request` timestamps per request"""
+    by_timestamp = {}
+    for entry in entries:
+        by_timestamp.setdefault(entry["timestamp"], []).append(entry)
+    timestamps = sorted(by_timestamp)
+    for i in range(0, len(timestamps), timestamps_per_request):
+        packed = [entry for timestamp in timestamps[i:i + timestamps_per_request] for entry in by_timestamp[timestamp]]
+        yield PushChunk({"version": version, "dicts": packed}, len(packed))
+
+
+def ordering_group(chunk):
+    """
+    Chunks of the same group are sent one after the other: the update chunks of one timestamp of a log, which may
+    update an entity in several chunks. Other chunks (None) are sent in any order.
+    """
+    if chunk.key is None or chunk.key[1] != "update":
+        return None
+    return chunk.key[:3]
+
+
+def idempotency_key(key):
+    stream, action, timestamp, total, start, stop = key
+    return f"{stream}:{action}:{timestamp}:{start}-{stop}/{total}"
+
+
+def _json_default(value):
+    if type(value) is Projection:
+        return value.project()
+    return json_default(value)
+
+
+def round_floats(value, digits):
+    """Copy of a payload with its floats rounded to `digits` decimals (records and other mappings become dicts)"""
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), digits)
+    if isinstance(value, Projection):
+        return round_floats(value.project(), digits)
+    if isinstance(value, Mapping):
+        return {key: round_floats(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [round_floats(item, digits) for item in value]
+    return value
@@ -0,0 +1,653 @@
+# temporal_store.py
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+
+import networkx as nx
+import numpy as np
+
+
+DEFAULT_CACHE_SIZE = 4
+
+
+class SnapshotStore(MutableMapping):
+    """
+    Base class for the `{timestamp: nx.DiGraph}` stores. Subclasses keep each timestamp in a compact form and build the
+    NetworkX graph in `materialize` only when it is read. The last `cache_size` materialized graphs are kept in an LRU,
+    so repeated reads of a timestamp return the same object until it is evicted.
+
+    Assigning a graph to a timestamp pins it as is, pinned graphs are never evicted.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._pinned = {}  # timestamp : nx.DiGraph assigned by a caller
+        self._cache = OrderedDict()  # timestamp : materialized nx.DiGraph, least recently used first
+
+    def materialize(self, key):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        if key in self._pinned:
+            return self._pinned[key]
+        if key not in self:
+            raise KeyError(key)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        graph = self.materialize(key)
+        if self.cache_size > 0:
+            self._cache[key] = graph
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return graph
+
+    def __getstate__(self):
+        # Materialized graphs are rebuilt on demand, they are left out of pickles (artifact cache)
+        state = dict(self.__dict__)
+        state["_cache"] = OrderedDict()
+        if "_produced" in state:
+            state["_produced"] = OrderedDict()
+        return state
+
+    def _pin(self, key, graph):
+        if not isinstance(graph, nx.Graph):
+            raise TypeError("Only NetworkX graphs can be assigned to a snapshot")
+        self._invalidate(key)
+        self._pinned[key] = graph
+
+    def _invalidate(self, key):
+        self._cache.pop(key, None)
+
+    def clear_cache(self):
+        """Drop every materialized snapshot (pinned graphs are kept)"""
+        self._cache.clear()
+
+
+class TemporalGraphStore(SnapshotStore):
+    """
+    Array backed storage for the per-period graph snapshots of a SupplyChainGenerator.
+
+    The static topology of the base graph is kept once: node ids and their static attributes, and the edges in CSR
+    form (`indptr` / `indices`, ordered exactly like `base_graph.edges`). Every period only stores the attributes that
+    change over time as NumPy columns aligned to the nodes / edges that carry that attribute in the base graph.
+
+    The store behaves like the old `{period: nx.DiGraph}` dict. Reading a period builds a NetworkX graph on demand,
+    and assigning a graph to a period pins it as is (used by the Supply Chain Manager page when it adds nodes).
+    Nodes and edges a pinned graph adds to the topology get a slot in the columns (`add_node` / `add_edge`), so the
+    periods simulated after it vary them too.
+
+    Lazy periods (`add_lazy_period`) don't keep their columns either: they are produced by a callback when first
+    needed and only the last `cache_size` produced periods are kept, older ones are produced again on the next read.
+    The callback may rebuild the period from anything that describes it, e.g. its logged update operations.
+    """
+
+    NODE_COLUMNS = {
+        "revenue": np.float64,
+        "cost": np.float64,
+        "demand": np.float64,
+        "reliability": np.float64,
+        "current_capacity": np.float64,
+        "units_in_chain": np.int64,
+    }
+    EDGE_COLUMNS = {
+        "transportation_cost": np.float64,
+        "inventory_level": np.float64,
+    }
+
+    def __init__(self, base_graph, node_columns=None, edge_columns=None, cache_size=DEFAULT_CACHE_SIZE):
+        super().__init__(cache_size)
+        self.node_columns = dict(node_columns or self.NODE_COLUMNS)
+        self.edge_columns = dict(edge_columns or self.EDGE_COLUMNS)
+
+        # Static topology
+        self.node_ids = list(base_graph.nodes)
+        self.node_index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.node_attrs = [dict(data) for _, data in base_graph.nodes(data=True)]
+
+        self.indptr = np.zeros(len(self.node_ids) + 1, dtype=np.int64)
+        indices = []
+        self.edge_attrs = []
+        for i, u in enumerate(self.node_ids):
+            for v, data in base_graph.succ[u].items():
+                indices.append(self.node_index[v])
+                self.edge_attrs.append(dict(data))
+            self.indptr[i + 1] = len(indices)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self._base_nodes = len(self.node_ids)  # nodes of the base graph, the later ones were added by add_node
+        self._added_edges = []  # (source index, target index) of the edges added by add_edge, after the CSR edges
+        self.topology_changes = 0  # number of nodes / edges added since the store was built
+
+        # Columns: positions of the holders of each attribute and their base values
+        self._node_holders = {}
+        self._node_base = {}
+        for column, dtype in self.node_columns.items():
+            holders = [i for i, data in enumerate(self.node_attrs) if column in data]
+            self._node_holders[column] = np.asarray(holders, dtype=np.int32)
+            self._node_base[column] = np.asarray(
+                [self.node_attrs[i][column] for i in holders], dtype=dtype
+            )
+
+        self._edge_holders = {}
+        self._edge_base = {}
+        for column, dtype in self.edge_columns.items():
+            holders = [e for e, data in enumerate(self.edge_attrs) if column in data]
+            self._edge_holders[column] = np.asarray(holders, dtype=np.int64)
+            self._edge_base[column] = np.asarray(
+                [self.edge_attrs[e][column] for e in holders], dtype=dtype
+            )
+
+        self._node_slot_maps = {}
+        self._edge_sources = None
+        self._edge_endpoints = None
+
+        self._periods = {}  # period : {"parent": period or None, "nodes": {col: values}, "edges": {col: values}}
+        self._produced = OrderedDict()  # lazy period : (node columns, edge columns), least recently used first
+
+    # ------------------------------------------------------------------
+    # Column access
+
+    def node_holder_ids(self, column):
+        """Ids of the nodes carrying `column`, in column order"""
+        return [self.node_ids[i] for i in self._node_holders[column].tolist()]
+
+    def node_slots(self, column, node_ids, default=None):
+        """Positions of `node_ids` inside the `column` arrays, `default` for the ids not carrying it when given"""
+        if column not in self._node_slot_maps:
+            self._node_slot_maps[column] = {
+                node_id: slot for slot, node_id in enumerate(self.node_holder_ids(column))
+            }
+        slot_map = self._node_slot_maps[column]
+        if default is not None:
+            slots = (slot_map.get(node_id, default) for node_id in node_ids)
+        else:
+            slots = (slot_map[node_id] for node_id in node_ids)
+        return np.fromiter(slots, dtype=np.int64, count=len(node_ids))
+
+    def edge_holder_pairs(self, column):
+        """(source, target) ids of the edges carrying `column`, in column order"""
+        holders = self._edge_holders[column]
+        sources, targets = self._edge_endpoint_index()
+        return [
+            (self.node_ids[s], self.node_ids[t]) for s, t in zip(sources[holders].tolist(), targets[holders].tolist())
+        ]
+
+    def node_base_values(self, column):
+        return self._node_base[column]
+
+    def edge_base_values(self, column):
+        return self._edge_base[column]
+
+    def fit_node_column(self, column, values):
+        """
+        Values of a node column computed before nodes were added to it, completed with the base values of these
+        nodes (the values they were added with)
+        """
+        base = self._node_base[column]
+        if len(values) < len(base):
+            return np.concatenate([values, base[len(values):]])
+        return values
+
+    def fit_edge_column(self, column, values):
+        """Values of an edge column computed before edges were added to it, see `fit_node_column`"""
+        base = self._edge_base[column]
+        if len(values) < len(base):
+            return np.concatenate([values, base[len(values):]])
+        return values
+
+    def add_node(self, node_id, attributes):
+        """
+        Add a node created after the store was built (e.g. by the Supply Chain Manager page). It gets a slot in the
+        columns of the attributes it carries, with their current values as base values: the periods registered
+        before it read these for it. Periods built from the base graph don't contain the node.
+        """
+        if node_id in self.node_index:
+            return
+        i = len(self.node_ids)
+        self.node_ids.append(node_id)
+        self.node_index[node_id] = i
+        self.node_attrs.append(dict(attributes))
+        self.indptr = np.append(self.indptr, self.indptr[-1])
+        for column, dtype in self.node_columns.items():
+            if attributes.get(column) is not None:
+                self._node_holders[column] = np.append(self._node_holders[column], np.int32(i))
+                self._node_base[column] = np.append(
+                    self._node_base[column], np.asarray([attributes[column]], dtype=dtype)
+                )
+                self._node_slot_maps.pop(column, None)
+        self._edge_sources = None
+        self._edge_endpoints = None
+        self.topology_changes += 1
+
+    def add_edge(self, u, v, attributes):
+        """Add an edge created after the store was built, see `add_node` (its nodes must be in the store)"""
+        s, t = self.node_index[u], self.node_index[v]
+        if self._has_edge(s, t):
+            return
+        e = len(self.edge_attrs)
+        self.edge_attrs.append(dict(attributes))
+        self._added_edges.append((s, t))
+        for column, dtype in self.edge_columns.items():
+            if attributes.get(column) is not None:
+                self._edge_holders[column] = np.append(self._edge_holders[column], np.int64(e))
+                self._edge_base[column] = np.append(
+                    self._edge_base[column], np.asarray([attributes[column]], dtype=dtype)
+                )
+        self._edge_endpoints = None
+        self.topology_changes += 1
+
+    def _has_edge(self, s, t):
+        if s < self._base_nodes and t in self.indices[self.indptr[s]:self.indptr[s + 1]]:
+            return True
+        return (s, t) in self._added_edges
+
+    def _add_topology(self, graph):
+        """Add the nodes and edges of a pinned graph that aren't in the store yet"""
+        for node_id, data in graph.nodes(data=True):
+            if node_id not in self.node_index:
+                self.add_node(node_id, data)
+        sources, targets = self._edge_endpoint_index()
+        known = set(zip(sources.tolist(), targets.tolist()))
+        for u, v, data in graph.edges(data=True):
+            if (self.node_index[u], self.node_index[v]) not in known:
+                self.add_edge(u, v, data)
+
+    def node_values(self, period, column):
+        """Values of a node column in a period (inherited from the base graph when the period doesn't set it)"""
+        if period in self._pinned:
+            return self._graph_node_column(self._pinned[period], column)
+        entry = self._periods[period]
+        nodes, _ = self.columns(period)
+        if column in nodes:
+            return self.fit_node_column(column, nodes[column])
+        if entry["parent"] is not None:
+            return self.node_values(entry["parent"], column)
+        return self._node_base[column]
+
+    def edge_values(self, period, column):
+        """Values of an edge column in a period (inherited from the base graph when the period doesn't set it)"""
+        if period in self._pinned:
+            return self._graph_edge_column(self._pinned[period], column)
+        entry = self._periods[period]
+        _, edges = self.columns(period)
+        if column in edges:
+            return self.fit_edge_column(column, edges[column])
+        if entry["parent"] is not None:
+            return self.edge_values(entry["parent"], column)
+        return self._edge_base[column]
+
+    def add_period(self, period, node_values=None, edge_values=None, parent=None):
+        """
+        Register a period. `node_values` / `edge_values` map a column name to its full array of values for that period,
+        columns that are left out are shared with the base graph. `parent` is only needed when the period derives from
+        a pinned graph (directly or through other periods), so nodes and edges added to that graph carry over.
+        """
+        parent = self._pinned_ancestor(parent)
+        self._forget(period)
+        self._periods[period] = {
+            "parent": parent,
+            "nodes": dict(node_values or {}),
+            "edges": dict(edge_values or {}),
+        }
+
+    def add_lazy_period(self, period, producer, source=None, parent=None, values=None):
+        """
+        Register a period whose columns are produced on demand. `producer()` returns `(node_values, edge_values)` like
+        the arguments of `add_period` and must give the same values every time it is called. `source` is the period
+        the producer reads its starting values from, it is produced first when it is lazy too.
+
+        `values` are the columns of the period when they were already computed, they are kept with the produced
+        periods (and evicted like them) so the period isn't produced again right away.
+        """
+        parent = self._pinned_ancestor(parent)
+        self._forget(period)
+        self._periods[period] = {
+            "parent": parent,
+            "producer": producer,
+            "source": source,
+        }
+        if values is not None:
+            self._keep_produced(period, values)
+
+    def _pinned_ancestor(self, parent):
+        """Nearest pinned period `parent` derives from (itself when pinned), None when it derives from the base graph"""
+        if parent is None or parent in self._pinned:
+            return parent
+        if parent in self._periods:
+            return self._periods[parent]["parent"]
+        return None
+
+    def is_lazy(self, period):
+        return "producer" in self._periods[period] and period not in self._pinned
+
+    def columns(self, period):
+        """(node columns, edge columns) stored for a period, producing them if the period is lazy"""
+        entry = self._periods[period]
+        if "producer" not in entry:
+            return entry["nodes"], entry["edges"]
+        if period in self._produced:
+            self._produced.move_to_end(period)
+            return self._produced[period]
+
+        # Produce the chain of lazy sources oldest first, so long horizons don't recurse
+        chain = [period]
+        source = entry["source"]
+        while source in self._periods and self.is_lazy(source) and source not in self._produced:
+            chain.append(source)
+            source = self._periods[source]["source"]
+        for key in reversed(chain):
+            self._keep_produced(key, self._periods[key]["producer"]())
+        return self._produced[period]
+
+    def _keep_produced(self, period, values):
+        node_values, edge_values = values
+        self._produced[period] = (dict(node_values), dict(edge_values))
+        while len(self._produced) > max(self.cache_size, 1):
+            self._produced.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Mapping interface
+
+    def __setitem__(self, period, graph):
+        self._pin(period, graph)
+        self._add_topology(graph)
+        self._periods.setdefault(period, {"parent": None, "nodes": {}, "edges": {}})
+
+    def __delitem__(self, period):
+        del self._periods[period]
+        self._forget(period)
+
+    def _forget(self, period):
+        self._pinned.pop(period, None)
+        self._produced.pop(period, None)
+        self._invalidate(period)
+
+    def __iter__(self):
+        return iter(self._periods)
+
+    def __len__(self):
+        return len(self._periods)
+
+    def __contains__(self, period):
+        return period in self._periods
+
+    # ------------------------------------------------------------------
+    # Materialization
+
+    def materialize(self, period):
+        """Build a NetworkX graph for a period"""
+        if period in self._pinned:
+            return self._pinned[period]
+        entry = self._periods[period]
+        node_columns, edge_columns = self.columns(period)
+
+        if entry["parent"] is not None:
+            graph = self._pinned[entry["parent"]].copy()
+        else:
+            graph = self._base_graph()
+
+        nodes = graph.nodes
+        for column, values in node_columns.items():
+            for node_id, value in zip(self.node_holder_ids(column), values.tolist()):
+                if node_id in nodes:
+                    nodes[node_id][column] = value
+
+        adj = graph.succ
+        for column, values in edge_columns.items():
+            for (u, v), value in zip(self.edge_holder_pairs(column), values.tolist()):
+                if u in adj and v in adj[u]:
+                    adj[u][v][column] = value
+
+        return graph
+
+    def _base_graph(self):
+        graph = nx.DiGraph()
+        graph.add_nodes_from(
+            zip(self.node_ids[:self._base_nodes], (dict(data) for data in self.node_attrs[:self._base_nodes]))
+        )
+        sources = self._edge_source_index()
+        graph.add_edges_from(
+            (self.node_ids[s], self.node_ids[t], dict(data))
+            for s, t, data in zip(sources.tolist(), self.indices.tolist(), self.edge_attrs)
+        )
+        return graph
+
+    def _edge_source_index(self):
+        """Source of every CSR edge"""
+        if self._edge_sources is None:
+            self._edge_sources = np.repeat(
+                np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.indptr)
+            )
+        return self._edge_sources
+
+    def _edge_endpoint_index(self):
+        """(sources, targets) of every edge: the CSR edges, then the added ones"""
+        if self._edge_endpoints is None:
+            added = np.asarray(self._added_edges, dtype=np.int32).reshape(-1, 2)
+            self._edge_endpoints = (
+                np.concatenate([self._edge_source_index(), added[:, 0]]),
+                np.concatenate([self.indices, added[:, 1]]),
+            )
+        return self._edge_endpoints
+
+    def _graph_node_column(self, graph, column):
+        base = self._node_base[column]
+        values = base.copy()
+        for slot, node_id in enumerate(self.node_holder_ids(column)):
+            if node_id in graph.nodes:
+                values[slot] = graph.nodes[node_id].get(column, base[slot])
+        return values
+
+    def _graph_edge_column(self, graph, column):
+        base = self._edge_base[column]
+        values = base.copy()
+        for slot, (u, v) in enumerate(self.edge_holder_pairs(column)):
+            if graph.has_edge(u, v):
+                values[slot] = graph.succ[u][v].get(column, base[slot])
+        return values
+
+
+class DeltaSnapshotStore(SnapshotStore):
+    """
+    Copy-on-write snapshots of a graph, used for the simulation timestamps.
+
+    The graph given to the constructor is copied once and frozen as the base. Every timestamp is stored as a reference
+    to its parent (another timestamp, or the base) plus a `{node_id: {attribute: value}}` map of the node attributes it
+    changed, so a timestamp costs memory proportional to the nodes it touches. `derive` registers a timestamp and
+    returns a `DeltaGraph` to write it through.
+
+    Writing to a timestamp that other timestamps derive from first copies the old value into those children, so a
+    snapshot never changes once it has been derived from.
+    """
+
+    def __init__(self, base_graph, cache_size=DEFAULT_CACHE_SIZE):
+        super().__init__(cache_size)
+        self.base = base_graph.copy()
+        self._entries = {}  # timestamp : {"parent": timestamp or None, "nodes": {node_id: {attr: value}}}
+        self._children = {}  # timestamp : timestamps derived from it
+
+    def derive(self, key, parent=None):
+        """Register `key` as a snapshot of `parent` (the base graph by default) and return a DeltaGraph over it"""
+        if key in self:
+            del self[key]
+        if parent is not None:
+            if parent not in self:
+                raise KeyError(parent)
+            self._children.setdefault(parent, set()).add(key)
+        self._entries[key] = {"parent": parent, "nodes": {}}
+        return DeltaGraph(self, key)
+
+    def delta(self, key):
+        """Node attributes changed by `key` relative to its parent"""
+        return self._entries[key]["nodes"]
+
+    def node_attribute(self, key, node_id, attr):
+        """Value of a node attribute at `key`, raises KeyError when the node doesn't carry it"""
+        while key is not None:
+            if key in self._pinned:
+                return self._pinned[key].nodes[node_id][attr]
+            entry = self._entries[key]
+            changed = entry["nodes"].get(node_id)
+            if changed is not None and attr in changed:
+                return changed[attr]
+            key = entry["parent"]
+        return self.base.nodes[node_id][attr]
+
+    def node_attribute_names(self, key, node_id):
+        """Attribute names of a node at `key`"""
+        names = {}
+        while key is not None:
+            if key in self._pinned:
+                names.update(dict.fromkeys(self._pinned[key].nodes[node_id]))
+                return list(names)
+            names.update(dict.fromkeys(self._entries[key]["nodes"].get(node_id, ())))
+            key = self._entries[key]["parent"]
+        names.update(dict.fromkeys(self.base.nodes[node_id]))
+        return list(names)
+
+    def has_node(self, key, node_id):
+        while key is not None:
+            if key in self._pinned:
+                return node_id in self._pinned[key]
+            key = self._entries[key]["parent"]
+        return node_id in self.base
+
+    def set_node_attribute(self, key, node_id, attr, value):
+        if key in self._pinned:
+            self._pinned[key].nodes[node_id][attr] = value
+            return
+        if not self.has_node(key, node_id):
+            raise KeyError(node_id)
+        for child in self._children.get(key, ()):
+            changed = self._entries[child]["nodes"].setdefault(node_id, {})
+            if attr not in changed:
+                try:
+                    changed[attr] = self.node_attribute(key, node_id, attr)
+                except KeyError:
+                    pass
+        self._entries[key]["nodes"].setdefault(node_id, {})[attr] = value
+        self._invalidate(key)
+
+    def _invalidate(self, key):
+        super()._invalidate(key)
+        for child in self._children.get(key, ()):
+            self._invalidate(child)
+
+    # ------------------------------------------------------------------
+    # Mapping interface
+
+    def __setitem__(self, key, graph):
+        if key in self._entries:
+            del self[key]
+        self._pin(key, graph)
+        self._entries[key] = {"parent": None, "nodes": {}}
+
+    def __delitem__(self, key):
+        entry = self._entries[key]
+        for child in list(self._children.get(key, ())):
+            # Children keep their values: fold this snapshot's delta into theirs and re-parent them
+            child_entry = self._entries[child]
+            if key in self._pinned:
+                graph = self.materialize(child)
+                self._entries[child] = {"parent": None, "nodes": {}}
+                self._pinned[child] = graph
+                continue
+            for node_id, changed in entry["nodes"].items():
+                merged = dict(changed)
+                merged.update(child_entry["nodes"].get(node_id, {}))
+                child_entry["nodes"][node_id] = merged
+            child_entry["parent"] = entry["parent"]
+            if entry["parent"] is not None:
+                self._children.setdefault(entry["parent"], set()).add(child)
+        if entry["parent"] is not None:
+            self._children.get(entry["parent"], set()).discard(key)
+        self._children.pop(key, None)
+        del self._entries[key]
+        self._pinned.pop(key, None)
+        self._cache.pop(key, None)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def materialize(self, key):
+        """Build a NetworkX graph for a timestamp"""
+        if key in self._pinned:
+            return self._pinned[key]
+        chain = []
+        while key is not None and key not in self._pinned:
+            chain.append(self._entries[key]["nodes"])
+            key = self._entries[key]["parent"]
+        graph = self._pinned[key].copy() if key is not None else self.base.copy()
+
+        nodes = graph.nodes
+        for changed_nodes in reversed(chain):
+            for node_id, changed in changed_nodes.items():
+                if node_id in nodes:
+                    nodes[node_id].update(changed)
+        return graph
+
+
+class DeltaGraph:
+    """
+    Write-through view of one DeltaSnapshotStore timestamp. Only the node attribute access used by the simulation is
+    supported: `graph.nodes[node_id][attr]` reads fall back to the parent snapshot and writes land in the delta.
+    """
+
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+        self.nodes = _DeltaNodeView(store, key)
+
+    def __contains__(self, node_id):
+        return self.store.has_node(self.key, node_id)
+
+    def to_graph(self):
+        """Materialized NetworkX graph of this snapshot"""
+        return self.store[self.key]
+
+
+class _DeltaNodeView(Mapping):
+    def __init__(self, store, key):
+        self._store = store
+        self._key = key
+
+    def __getitem__(self, node_id):
+        if not self._store.has_node(self._key, node_id):
+            raise KeyError(node_id)
+        return _DeltaNodeAttributes(self._store, self._key, node_id)
+
+    def __iter__(self):
+        return iter(self._store[self._key].nodes)
+
+    def __len__(self):
+        return len(self._store[self._key].nodes)
+
+    def __contains__(self, node_id):
+        return self._store.has_node(self._key, node_id)
+
+
+class _DeltaNodeAttributes(MutableMapping):
+    def __init__(self, store, key, node_id):
+        self._store = store
+        self._key = key
+        self._node_id = node_id
+
+    def __getitem__(self, attr):
+        return self._store.node_attribute(self._key, self._node_id, attr)
+
+    def __setitem__(self, attr, value):
+        self._store.set_node_attribute(self._key, self._node_id, attr, value)
+
+    def __delitem__(self, attr):
+        raise TypeError("Snapshot attributes can't be deleted")
+
+    def __iter__(self):
+        return iter(self._store.node_attribute_names(self._key, self._node_id))
+
+    def __len__(self):
+        return len(self._store.node_attribute_names(self._key, self._node_id))
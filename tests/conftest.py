@@ -0,0 +1,27 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_generator import SupplyChainGenerator  # noqa: E402
+
+
+@pytest.fixture(params=[False, True], ids=["eager", "lazy"])
+def generator(request):
+    """A small generated supply chain, with its periods stored eagerly and lazily"""
+    random.seed(7)
+    generator = SupplyChainGenerator(total_variable_nodes=100, base_periods=3, seed=7, lazy_periods=request.param)
+    generator.generate_data()
+    return generator
+
+
+@pytest.fixture
+def graph_server():
+    """Local stand-in of the graph server answering in a random order"""
+    from local_graph_server import LocalGraphServer
+
+    with LocalGraphServer(jitter=0.01, seed=3) as server:
+        yield server
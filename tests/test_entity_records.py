@@ -0,0 +1,29 @@
+from entity_records import PartRecord, snapshot_properties
+
+
+def test_snapshot_keeps_type_and_values():
+    record = PartRecord(id="P_001", cost=10.0, notes="added from the page")
+    snapshot = snapshot_properties(record)
+    record["cost"] = 20.0
+    record["notes"] = "changed"
+    assert isinstance(snapshot, PartRecord)
+    assert snapshot["cost"] == 10.0
+    assert snapshot["notes"] == "added from the page"
+
+
+def logged_create(generator, node_id):
+    return next(
+        operation
+        for operations in generator.return_create_operations().values()
+        for operation in operations
+        if operation["payload"].get("node_id") == node_id
+    )
+
+
+def test_create_operations_keep_the_created_values(generator):
+    warehouse = generator.warehouses["supplier"][0]
+    properties = logged_create(generator, warehouse["id"])["payload"]["properties"]
+    assert properties is not warehouse
+    created_capacity = properties["current_capacity"]
+    warehouse["current_capacity"] = created_capacity + 1000
+    assert logged_create(generator, warehouse["id"])["payload"]["properties"]["current_capacity"] == created_capacity
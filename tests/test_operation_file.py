@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from entity_records import json_default
+from operation_file import load_operations, replay, save_operations
+
+# Node keys of the temporal data ("{}" is the node id) -> graph attribute they hold
+NODE_KEYS = {
+    "family_{}_revenue": "revenue",
+    "offering_{}_cost": "cost",
+    "offering_{}_demand": "demand",
+    "warehouse_{}_capacity": "current_capacity",
+    "supplier_{}_reliability": "reliability",
+    "part_{}_cost": "cost",
+}
+
+
+def normalized(operations):
+    return json.loads(json.dumps(list(operations), default=json_default))
+
+
+def formats():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return ["framed"]
+    return ["framed", "arrow"]
+
+
+@pytest.mark.parametrize("fmt", formats())
+def test_save_load_round_trip(generator, tmp_path, fmt):
+    log = generator.return_operations_log()
+    path = tmp_path / f"operations.{fmt}"
+    save_operations(log, str(path), fmt=fmt)
+    loaded = load_operations(str(path))
+    assert normalized(loaded.view()) == normalized(log.view())
+
+
+@pytest.mark.parametrize("fmt", formats())
+def test_replay_matches_temporal_data(generator, tmp_path, fmt):
+    path = tmp_path / f"operations.{fmt}"
+    save_operations(generator.return_operations_log(), str(path), fmt=fmt)
+    loaded = load_operations(str(path))
+
+    for period, data in generator.get_temporal_data().items():
+        graph = replay(loaded, period)
+        assert graph.nodes[generator.business_group["id"]]["revenue"] == pytest.approx(data["business_group_revenue"])
+        for key_format, attribute in NODE_KEYS.items():
+            prefix, suffix = key_format.split("{}")
+            for key, value in data.items():
+                if key.startswith(prefix) and key.endswith(suffix):
+                    node_id = key[len(prefix):-len(suffix)]
+                    assert graph.nodes[node_id][attribute] == pytest.approx(value), (period, key)
+        for (u, v), edge in generator.get_graph_snapshot(period).edges.items():
+            for attribute in ("transportation_cost", "inventory_level"):
+                if attribute in edge:
+                    assert graph.succ[u][v][attribute] == pytest.approx(edge[attribute]), (period, u, v)
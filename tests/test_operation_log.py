@@ -0,0 +1,80 @@
+import gc
+import os
+
+import pytest
+
+from entity_records import IdTable
+from operation_log import ACTION_CODES, OperationLog
+
+
+def filled_log(**kwargs):
+    """Log of 3 timestamps, each creating 4 warehouses then updating each of them twice"""
+    log = OperationLog(**kwargs)
+    log.bind(IdTable(), "v1")
+    for timestamp in range(3):
+        for i in range(4):
+            log.log_node("create", timestamp, f"W_{i:03d}", "WAREHOUSE", {"id": f"W_{i:03d}", "capacity": 0})
+        for step in range(2):
+            for i in range(4):
+                log.log_node("update", timestamp, f"W_{i:03d}", "WAREHOUSE", {"capacity": 10 * timestamp + step})
+        log.log_edge("update", timestamp, "W_000", "P_001", "WAREHOUSEToPARTS", {"inventory_level": timestamp})
+    return log
+
+
+def test_spilled_log_reads_like_memory_log(tmp_path):
+    memory = filled_log()
+    spilled = filled_log(spill_dir=str(tmp_path), segment_size=5)
+    assert len(os.listdir(spilled.directory)) == len(spilled) // 5
+
+    assert list(spilled.view()) == list(memory.view())
+    for action in ACTION_CODES:
+        assert {t: list(v) for t, v in spilled.operations(action).items()} == {
+            t: list(v) for t, v in memory.operations(action).items()
+        }
+
+    rows = [operation for segment in spilled.segments() for operation in segment.operations()]
+    assert rows == list(memory.view())
+    key = (ACTION_CODES["update"], 1)
+    assert sum(segment.count(key) for segment in spilled.segments(key)) == 9
+
+
+def test_coalesce_keeps_final_values(tmp_path):
+    log = filled_log(spill_dir=str(tmp_path), segment_size=5)
+    updates = log.operations("update", coalesce=True)
+    assert sorted(updates) == [0, 1, 2]
+    for timestamp, view in updates.items():
+        nodes = [operation["payload"] for operation in view if "node_id" in operation["payload"]]
+        assert [payload["node_id"] for payload in nodes] == ["W_000", "W_001", "W_002", "W_003"]
+        assert all(payload["properties"] == {"capacity": 10 * timestamp + 1} for payload in nodes)
+        assert len(view) == 5
+
+
+def test_close_deletes_spill_directory(tmp_path):
+    log = filled_log(spill_dir=str(tmp_path), segment_size=5)
+    directory = log.directory
+    assert os.path.isdir(directory)
+    log.close()
+    assert not os.path.exists(directory)
+    assert len(log) == 0 and list(log.view()) == []
+
+    log = filled_log(spill_dir=str(tmp_path), segment_size=5)
+    directory = log.directory
+    del log
+    gc.collect()
+    assert not os.path.exists(directory)
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_generator_logs_survive_spilling(tmp_path, spill):
+    from data_generator import SupplyChainGenerator
+
+    kwargs = {"op_log_dir": str(tmp_path), "op_log_segment_size": 500} if spill else {}
+    generator = SupplyChainGenerator(total_variable_nodes=60, base_periods=2, seed=3, **kwargs)
+    generator.generate_data()
+    operations = list(generator.return_operation())
+    assert operations
+    if spill:
+        assert os.listdir(generator.operations_log.directory)
+    reference = SupplyChainGenerator(total_variable_nodes=60, base_periods=2, seed=3)
+    reference.generate_data()
+    assert len(operations) == len(reference.return_operation())
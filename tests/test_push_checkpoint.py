@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from push_engine import BatchSizer, PushCheckpoint, PushEngine, operation_chunks, pending_ranges
+from test_push_engine import expected_capacities, updated_log
+
+
+class Interrupted(Exception):
+    pass
+
+
+def push(server, log, checkpoint, size, stop_after=None):
+    """Push the creates then the updates of `log`, raising Interrupted after `stop_after` acknowledged chunks"""
+    acked = []
+
+    def on_ack(chunk):
+        checkpoint.record(chunk)
+        acked.append(chunk)
+        if stop_after is not None and len(acked) >= stop_after:
+            raise Interrupted
+
+    try:
+        with PushEngine(f"{server.url}/schema/live/update", max_in_flight=3) as engine:
+            for action in ("create", "update"):
+                sizer = BatchSizer(initial_size=size, min_size=size, max_size=size)
+                engine.push(operation_chunks(log.operations(action), action, "v1", checkpoint, sizer), on_ack, sizer)
+    finally:
+        checkpoint.close()
+    return acked
+
+
+def test_resumed_push_skips_acknowledged_chunks(graph_server, tmp_path):
+    log = updated_log()
+    path = str(tmp_path / "checkpoints" / "push.jsonl")
+
+    with pytest.raises(Interrupted):
+        push(graph_server, log, PushCheckpoint(path), size=6, stop_after=5)
+    checkpoint = PushCheckpoint(path)
+    acknowledged = checkpoint.acknowledged()
+    assert acknowledged >= 5 * 6
+    pending = sum(
+        stop - start
+        for action in ("create", "update")
+        for _, _, ranges in pending_ranges(log.operations(action), action, "v1", checkpoint)
+        for start, stop in ranges
+    )
+    assert pending == len(log) - acknowledged
+
+    resumed = push(graph_server, log, checkpoint, size=6)
+    assert sum(chunk.operations for chunk in resumed) == pending
+    checkpoint.complete()
+    assert not os.path.exists(path)
+
+    stats = graph_server.stats()
+    assert stats["operations"] == len(log)
+    assert stats["orphan_updates"] == 0
+    for timestamp, properties in expected_capacities().items():
+        assert graph_server.properties(timestamp) == properties
+
+
+def test_unanswered_chunks_are_sent_again_with_their_boundaries(graph_server, tmp_path):
+    log = updated_log()
+    path = str(tmp_path / "push.jsonl")
+    updates = log.operations("update")
+
+    # A first push sent two update chunks of timestamp 0 and got no answer for the second one
+    first = PushCheckpoint(path)
+    chunks = operation_chunks({0: updates[0]}, "update", "v1", first, BatchSizer(7, min_size=7, max_size=7))
+    answered, unanswered = next(chunks), next(chunks)
+    first.record(answered)
+    first.close()
+
+    checkpoint = PushCheckpoint(path)
+    sizer = BatchSizer(initial_size=4, min_size=4, max_size=4)
+    keys = [chunk.key for chunk in operation_chunks({0: updates[0]}, "update", "v1", checkpoint, sizer)]
+    checkpoint.close()
+    ranges = [(key[4], key[5]) for key in keys]
+    assert ranges[0] == unanswered.key[4:]
+    assert ranges[1:] == [(start, min(start + 4, len(updates[0]))) for start in range(14, len(updates[0]), 4)]
+
+    # The server skips the resent chunk when the first push had applied it
+    checkpoint = PushCheckpoint(path)
+    with PushEngine(f"{graph_server.url}/schema/live/update", max_in_flight=2) as engine:
+        engine.push(operation_chunks(log.operations("create"), "create", "v1"))
+        engine.push([answered, unanswered])
+        engine.push(operation_chunks({0: updates[0]}, "update", "v1", checkpoint, sizer))
+    checkpoint.close()
+    stats = graph_server.stats()
+    assert stats["duplicates"] == 1
+    assert graph_server.properties(0) == expected_capacities()[0]
@@ -0,0 +1,101 @@
+from entity_records import IdTable
+from local_graph_server import LocalGraphServer
+from operation_log import OperationLog, StreamingOperationLog
+from push_engine import BatchSizer, PushEngine, PushPipeline, operation_chunks
+
+ENTITIES = 6
+STEPS = 5
+
+
+def updated_log(timestamps=3):
+    """Log creating ENTITIES warehouses per timestamp and updating each of them STEPS times, one after the other"""
+    log = OperationLog()
+    log.bind(IdTable(), "v1")
+    for timestamp in range(timestamps):
+        for i in range(ENTITIES):
+            log.log_node("create", timestamp, f"W_{i:03d}", "WAREHOUSE", {"id": f"W_{i:03d}", "capacity": -1})
+        for step in range(STEPS):
+            for i in range(ENTITIES):
+                log.log_node("update", timestamp, f"W_{i:03d}", "WAREHOUSE", {"capacity": step})
+    return log
+
+
+def expected_capacities(timestamps=3):
+    return {
+        timestamp: {f"W_{i:03d}": {"id": f"W_{i:03d}", "capacity": STEPS - 1} for i in range(ENTITIES)}
+        for timestamp in range(timestamps)
+    }
+
+
+def small_sizer():
+    return BatchSizer(initial_size=ENTITIES, min_size=ENTITIES, max_size=ENTITIES)
+
+
+def test_update_chunks_of_a_timestamp_keep_their_order(graph_server):
+    log = updated_log()
+    acked = []
+    with PushEngine(f"{graph_server.url}/schema/live/update", max_in_flight=4) as engine:
+        for action in ("create", "update"):
+            sizer = small_sizer()
+            chunks = operation_chunks(log.operations(action), action, "v1", sizer=sizer)
+            engine.push(chunks, acked.append, sizer)
+
+    stats = graph_server.stats()
+    assert stats["orphan_updates"] == 0
+    assert stats["operations"] == len(log)
+    for timestamp, properties in expected_capacities().items():
+        assert graph_server.properties(timestamp) == properties
+
+    updates = [chunk.key for chunk in acked if chunk.key[1] == "update"]
+    for timestamp in range(3):
+        starts = [key[4] for key in updates if key[2] == timestamp]
+        assert starts == sorted(starts) and len(starts) == STEPS
+
+
+def test_update_chunks_alternate_timestamps():
+    log = updated_log()
+    keys = [chunk.key for chunk in operation_chunks(log.operations("update"), "update", "v1", sizer=small_sizer())]
+    assert [key[2] for key in keys[:6]] == [0, 1, 2, 0, 1, 2]
+    assert [key[4] for key in keys if key[2] == 1] == [ENTITIES * step for step in range(STEPS)]
+    creates = [chunk.key for chunk in operation_chunks(log.operations("create"), "create", "v1")]
+    assert [key[2] for key in creates] == [0, 1, 2]
+
+
+def node_operation(node_id, properties):
+    return {"payload": {"node_id": node_id, "node_type": "WAREHOUSE", "properties": properties}}
+
+
+def test_pipeline_sends_updates_after_their_creates():
+    # A slow create batch, an update of one of its entities, then fast creates acknowledged before the first one
+    with LocalGraphServer(latency_per_op=0.002) as server:
+        pipeline = PushPipeline(PushEngine(f"{server.url}/schema/live/update", max_in_flight=4), "v1")
+        try:
+            pipeline("create", 0, [node_operation(f"W_{i:03d}", {"capacity": -1}) for i in range(100)])
+            pipeline("update", 0, [node_operation("W_099", {"capacity": 99})])
+            for i in range(100, 103):
+                pipeline("create", 0, [node_operation(f"W_{i:03d}", {"capacity": -1})])
+            pipeline.join()
+        finally:
+            pipeline.close()
+        assert server.stats()["orphan_updates"] == 0
+        assert server.properties(0)["W_099"] == {"capacity": 99}
+
+
+def test_streamed_updates_keep_their_order(graph_server):
+    pipeline = PushPipeline(PushEngine(f"{graph_server.url}/schema/live/update", max_in_flight=4), "v1")
+    sink = StreamingOperationLog(pipeline, batch_size=ENTITIES)
+    sink.bind(IdTable(), "v1")
+    try:
+        for operation in updated_log().view():
+            payload = operation["payload"]
+            sink.log_node(
+                operation["action"], operation["timestamp"], payload["node_id"], payload["node_type"],
+                payload["properties"],
+            )
+        sink.flush()
+        pipeline.join()
+    finally:
+        pipeline.close()
+    assert graph_server.stats()["orphan_updates"] == 0
+    for timestamp, properties in expected_capacities().items():
+        assert graph_server.properties(timestamp) == properties
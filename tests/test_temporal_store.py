@@ -0,0 +1,61 @@
+import pytest
+
+from temporal_store import TemporalGraphStore
+
+
+def assert_columns_match_graph(store, period):
+    """The columns of a period hold the attribute values of its materialized graph"""
+    graph = store.materialize(period)
+    for column in store.node_columns:
+        values = store.node_values(period, column).tolist()
+        for node_id, value in zip(store.node_holder_ids(column), values):
+            if node_id in graph.nodes:
+                assert graph.nodes[node_id][column] == pytest.approx(value), (period, node_id, column)
+    for column in store.edge_columns:
+        values = store.edge_values(period, column).tolist()
+        for (u, v), value in zip(store.edge_holder_pairs(column), values):
+            if graph.has_edge(u, v):
+                assert graph.succ[u][v][column] == pytest.approx(value), (period, u, v, column)
+
+
+def add_part(generator, part_id="P_999"):
+    """Add a raw part to the latest period the way the Supply Chain Manager page does"""
+    latest = max(generator.temporal_graphs.keys())
+    graph = generator.temporal_graphs[latest]
+    part = {
+        "id": part_id, "name": part_id, "type": "raw", "subtype": "new", "cost": 12.5, "importance_factor": 1,
+        "valid_from": None, "valid_till": None, "expiry": None,
+    }
+    graph.add_node(part_id, **part, node_type="part")
+    generator.parts["raw"].append(part)
+    generator.index_entity(part)
+    warehouse = generator.warehouses["supplier"][0]["id"]
+    graph.add_edge(warehouse, part_id, inventory_level=50.0, storage_cost=1.0)
+    generator.temporal_graphs[latest] = graph
+    return latest, warehouse
+
+
+def test_columns_match_materialized_graphs(generator):
+    store = generator.temporal_graphs
+    assert isinstance(store, TemporalGraphStore)
+    for period in store:
+        assert_columns_match_graph(store, period)
+
+
+def test_added_node_gets_column_slots(generator):
+    store = generator.temporal_graphs
+    latest, warehouse = add_part(generator)
+    assert "P_999" in store.node_holder_ids("cost")
+    assert (warehouse, "P_999") in store.edge_holder_pairs("inventory_level")
+    assert "P_999" not in store[0].nodes
+
+    first = generator.simulate_next_period()
+    generator.simulate_next_period()
+    for period in (latest, first, first + 1):
+        assert "P_999" in store[period].nodes
+        assert store[period].has_edge(warehouse, "P_999")
+        assert_columns_match_graph(store, period)
+    assert store[first].nodes["P_999"]["cost"] != 12.5
+
+    data = generator.get_temporal_data()
+    assert "part_P_999_cost" in data[first]